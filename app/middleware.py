@@ -0,0 +1,107 @@
+"""
+ASGI 미들웨어
+- GZipRequestMiddleware: Content-Encoding: gzip 요청 본문을 해제하여 엔드포인트에 전달
+- MetricsMiddleware: 경로 템플릿/상태 코드별 요청 처리 시간 히스토그램
+- TracingMiddleware: 요청 1건 = 루트 span (응답 압축까지 포함한 서버 측 전체 지연 시간), 응답 헤더 x-trace-id
+"""
+
+import time
+import zlib
+
+from app.services import tracing
+from app.services.metrics import HTTP_LATENCY
+
+MAX_DECOMPRESSED_BYTES = 10 * 1024 * 1024
+
+
+class GZipRequestMiddleware:
+    def __init__(self, app, max_size: int = MAX_DECOMPRESSED_BYTES):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"content-encoding", b"").lower() != b"gzip":
+            return await self.app(scope, receive, send)
+
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+        try:
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            body = decoder.decompress(body, self.max_size)
+            if decoder.unconsumed_tail:
+                raise ValueError("decompressed body too large")
+        except (zlib.error, ValueError) as e:
+            status = 413 if isinstance(e, ValueError) else 400
+            await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b"invalid gzip request body"})
+            return
+
+        # scope는 복사하지 않고 헤더만 교체 (라우터가 채우는 scope["route"]를 바깥 미들웨어가 읽을 수 있도록)
+        scope["headers"] = [(k, v) for k, v in scope["headers"]
+                            if k not in (b"content-encoding", b"content-length")] + [(b"content-length", str(len(body)).encode())]
+        sent = False
+
+        async def receive_decoded():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_decoded, send)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_observed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            # 경로 템플릿만 레이블로 사용 (매칭 실패 경로는 하나로 묶어 레이블 폭증 방지)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], route, str(status))
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing.enabled():
+            return await self.app(scope, receive, send)
+
+        with tracing.span("http.request", kind="http", method=scope["method"], path=scope["path"]) as s:
+            trace_id = getattr(s, "trace_id", None)
+
+            async def send_traced(message):
+                if message["type"] == "http.response.start":
+                    s.set(status=message["status"])
+                    if trace_id:
+                        message = dict(message, headers=list(message.get("headers") or []) + [(b"x-trace-id", trace_id.encode())])
+                await send(message)
+
+            await self.app(scope, receive, send_traced)
+            # 라우팅 후 경로 템플릿 (/history/{child_id} 등, 메트릭 레이블용)
+            route = scope.get("route")
+            if route is not None:
+                s.set(route=getattr(route, "path", None))
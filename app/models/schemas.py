@@ -18,29 +18,127 @@ class LearningResponse(BaseModel):
     lesson: str             = Field(..., description="생성된 교재 내용")
     materials_text: str     = Field(..., description="문제 전체 텍스트(줄바꿈 포함)")
     lesson_id: str          = Field(..., description="교재 세션 식별자")
+    title: Optional[str]    = Field(None, description="학습 이력 제목")
+    date: Optional[str]     = Field(None, description="생성 일시")
+
+class WorksheetProblem(BaseModel):
+    number: int
+    stem: str
+    band: str = Field(..., description="난이도 구간 (basic/reasoning/applied/advanced)")
+    choices: Dict[str, str]
+
+class CompactLearningResponse(BaseModel):
+    """학습지를 구조화된 문항으로 1회만 전달 (정답은 서버에만 보관)"""
+    lesson_id: str
+    title: Optional[str] = None
+    date: Optional[str] = None
+    header: str = Field("", description="학습지 제목 줄 (예: [3학년 1학기] 곱셈)")
+    problems: List[WorksheetProblem]
+    feedback: Optional[str] = Field(None, description="채점 결과 (채점 후 이력 조회 시)")
 
 class AssessmentInput(BaseModel):
     child_id: str   = Field(..., description="아동 식별자")
     lesson_id: str  = Field(..., description="교재 세션 식별자")
     responses_text: str = Field(..., description="아동의 평가 응답 전체 텍스트")
-    materials_text: str = Field(..., description="문제 전체 텍스트")
+    materials_text: Optional[str] = Field(None, description="문제 전체 텍스트 (생략 시 서버에 저장된 학습지 사용)")
+    unit: Optional[str] = Field(None, description="학습 단원 (숙달도 집계용, 옵션)")
+    grade: Optional[int] = Field(None, description="학습지 학년 (다음 학습 추천용, 옵션)")
+    semester: Optional[int] = Field(None, description="학습지 학기 (다음 학습 추천용, 옵션)")
 
 class FeedbackResponse(BaseModel):
     feedback: str           = Field(..., description="이해도 평가 기반 피드백")
     next_lesson: Optional[str] = Field(None, description="다음 교재 내용(옵션)")
 
+class BandMastery(BaseModel):
+    total: int = 0
+    correct: int = 0
+    accuracy: Optional[float] = None
+
+class UnitMastery(BaseModel):
+    unit: str
+    attempts: int = 0
+    questions: int = 0
+    correct: int = 0
+    accuracy: Optional[float] = None
+    bands: Dict[str, BandMastery] = Field(default_factory=dict, description="난이도 구간별(basic/reasoning/applied/advanced) 정답률")
+    ema_score: Optional[float] = Field(None, description="점수 지수이동평균")
+    last_score: Optional[int] = None
+    updated_at: Optional[float] = None
+
+class MasteryResponse(BaseModel):
+    child_id: str
+    units: List[UnitMastery]
+
 class OverallFeedbackResponse(BaseModel):
     feedback: str = Field(..., description="학습 이력 기반 종합 피드백")
 
 class FeedbackHistoryItem(BaseModel):
     topic: str
     feedback: str
+    date: Optional[str] = None
+    score: Optional[int] = None
+
+class HistoryDigestItem(BaseModel):
+    """오래된 학습 이력의 단원별 압축 요약"""
+    unit: str
+    lessons: int = 0
+    scored: int = 0
+    avg_score: Optional[int] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    last_score: Optional[int] = None
+    first_date: Optional[str] = None
+    last_date: Optional[str] = None
 
 class OverallFeedbackRequest(BaseModel):
+    child_id: Optional[str] = Field(None, description="아동 식별자 (종합 피드백 캐시 키)")
     name: str
     grade: int
     semester: int
-    history: List[FeedbackHistoryItem]
+    history: List[FeedbackHistoryItem] = Field(default_factory=list, description="최근 학습 이력(과거→최근). 생략 시 서버에 저장된 이력 사용")
+    digests: List[HistoryDigestItem] = Field(default_factory=list, description="이미 압축된 오래된 이력의 단원별 다이제스트")
+
+class HistorySummaryItem(BaseModel):
+    lesson_id: str
+    date: str
+    title: str
+    score: Optional[int] = None
+
+class HistoryPageResponse(BaseModel):
+    items: List[HistorySummaryItem]
+    next_cursor: Optional[List[str]] = Field(None, description="다음 페이지 조회용 (date, lesson_id). 없으면 마지막 페이지")
+
+class LessonDetail(BaseModel):
+    lesson_id: str
+    date: str
+    title: str
+    content: Optional[str] = None
+    materials_text: Optional[str] = None
+    feedback: Optional[str] = None
+
+class UsageRollupItem(BaseModel):
+    key: Optional[str] = Field(None, description="집계 기준 값 (엔드포인트/아동/배포/호출 위치)")
+    calls: int
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    avg_latency_ms: float = 0.0
+    p50_latency_ms: float = 0.0
+
+class BudgetStatus(BaseModel):
+    mode: str = Field(..., description="ok | downgrade(저가 배포 전환) | cache_only(LLM 호출 생략)")
+    period: str
+    spend_usd: Optional[float] = None
+    budget_usd: Optional[float] = None
+    hard_budget_usd: Optional[float] = None
+    fallback_deployment: Optional[str] = None
+
+class UsageResponse(BaseModel):
+    by: str
+    since: float
+    items: List[UsageRollupItem]
+    budget: BudgetStatus
+    routes: Dict[str, str] = Field(default_factory=dict, description="작업(call)별 사용 배포 (모델 티어링)")
 
 # LangGraph 워크플로우용 통합 상태
 @dataclass
@@ -54,6 +152,8 @@ class EducationWorkflowState:
     embedding: Optional[List[float]] = None
     related_docs: Optional[List[Any]] = None
     curriculum_units: Optional[List[str]] = None  # RAG에서 검색된 교육과정 단원들
+    lesson_plan: Optional[Dict[str, Any]] = None  # 스케줄러가 정한 단원/난이도 구성
+    curriculum_guide: Optional[str] = None  # 출제 단원의 교육과정 가이드 (RAG)
     lesson: Optional[str] = None
     materials: Optional[List[str]] = None
     lesson_id: Optional[str] = None
@@ -65,4 +165,5 @@ class EducationWorkflowState:
     learning_response: Optional[LearningResponse] = None
     feedback_response: Optional[FeedbackResponse] = None
     overall_feedback_response: Optional[OverallFeedbackResponse] = None
-    history: Optional[List[Dict[str, str]]] = None
+    history: Optional[List[Dict[str, Any]]] = None
+    history_digests: Optional[List[Dict[str, Any]]] = None
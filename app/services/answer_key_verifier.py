@@ -0,0 +1,272 @@
+"""
+정답 키 검증 (LLM 호출 없음)
+LLM이 쓴 [AnswerKey]를 믿지 않고, 계산으로 답이 정해지는 문항은 본문의 식과 보기의 수를 정확한 유리수(Fraction)로 계산해 확인합니다.
+- 대상: 본문에 식이 하나인 계산 문항('36 + 27 = ?', '3/4 ÷ 1/2의 값은?'), □ 구하기('□ × 4 = 28일 때, □에 알맞은 수는?'),
+  몫/나머지('32 ÷ 3' + '몫 10, 나머지 2'), 두 식 결과의 합/차
+- 본문은 식과 정해진 계산 발문('다음을 계산하세요.' 등)만 있어야 함. 식이 '= ?'/'= □'로 끝나면 발문 없이도 판단,
+  그 밖의 글이 섞이면('3 × 4개씩 구웠고, 그중 2개를…') 식이 답이 아닐 수 있으므로 skipped
+- 정수, 소수, 분수(a/b), 대분수('1 1/4'), 천 단위 쉼표, 단위가 붙은 보기('63개') 인식
+- 결과: ok / fixed(정답 키만 틀림 → 계산이 맞는 보기로 교정) / no_answer(맞는 보기 없음) /
+  ambiguous(맞는 보기 2개 이상, 예: 1/2와 0.5) / duplicate_choices(같은 보기) / skipped(문장제, 부정 발문 등 판단 불가)
+- 오판으로 맞는 키를 바꾸지 않도록 애매하면 skipped (문항당 약 100~150µs)
+
+사용:
+    status, answer = verify_problem(problem, key_map[problem["number"]])
+"""
+
+import re
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+CHOICE_LABELS = ("A", "B", "C", "D")
+# 정답 키를 고치지 않고 그대로 두는 결과 / 문항 자체를 바꿔야 하는 결과
+BROKEN = ("no_answer", "ambiguous", "duplicate_choices")
+
+# 계산 값과 정답이 직접 대응하지 않는 발문 (아닌 것/틀린 것 고르기, 크기 비교, 어림, 자리 숫자 등)
+_SKIP_CUES = ("아닌", "틀린", "잘못", "다른", "없는", "가장", "큰", "작은", "어림", "약 ", "반올림", "올림", "버림",
+              "자리", "이상", "이하", "초과", "미만", "범위", "모두 고르")
+_UNKNOWN_RE = re.compile(r"[☐▢]|\(\s*\)")
+_SEGMENT_RE = re.compile(r"[0-9□(][0-9□ \t.,/+\-×÷*xX()=?]*")
+_TOKEN_RE = re.compile(r"\s*(?:(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)(?:\s*/\s*(\d+))?|([+\-×÷*xX()□]))")
+_CHOICE_RE = re.compile(r"^\s*(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)(?:\s+(\d+)\s*/\s*(\d+)|\s*/\s*(\d+))?\s*[가-힣a-zA-Z²³]*\s*$")
+_REMAINDER_RE = re.compile(r"^\s*몫\s*(?:은|:)?\s*(\d+)\s*[,/]?\s*나머지\s*(?:는|:)?\s*(\d+)\s*$")
+_OPS = "+-×÷"
+# 식을 뺀 본문(공백/문장부호/㉠㉡ 제거)이 이 중 하나와 일치해야 계산 문항으로 판단
+_INSTRUCTION_RE = re.compile(
+    r"(?:다음(?:식)?을)?계산(?:하세요|하시오)"
+    r"|(?:다음식)?의(?:값|계산결과)(?:은|는|을구하세요|을구하시오)(?:무엇입니까)?"
+    r"|(?:다음나눗셈)?의(?:몫과나머지|몫|나머지)(?:는|은|를구하세요|을구하세요|를구하시오|을구하시오)(?:무엇입니까)?"
+    r"|(?:일때)?□(?:에|안에)알맞은수(?:는|를구하세요|를구하시오)(?:무엇입니까)?"
+    r"|두식의(?:계산결과|값)의(?:합|차)(?:는|을구하세요|를구하세요|을구하시오|를구하시오)(?:무엇입니까)?"
+)
+_LEFTOVER_STRIP_RE = re.compile(r"[\s.,?!:;㉠㉡㉢㉣]")
+
+
+class _Unparsable(Exception):
+    pass
+
+
+def _number(text: str, denominator: Optional[str] = None) -> Fraction:
+    value = Fraction(text.replace(",", ""))
+    if denominator is not None:
+        if int(denominator) == 0:
+            raise _Unparsable(text)
+        value /= int(denominator)
+    return value
+
+
+def tokenize(expr: str) -> List[Any]:
+    """식 → [Fraction | 연산자 | '(' | ')' | '□'] (수 바로 뒤의 분수는 대분수로 합침)"""
+    tokens: List[Any] = []
+    pos = 0
+    expr = expr.rstrip(" \t.,")
+    while pos < len(expr):
+        m = _TOKEN_RE.match(expr, pos)
+        if not m:
+            if expr[pos:].strip():
+                raise _Unparsable(expr)
+            break
+        pos = m.end()
+        if m.group(1):
+            value = _number(m.group(1), m.group(2))
+            if (m.group(2) and tokens and isinstance(tokens[-1], Fraction) and tokens[-1].denominator == 1
+                    and value < 1):
+                tokens[-1] += value
+            elif tokens and isinstance(tokens[-1], Fraction):
+                raise _Unparsable(expr)
+            else:
+                tokens.append(value)
+        else:
+            op = m.group(3)
+            tokens.append("×" if op in "*xX" else op)
+    return tokens
+
+
+def evaluate(tokens: List[Any], unknown: Optional[Fraction] = None) -> Fraction:
+    """사칙연산 식 계산 (× ÷ 먼저, 괄호 지원, □는 unknown 값). 0으로 나누기/형식 오류는 _Unparsable"""
+    pos = 0
+
+    def atom():
+        nonlocal pos
+        if pos >= len(tokens):
+            raise _Unparsable("식이 끝남")
+        token = tokens[pos]
+        pos += 1
+        if isinstance(token, Fraction):
+            return token
+        if token == "□" and unknown is not None:
+            return unknown
+        if token == "(":
+            value = expression()
+            if pos >= len(tokens) or tokens[pos] != ")":
+                raise _Unparsable("괄호")
+            pos += 1
+            return value
+        raise _Unparsable(str(token))
+
+    def term():
+        nonlocal pos
+        value = atom()
+        while pos < len(tokens) and tokens[pos] in ("×", "÷"):
+            op = tokens[pos]
+            pos += 1
+            right = atom()
+            if op == "÷" and right == 0:
+                raise _Unparsable("0으로 나누기")
+            value = value * right if op == "×" else value / right
+        return value
+
+    def expression():
+        nonlocal pos
+        value = term()
+        while pos < len(tokens) and tokens[pos] in ("+", "-"):
+            op = tokens[pos]
+            pos += 1
+            value = value + term() if op == "+" else value - term()
+        return value
+
+    value = expression()
+    if pos != len(tokens):
+        raise _Unparsable("남은 토큰")
+    return value
+
+
+def parse_choice(text: str):
+    """보기 → Fraction, (몫, 나머지) 또는 None"""
+    m = _REMAINDER_RE.match(text or "")
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    m = _CHOICE_RE.match(text or "")
+    if not m:
+        return None
+    try:
+        value = _number(m.group(1), m.group(4))
+        if m.group(2):
+            if "." in m.group(1) or int(m.group(3)) == 0:
+                return None
+            value += Fraction(int(m.group(2)), int(m.group(3)))
+    except (_Unparsable, ValueError, ZeroDivisionError):
+        return None
+    return value
+
+
+def _questions(stem: str):
+    """본문의 식 → (식 목록[tokens], □ 방정식 목록[(왼쪽, 오른쪽)]). 값이 적힌 등식(풀이/사실)이 있으면 None"""
+    expressions, equations = [], []
+    leftover, open_ended = [], True
+    for line in _UNKNOWN_RE.sub("□", stem).replace("−", "-").replace("–", "-").splitlines():
+        pos = 0
+        for m in _SEGMENT_RE.finditer(line):
+            seg = m.group().strip(" \t.,")
+            if not any(op in seg for op in "+-×÷*xX="):
+                continue
+            leftover.append(line[pos:m.start()])
+            pos = m.end()
+            open_ended = open_ended and bool(re.search(r"=\s*[?□]$", seg))
+            sides = [s.strip() for s in seg.split("=")]
+            if len(sides) > 2:
+                return None
+            if len(sides) == 2 and sides[1] in ("?", ""):
+                sides = sides[:1]
+            if "?" in "".join(sides):
+                return None
+            tokens = [tokenize(s) for s in sides]
+            if not any(op in t for t in tokens for op in _OPS) and "□" not in tokens[0]:
+                continue
+            if len(tokens) == 1:
+                if "□" in tokens[0]:
+                    return None
+                expressions.append(tokens[0])
+            elif sum(t.count("□") for t in tokens) == 1:
+                equations.append((tokens[0], tokens[1]))
+            else:
+                return None
+        leftover.append(line[pos:])
+    # 문장제: 식 밖의 글은 계산 발문뿐이어야 함
+    rest = _LEFTOVER_STRIP_RE.sub("", "".join(leftover))
+    if not (expressions or equations):
+        return None
+    if rest and not _INSTRUCTION_RE.fullmatch(rest):
+        return None
+    if not rest and not open_ended:
+        return None
+    return expressions, equations
+
+
+def _matches(stem: str, choices: Dict[str, Any]) -> Optional[List[str]]:
+    """계산이 맞는 보기 라벨 목록 (판단할 수 없으면 None)"""
+    parsed = _questions(stem)
+    if parsed is None:
+        return None
+    expressions, equations = parsed
+    if equations:
+        if expressions or len(equations) > 1 or any(isinstance(v, tuple) for v in choices.values()):
+            return None
+        left, right = equations[0]
+        matched = []
+        for label, value in choices.items():
+            try:
+                if evaluate(left, value) == evaluate(right, value):
+                    matched.append(label)
+            except _Unparsable:
+                continue
+        return matched
+
+    values = [evaluate(e) for e in expressions]
+    remainder_choices = [isinstance(v, tuple) for v in choices.values()]
+    if len(values) == 1:
+        tokens = expressions[0]
+        if any(remainder_choices) or "몫" in stem or "나머지" in stem:
+            # a ÷ b (자연수)만: 몫과 나머지 / 몫 / 나머지
+            if len(tokens) != 3 or tokens[1] != "÷" or any(t.denominator != 1 for t in (tokens[0], tokens[2])):
+                return None
+            q, r = divmod(int(tokens[0]), int(tokens[2]))
+            if all(remainder_choices):
+                target = (q, r)
+            elif any(remainder_choices):
+                return None
+            elif "나머지" in stem and "몫" not in stem:
+                target = r
+            elif "몫" in stem and "나머지" not in stem:
+                target = q
+            else:
+                return None
+        else:
+            target = values[0]
+    elif len(values) == 2 and not any(remainder_choices):
+        if "차" in stem and "합" not in stem:
+            target = abs(values[0] - values[1])
+        elif "합" in stem and "차" not in stem:
+            target = values[0] + values[1]
+        else:
+            return None
+    else:
+        return None
+    return [label for label, value in choices.items() if value == target]
+
+
+def verify_problem(problem: Dict[str, Any], answer: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    문항 1개 검증 → (결과, 정답 라벨)
+    fixed면 계산이 맞는 보기 라벨, 그 외에는 원래 정답 키
+    """
+    texts = {c: " ".join(((problem.get("choices") or {}).get(c) or "").split()) for c in CHOICE_LABELS}
+    if all(texts.values()) and len(set(texts.values())) < 4:
+        return "duplicate_choices", answer
+    stem = problem.get("stem") or ""
+    if not all(texts.values()) or any(cue in stem for cue in _SKIP_CUES):
+        return "skipped", answer
+    choices = {c: parse_choice(t) for c, t in texts.items()}
+    if any(v is None for v in choices.values()):
+        return "skipped", answer
+    try:
+        matched = _matches(stem, choices)
+    except _Unparsable:
+        return "skipped", answer
+    if matched is None:
+        return "skipped", answer
+    if not matched:
+        return "no_answer", answer
+    if len(matched) > 1:
+        return "ambiguous", answer
+    return ("ok", answer) if matched[0] == answer else ("fixed", matched[0])
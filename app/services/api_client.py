@@ -0,0 +1,117 @@
+"""
+Streamlit → API 서버 HTTP 클라이언트
+- requests.Session 공유 (keep-alive 커넥션 풀 재사용, 요청마다 TCP 연결 생성 제거)
+- 연결/읽기 타임아웃 (API가 멈춰도 Streamlit 스크립트 스레드가 무한 대기하지 않음)
+- 멱등 요청(GET, idempotent=True 또는 idempotency_key를 지정한 POST)만 연결 오류/5xx 시 재시도
+  (idempotency_key는 Idempotency-Key 헤더로 전송 → 서버가 같은 키의 중복 요청에 처음 응답을 반환)
+- 큰 요청 본문은 gzip 압축 (응답은 Accept-Encoding: gzip)
+- 엔드포인트별 지연 시간 기록 (디버그 패널용)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote, urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "120"))
+RETRIES = int(os.getenv("API_RETRIES", "2"))
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "20"))
+# 이 크기(바이트) 이상인 요청 본문만 gzip 압축
+COMPRESS_MIN_BYTES = int(os.getenv("API_COMPRESS_MIN_BYTES", "1024"))
+
+_RETRY_STATUS = {502, 503, 504}
+_SAMPLES_PER_ENDPOINT = 200
+
+
+def idempotency_key(*parts: Any) -> str:
+    """요청 내용으로 만든 멱등 키 (같은 내용의 재전송 → 같은 키)"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:40]
+
+
+class APIClient:
+    def __init__(self, base_url: str, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 retries: int = RETRIES, pool_size: int = POOL_SIZE, compress_min_bytes: int = COMPRESS_MIN_BYTES):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.compress_min_bytes = compress_min_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip"})
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None, **path_params) -> requests.Response:
+        """endpoint: '/history/{child_id}' 형태의 경로 템플릿 (지연 시간 집계 키)"""
+        return self._request("GET", endpoint, path_params, params=params, timeout=timeout, idempotent=True)
+
+    def post(self, endpoint: str, json_body: Optional[Dict[str, Any]] = None, params: Optional[Dict[str, Any]] = None,
+             timeout: Optional[float] = None, idempotent: bool = False, idempotency_key: Optional[str] = None,
+             **path_params) -> requests.Response:
+        body = json.dumps(json_body or {}, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if idempotency_key:
+            # 서버가 같은 키의 결과를 재사용하므로 재시도해도 중복 실행되지 않음
+            headers["Idempotency-Key"] = idempotency_key
+            idempotent = True
+        if len(body) >= self.compress_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return self._request("POST", endpoint, path_params, params=params, data=body, headers=headers,
+                             timeout=timeout, idempotent=idempotent)
+
+    def _request(self, method: str, endpoint: str, path_params: Dict[str, Any], timeout: Optional[float] = None,
+                 idempotent: bool = False, **kwargs) -> requests.Response:
+        path = endpoint.format(**{k: quote(str(v), safe="") for k, v in path_params.items()})
+        url = urljoin(self.base_url, path)
+        timeout = (self.timeout[0], timeout) if timeout is not None else self.timeout
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            start = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(f"{method} {endpoint}", time.perf_counter() - start, error=True)
+                if attempt + 1 >= attempts:
+                    raise
+            else:
+                failed = resp.status_code >= 500
+                self._record(f"{method} {endpoint}", time.perf_counter() - start, error=failed)
+                if resp.status_code not in _RETRY_STATUS or attempt + 1 >= attempts:
+                    return resp
+            time.sleep(min(0.2 * (2 ** attempt), 2.0))
+
+    def _record(self, key: str, elapsed: float, error: bool = False):
+        with self._lock:
+            stat = self._stats.setdefault(key, {"calls": 0, "errors": 0, "samples": deque(maxlen=_SAMPLES_PER_ENDPOINT)})
+            stat["calls"] += 1
+            stat["errors"] += int(error)
+            stat["samples"].append(elapsed * 1000)
+
+    def latency_stats(self) -> List[Dict[str, Any]]:
+        """엔드포인트별 호출 수/오류 수/지연 시간(ms, 최근 샘플 기준)"""
+        rows = []
+        with self._lock:
+            for key, stat in sorted(self._stats.items()):
+                samples = sorted(stat["samples"])
+                rows.append({
+                    "endpoint": key,
+                    "calls": stat["calls"],
+                    "errors": stat["errors"],
+                    "p50_ms": round(samples[len(samples) // 2], 1),
+                    "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+                    "last_ms": round(stat["samples"][-1], 1),
+                })
+        return rows
@@ -0,0 +1,368 @@
+"""
+계산 단원 문항 생성기 (LLM 호출 없음)
+덧셈/뺄셈/곱셈/나눗셈/혼합 계산/분수·소수 계산처럼 지문 없이 계산만 하는 단원은 시드 고정 템플릿으로 문항을 만듭니다.
+- 출력: materials.txt와 같은 [Worksheet] / ## 섹션 / [Problem n] / Choices: / [AnswerKey] 형식 (LLM 생성 결과와 같은 (lesson, [materials]))
+- 구간: 기본(계산) / 추론(□ 구하기) / 응용(세 수 계산) / 중고급(두 식 결과의 차)
+- 오답 보기: 흔한 실수 (받아올림/받아내림 누락, 역연산 혼동, 계산 순서 무시, 분모끼리 더하기, 구구단 한 줄 차이 등)
+- batch(): 많은 문항을 한 번에 생성 (numpy가 있으면 조건 있는 덧셈/뺄셈의 피연산자 추출을 벡터화) → 문제 은행 채우기용
+문장제는 다루지 않습니다 (LLM 담당).
+"""
+
+import random
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 순수 파이썬 추출 사용
+    np = None
+
+from app.services.azure_openai_service import DIFFICULTY_BANDS
+from app.services.problem_bank_service import render_worksheet
+
+CHOICE_LABELS = ("A", "B", "C", "D")
+
+# (학년, 학기, 단원) → 연산 규칙
+#   ops: 사용할 연산 (+ - × ÷), a/b: 피연산자 범위, max/min: 결과 범위,
+#   carry: False면 받아올림/받아내림 없음, True면 반드시 있음, remainder: 나눗셈 나머지 허용
+#   kind: int(기본) | frac(같은 분모) | frac_mixed(다른 분모) | decimal(places 자리)
+UNIT_SPECS: Dict[Tuple[int, int, str], Dict[str, Any]] = {
+    (1, 1, "덧셈과 뺄셈"): {"ops": "+-", "a": (1, 9), "b": (1, 9), "max": 9},
+    (1, 2, "세 수의 덧셈·뺄셈 및 10만들기"): {"ops": "+-", "a": (1, 9), "b": (1, 9), "max": 10},
+    (1, 2, "합이 10보다 큰 두 수의 덧셈"): {"ops": "+", "a": (2, 9), "b": (2, 9), "min": 11},
+    (1, 2, "받아올림 없는 두 자리 수 덧셈과 뺄셈"): {"ops": "+-", "a": (10, 89), "b": (1, 59), "max": 99, "carry": False},
+    (2, 1, "덧셈과 뺄셈"): {"ops": "+-", "a": (10, 89), "b": (5, 79), "max": 99, "carry": True},
+    (2, 1, "곱셈"): {"ops": "×", "a": (2, 5), "b": (1, 9)},
+    (2, 2, "곱셈구구"): {"ops": "×", "a": (2, 9), "b": (1, 9)},
+    (3, 1, "덧셈과 뺄셈"): {"ops": "+-", "a": (100, 899), "b": (100, 799), "max": 999},
+    (3, 1, "나눗셈"): {"ops": "÷", "a": (2, 9), "b": (1, 9)},
+    (3, 1, "곱셈"): {"ops": "×", "a": (11, 99), "b": (2, 9)},
+    (3, 2, "곱셈"): {"ops": "×", "a": (101, 999), "b": (2, 9)},
+    (3, 2, "나눗셈"): {"ops": "÷", "a": (2, 9), "b": (3, 19), "remainder": True},
+    (4, 1, "곱셈과 나눗셈"): {"ops": "×÷", "a": (12, 99), "b": (11, 40)},
+    (4, 2, "분수의 덧셈과 뺄셈"): {"ops": "+-", "kind": "frac", "den": (3, 12)},
+    (4, 2, "소수의 덧셈과 뺄셈"): {"ops": "+-", "kind": "decimal", "places": 2, "a": (1, 999), "b": (1, 999)},
+    (5, 1, "자연수의 혼합 계산"): {"ops": "+-×÷", "a": (2, 30), "b": (2, 12), "mixed": True},
+    (5, 1, "분수의 덧셈과 뺄셈"): {"ops": "+-", "kind": "frac_mixed", "den": (2, 10)},
+    (5, 2, "분수의 곱셈"): {"ops": "×", "kind": "frac_mixed", "den": (2, 9)},
+    (5, 2, "소수의 곱셈"): {"ops": "×", "kind": "decimal", "places": 1, "a": (2, 99), "b": (2, 20)},
+    (6, 1, "분수의 나눗셈"): {"ops": "÷", "kind": "frac_mixed", "den": (2, 9)},
+    (6, 2, "분수의 나눗셈"): {"ops": "÷", "kind": "frac_mixed", "den": (2, 9)},
+    (6, 1, "소수의 나눗셈"): {"ops": "÷", "kind": "decimal", "places": 1, "a": (2, 9), "b": (2, 30)},
+    (6, 2, "소수의 나눗셈"): {"ops": "÷", "kind": "decimal", "places": 2, "a": (2, 9), "b": (2, 99)},
+}
+
+_APPLY = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "×": lambda x, y: x * y,
+    "÷": lambda x, y: Fraction(x) / Fraction(y),
+}
+
+
+def apply(op: str, x, y):
+    """정확한 계산 (나눗셈은 Fraction), 정수가 되는 결과는 int"""
+    value = _APPLY[op](x, y)
+    if isinstance(value, Fraction) and value.denominator == 1:
+        return int(value)
+    return value
+
+
+def find_spec(grade: int, semester: int, unit: Optional[str]) -> Optional[Dict[str, Any]]:
+    return UNIT_SPECS.get((grade, semester, (unit or "").strip()))
+
+
+def supports(grade: int, semester: int, unit: Optional[str]) -> bool:
+    """계산 단원이면 True (LLM 없이 생성 가능)"""
+    return find_spec(grade, semester, unit) is not None
+
+
+def format_number(value, places: int = 0) -> str:
+    """정수 → '12', 분수 → '3/4' 또는 대분수 '1 1/4', 소수 단원(places > 0) → '3.25'"""
+    value = Fraction(value)
+    if value.denominator == 1:
+        return str(value.numerator)
+    if places:
+        text = f"{float(value):.{places}f}".rstrip("0").rstrip(".")
+        return text
+    whole, rest = divmod(value.numerator, value.denominator)
+    if whole and value > 0:
+        return f"{whole} {rest}/{value.denominator}"
+    return f"{value.numerator}/{value.denominator}"
+
+
+def _no_carry(a: int, b: int, op: str) -> bool:
+    """자리별로 받아올림(덧셈)/받아내림(뺄셈)이 없는지"""
+    while a or b:
+        da, db = a % 10, b % 10
+        if (op == "+" and da + db >= 10) or (op == "-" and da < db):
+            return False
+        a, b = a // 10, b // 10
+    return True
+
+
+def _digitwise(a: int, b: int, op: str) -> int:
+    """받아올림 무시(자리별 합의 일의 자리만) / 받아내림 대신 큰 수에서 작은 수를 뺀 결과 (대표적인 실수)"""
+    result, place = 0, 1
+    while a or b:
+        da, db = a % 10, b % 10
+        digit = (da + db) % 10 if op == "+" else abs(da - db)
+        result += digit * place
+        a, b, place = a // 10, b // 10, place * 10
+    return result
+
+
+class ArithmeticGenerator:
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    # ===== 피연산자 =====
+    def _int_operands(self, spec: Dict[str, Any], op: str) -> Tuple[Any, Any]:
+        rng = self.rng
+        if spec.get("kind") == "decimal":
+            scale = 10 ** spec["places"]
+            if op == "÷":
+                # 나누어떨어지는 소수 ÷ 자연수
+                divisor, quotient = rng.randint(*spec["a"]), Fraction(rng.randint(*spec["b"]), scale)
+                return quotient * divisor, Fraction(divisor)
+            if op == "×":
+                return Fraction(rng.randint(*spec["a"]), 10), Fraction(rng.randint(*spec["b"]))
+            a, b = Fraction(rng.randint(*spec["a"]), scale), Fraction(rng.randint(*spec["b"]), scale)
+            return (max(a, b), min(a, b)) if op == "-" else (a, b)
+        if spec.get("kind") in ("frac", "frac_mixed"):
+            lo, hi = spec["den"]
+            d1 = rng.randint(lo, hi)
+            d2 = d1 if spec["kind"] == "frac" else rng.choice([d for d in range(lo, hi + 1) if d != d1] or [d1])
+            a, b = Fraction(rng.randint(1, d1 - 1), d1), Fraction(rng.randint(1, d2 - 1), d2)
+            if op == "-" and a < b:
+                a, b = b, a
+            if op == "-" and a == b:
+                a += 1
+            return a, b
+        if op == "÷":
+            divisor, quotient = rng.randint(*spec["a"]), rng.randint(*spec["b"])
+            return divisor * quotient, divisor
+        for _ in range(200):
+            a, b = rng.randint(*spec["a"]), rng.randint(*spec["b"])
+            if op == "-" and a < b:
+                a, b = b, a
+            if self._valid(spec, op, a, b):
+                return a, b
+        return spec["a"][0], spec["b"][0]
+
+    @staticmethod
+    def _valid(spec: Dict[str, Any], op: str, a: int, b: int) -> bool:
+        result = apply(op, a, b)
+        if op == "-" and result <= 0:
+            return False
+        if op == "+" and (result > spec.get("max", result) or result < spec.get("min", result)):
+            return False
+        if op in "+-" and "carry" in spec and _no_carry(a, b, op) == spec["carry"]:
+            return False
+        return True
+
+    # ===== 오답 =====
+    def _distractors(self, spec: Dict[str, Any], answer, mistakes: List[Any]) -> List[str]:
+        """흔한 실수 값 우선, 모자라면 정답 근처 값 (정답과 다르고 0 이상, 표기가 서로 다른 3개)"""
+        places = spec.get("places", 0)
+        step = Fraction(1, 10 ** places) if places else (Fraction(1, Fraction(answer).denominator) if Fraction(answer).denominator > 1 else 1)
+        near = [answer + step, answer - step, answer + 10 * step, answer - 10 * step, answer + 2 * step, answer - 2 * step]
+        self.rng.shuffle(near)
+        seen = {format_number(answer, places)}
+        picked = []
+        integers_only = not spec.get("kind")
+        for value in list(mistakes) + near + [answer + k * step for k in range(3, 30)]:
+            if value is None or value < 0 or (integers_only and Fraction(value).denominator != 1):
+                continue
+            text = format_number(value, places)
+            if text not in seen:
+                seen.add(text)
+                picked.append(text)
+            if len(picked) == 3:
+                break
+        return picked
+
+    def _mistakes(self, op: str, a, b, answer) -> List[Any]:
+        if op in "+-" and isinstance(a, int) and isinstance(b, int):
+            return [_digitwise(a, b, op), answer + (10 if op == "-" else -10), apply("-" if op == "+" else "+", a, b)]
+        if op in "+-":
+            a, b = Fraction(a), Fraction(b)
+            if a.denominator != b.denominator:
+                # 분자끼리, 분모끼리 계산
+                return [Fraction(abs(apply(op, a.numerator, b.numerator)), a.denominator + b.denominator),
+                        Fraction(apply(op, a.numerator, b.numerator), max(a.denominator, b.denominator))]
+            return [Fraction(apply(op, a.numerator, b.numerator), a.denominator * 2), apply("-" if op == "+" else "+", a, b)]
+        if op == "×":
+            if isinstance(a, int) and isinstance(b, int):
+                # 구구단 한 줄 차이, 곱 대신 합
+                return [answer + a, answer - a, a + b]
+            return [a + b, Fraction(a) * Fraction(b) * 10, Fraction(a) * Fraction(b) / 10]
+        # ÷: 몫 ±1, 나누는 수와 나뉘는 수를 바꾼 계산
+        return [answer + 1, answer - 1, Fraction(b) / Fraction(a)]
+
+    # ===== 문항 =====
+    def problem(self, grade: int, semester: int, unit: str, band: str, op: Optional[str] = None,
+                operands: Optional[Tuple] = None) -> Optional[Dict[str, Any]]:
+        """문항 1개 → {stem, choices, answer, band} (계산 단원이 아니면 None, op/operands는 batch에서 지정)"""
+        spec = find_spec(grade, semester, unit)
+        if spec is None:
+            return None
+        rng = self.rng
+        places = spec.get("places", 0)
+        if spec.get("mixed") and band == "applied":
+            return self._mixed_order(spec, band)
+        op = op or rng.choice(spec["ops"])
+        a, b = operands if operands is not None else self._int_operands(spec, op)
+        fmt = lambda v: format_number(v, places)
+
+        if op == "÷" and spec.get("remainder") and band == "basic":
+            a += rng.randint(1, b - 1)
+            q, r = divmod(a, b)
+            stem = f"다음 나눗셈의 몫과 나머지를 구하세요.\n{a} ÷ {b}"
+            text = lambda qq, rr: f"몫 {qq}, 나머지 {rr}"
+            options = [text(q, r)]
+            for qq, rr in [(q + 1, r), (q, r + 1) if r + 1 < b else (q - 1, r + b), (q - 1, r), (q, b - r), (q + 1, r - 1)]:
+                candidate = text(qq, rr)
+                if qq >= 0 and 0 <= rr and candidate not in options:
+                    options.append(candidate)
+            return self._finish(stem, options[0], options[1:4], band)
+
+        answer = apply(op, a, b)
+        if band == "basic":
+            stem = f"다음을 계산하세요.\n{fmt(a)} {op} {fmt(b)} = ?"
+            return self._finish(stem, fmt(answer), self._distractors(spec, answer, self._mistakes(op, a, b, answer)), band)
+
+        if band == "reasoning":
+            # □ op b = answer → □ = a (역연산을 반대로 적용한 값이 대표 오답)
+            inverse_wrong = apply(op, answer, b)
+            stem = f"□ {op} {fmt(b)} = {fmt(answer)}일 때, □에 알맞은 수는 무엇입니까?"
+            return self._finish(stem, fmt(a), self._distractors(spec, a, [inverse_wrong, answer]), band)
+
+        # 세 번째 수: 같은 단원 규칙으로 하나 더
+        op2 = rng.choice(spec["ops"])
+        c = self._third(spec, op2, answer)
+        if c is None:
+            op2, c = "+", self._int_operands(spec, "+")[1]
+        if band == "applied":
+            # 앞에서부터 계산 (혼합 계산 단원이 아니면 연산 우선순위가 같은 조합)
+            value = apply(op2, answer, c)
+            if value < 0:
+                return self.problem(grade, semester, unit, band)
+            if op in "+-" and op2 in "×÷":
+                stem = f"다음을 계산하세요.\n({fmt(a)} {op} {fmt(b)}) {op2} {fmt(c)} = ?"
+            else:
+                stem = f"다음을 계산하세요.\n{fmt(a)} {op} {fmt(b)} {op2} {fmt(c)} = ?"
+            return self._finish(stem, fmt(value), self._distractors(spec, value, self._mistakes(op2, answer, c, value)), band)
+
+        # advanced: 두 식의 계산 결과의 차 (차 대신 합이 대표 오답)
+        a2, b2 = self._int_operands(spec, op)
+        other = apply(op, a2, b2)
+        if other == answer:
+            return self.problem(grade, semester, unit, band)
+        diff = abs(answer - other)
+        stem = f"두 식의 계산 결과의 차를 구하세요.\n㉠ {fmt(a)} {op} {fmt(b)}\n㉡ {fmt(a2)} {op} {fmt(b2)}"
+        return self._finish(stem, fmt(diff), self._distractors(spec, diff, [answer + other, answer, other]), band)
+
+    def _mixed_order(self, spec: Dict[str, Any], band: str) -> Dict[str, Any]:
+        """혼합 계산: a ± b ×(÷) c → 곱셈/나눗셈 먼저. 앞에서부터 계산한 값이 대표 오답"""
+        rng = self.rng
+        op, op2 = rng.choice("+-"), rng.choice("×÷")
+        while True:
+            b = rng.randint(*spec["a"])
+            c = self._third(spec, op2, b) if op2 == "÷" else rng.randint(*spec["b"])
+            if c is None:
+                continue
+            product = apply(op2, b, c)
+            a = rng.randint(*spec["a"]) + (product if op == "-" else 0)
+            value = apply(op, a, product)
+            left_to_right = apply(op2, apply(op, a, b), c)
+            if value > 0:
+                break
+        stem = f"다음을 계산하세요.\n{a} {op} {b} {op2} {c} = ?"
+        return self._finish(stem, format_number(value), self._distractors(spec, value, [left_to_right, value + c, value - 1]), band)
+
+    def _third(self, spec: Dict[str, Any], op: str, left):
+        """left op c가 단원 범위(음수 없음, 나누어떨어짐, 소수는 places 자리 안에서 끝남)에 맞는 c"""
+        rng = self.rng
+        if op == "÷":
+            if isinstance(left, int) or Fraction(left).denominator == 1:
+                divisors = [d for d in range(2, 10) if int(left) % d == 0]
+            elif spec.get("kind") == "decimal":
+                scale = 10 ** spec["places"]
+                divisors = [d for d in range(2, 10) if (Fraction(left) * scale / d).denominator == 1]
+            else:
+                return self._int_operands(spec, "÷")[1]
+            return rng.choice(divisors) if divisors else None
+        for _ in range(20):
+            c = self._int_operands(spec, op)[1]
+            if op != "-" or left - c > 0:
+                return c
+        return None
+
+    def _finish(self, stem: str, answer_text: str, distractors: List[str], band: str) -> Dict[str, Any]:
+        options = [answer_text] + distractors[:3]
+        self.rng.shuffle(options)
+        choices = dict(zip(CHOICE_LABELS, options))
+        answer = CHOICE_LABELS[options.index(answer_text)]
+        return {"stem": stem, "choices": choices, "answer": answer, "band": band}
+
+    # ===== 학습지 / 묶음 =====
+    def worksheet(self, grade: int, semester: int, unit: str, mix: Dict[str, int]) -> Optional[Tuple[str, List[str]]]:
+        """구간 구성(mix)대로 학습지 생성 → (lesson, [materials_text]) (LLM 생성 결과와 같은 형태)"""
+        if find_spec(grade, semester, unit) is None:
+            return None
+        problems = [self.problem(grade, semester, unit, band) for band in DIFFICULTY_BANDS for _ in range(int(mix.get(band, 0)))]
+        content = render_worksheet(problems)
+        lesson = f"[{grade}학년 {semester}학기] {unit.strip()}\n\n{content}"
+        return lesson, [content.split("[Worksheet]", 1)[1].strip()]
+
+    def batch(self, grade: int, semester: int, unit: str, band: str, n: int) -> List[Dict[str, Any]]:
+        """
+        문항 n개 일괄 생성 (문제 은행 채우기용)
+        numpy가 있고 결과 범위/받아올림 조건이 있는 정수 단원의 덧셈/뺄셈은 피연산자를 배열로 한 번에 뽑아 조건으로 거른 뒤 문항만 조립
+        (조건에 걸러지는 쌍이 많은 덧셈/뺄셈만 빨라짐, 곱셈/나눗셈은 문항별 추출이 더 빠름)
+        """
+        spec = find_spec(grade, semester, unit)
+        if spec is None:
+            return []
+        filtered = any(k in spec for k in ("carry", "max", "min"))
+        if np is None or not filtered or spec.get("kind") or spec.get("remainder") or band not in ("basic", "reasoning"):
+            return [self.problem(grade, semester, unit, band) for _ in range(n)]
+        problems = []
+        seed = self.rng.randrange(2 ** 32)
+        for op, count in zip(spec["ops"], _split(n, len(spec["ops"]))):
+            if op not in "+-":
+                problems.extend(self.problem(grade, semester, unit, band, op=op) for _ in range(count))
+                continue
+            operands = _sample_int_operands(spec, op, count, np.random.default_rng(seed))
+            problems.extend(self.problem(grade, semester, unit, band, op=op, operands=(a, b)) for a, b in operands)
+        return problems
+
+
+def _split(n: int, parts: int) -> List[int]:
+    return [n // parts + (1 if i < n % parts else 0) for i in range(parts)]
+
+
+def _sample_int_operands(spec: Dict[str, Any], op: str, n: int, rng) -> List[Tuple[int, int]]:
+    """덧셈/뺄셈 정수 피연산자 n쌍을 배열 연산으로 추출 (범위/받아올림 조건을 만족하는 쌍만, 모자라면 다시 추출)"""
+    out = []
+    while len(out) < n:
+        size = max(64, (n - len(out)) * 4)
+        a = rng.integers(spec["a"][0], spec["a"][1] + 1, size)
+        b = rng.integers(spec["b"][0], spec["b"][1] + 1, size)
+        if op == "-":
+            a, b = np.maximum(a, b), np.minimum(a, b)
+        result = a + b if op == "+" else a - b
+        keep = result > 0
+        if op == "+":
+            keep &= (result <= spec.get("max", np.iinfo(np.int64).max)) & (result >= spec.get("min", 0))
+        if "carry" in spec:
+            no_carry = np.ones(size, dtype=bool)
+            x, y = a.copy(), b.copy()
+            while (x | y).any():
+                dx, dy = x % 10, y % 10
+                no_carry &= (dx + dy < 10) if op == "+" else (dx >= dy)
+                x, y = x // 10, y // 10
+            keep &= no_carry != spec["carry"]
+        out.extend(zip(a[keep].tolist(), b[keep].tolist()))
+    return out[:n]
@@ -1,24 +1,154 @@
 from openai import AzureOpenAI
 from jinja2 import Environment, FileSystemLoader
 import os
-import uuid
+import re
 from dotenv import load_dotenv
-# from langfuse import Langfuse, Trace  # langfuse 관련 import 제거
-
-# langfuse = Langfuse(
-#     public_key="pk-lf-0aac3129-100a-4e8f-bac7-7d66539e16ae",
-#     secret_key="sk-lf-f12705b9-29ae-4533-a55d-e7831edb36ae",
-#     host="https://us.cloud.langfuse.com"  # 또는 클라우드 주소
-# )
+import time
+from app.services.tracing import span, record_usage
+from app.services.metrics import LLM_LATENCY, LLM_ERRORS, LLM_TOKENS, LLM_COST, RETRIES
+from app.services.model_router import ModelRouter
+from app.services import llm_replay
+from app.services import explanation_batcher
 
 # Jinja2 템플릿 로더 설정
 template_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'prompts')
 env = Environment(loader=FileSystemLoader(template_dir))
 
+# 학습지 난이도 구간 (materials.txt의 섹션 순서: 기본 3 / 추론 2 / 응용-기본 3 / 응용-중고급 2)
+DIFFICULTY_BANDS = ("basic", "reasoning", "applied", "advanced")
+# 구간별 섹션 제목 (band_from_header가 같은 구간으로 읽는 제목)
+BAND_HEADERS = {
+    "basic": "기본 이해도",
+    "reasoning": "추론/사고력",
+    "applied": "응용(이전 개념 혼합) - 기본",
+    "advanced": "응용 - 중고급",
+}
+
+
+def band_from_header(header: str):
+    """'## 추론/사고력 (2문제)' 같은 섹션 제목에서 난이도 구간 판별"""
+    if "중고급" in header or "고급" in header:
+        return "advanced"
+    if "응용" in header:
+        return "applied"
+    if "추론" in header or "사고" in header:
+        return "reasoning"
+    if "기본" in header:
+        return "basic"
+    return None
+
+
+def default_band(number: int) -> str:
+    """섹션 제목이 없을 때 문항 번호로 난이도 구간 추정"""
+    if number <= 3:
+        return "basic"
+    if number <= 5:
+        return "reasoning"
+    if number <= 8:
+        return "applied"
+    return "advanced"
+
+
+def parse_worksheet_and_key(materials_text: str):
+    """학습지 텍스트 → (문항 목록[{number, stem, band, choices}], 정답 맵{번호: 보기})"""
+    worksheet = materials_text
+    answer_key = ""
+    if "[Worksheet]" in materials_text:
+        parts = materials_text.split("[Worksheet]")
+        worksheet = parts[-1]
+    if "[AnswerKey]" in worksheet:
+        wk, ak = worksheet.split("[AnswerKey]", 1)
+        worksheet = wk.strip()
+        answer_key = ak.strip()
+
+    # Parse problems
+    problems = []
+    pattern = re.compile(r"\[Problem\s*(\d+)\]\s*", re.IGNORECASE)
+    matches = list(pattern.finditer(worksheet))
+    # 섹션 제목(## ...) 위치 → 난이도 구간
+    headers = [(h.start(), band_from_header(h.group(1))) for h in re.finditer(r"^\s*##\s*(.+)$", worksheet, re.MULTILINE)]
+    for idx, m in enumerate(matches):
+        start = m.end()
+        end = matches[idx+1].start() if idx+1 < len(matches) else len(worksheet)
+        block = worksheet[start:end].strip()
+        number = int(m.group(1)) if m.group(1).isdigit() else (idx+1)
+        # split stem and choices
+        stem = block
+        choices_block = ""
+        if "Choices:" in block:
+            parts2 = block.split("Choices:", 1)
+            stem = parts2[0].strip()
+            choices_block = parts2[1]
+        def pick(label):
+            mm = re.search(rf"\b{label}\)\s*(.+)", choices_block)
+            return mm.group(1).strip() if mm else ""
+        # 다음 섹션 제목이 이전 문항 블록 끝에 붙는 경우 제거
+        stem = re.split(r"^\s*##\s", stem, maxsplit=1, flags=re.MULTILINE)[0].strip()
+        band = None
+        for pos, header_band in headers:
+            if pos < m.start() and header_band:
+                band = header_band
+        problems.append({
+            "number": number,
+            "stem": stem,
+            "band": band or default_band(number),
+            "choices": {
+                "A": pick("A"),
+                "B": pick("B"),
+                "C": pick("C"),
+                "D": pick("D"),
+            }
+        })
+
+    # Parse answer key lines like: 1) A
+    key_map = {}
+    for line in answer_key.splitlines():
+        line = line.strip()
+        mm = re.match(r"(\d+)\)\s*([ABCD])", line, re.IGNORECASE)
+        if mm:
+            key_map[int(mm.group(1))] = mm.group(2).upper()
+
+    return problems, key_map
+
+
+def parse_explanations(text: str) -> dict:
+    """'n) 해설: ...' 줄 → {번호: 해설}"""
+    exp_map = {}
+    for line in (text or "").splitlines():
+        m = re.match(r"(\d+)\)\s*해설\s*:\s*(.+)", line.strip())
+        if m:
+            exp_map[int(m.group(1))] = m.group(2).strip()
+    return exp_map
+
+
+# ===== 응답 검증 (mini 배포 응답이 실패하면 large로 재호출) =====
+def is_nonempty(text: str) -> bool:
+    return bool((text or "").strip())
+
+
+def is_valid_worksheet(text: str) -> bool:
+    """문항이 있고 모든 문항에 본문, 4지선다 선택지(A~D 모두 비어 있지 않음)와 정답 키가 있는지"""
+    problems, key_map = parse_worksheet_and_key(text or "")
+    return bool(problems) and all(p["stem"] and all(p["choices"].values()) and p["number"] in key_map for p in problems)
+
+
+def first_valid_problem(text: str):
+    """응답의 첫 번째 완전한 문항(본문, 보기 4개, 정답) → {stem, choices, answer} 또는 None"""
+    problems, key_map = parse_worksheet_and_key(text or "")
+    for p in problems:
+        if p["stem"] and all(p["choices"].values()) and key_map.get(p["number"]):
+            return {"stem": p["stem"], "choices": p["choices"], "answer": key_map[p["number"]]}
+    return None
+
+
+def is_feedback_report(text: str) -> bool:
+    """feedback_summary 템플릿의 필수 섹션 포함 여부"""
+    return "종합 학습 리포트" in (text or "") and "추천 학습 방향" in text
 
 
 class AzureOpenAIService:
-    def __init__(self, endpoint, key, dep_curriculum, dep_embed):
+    def __init__(self, endpoint, key, dep_curriculum, dep_embed, usage_ledger=None, budget_guard=None, dep_mini=None,
+                 replay=None):
         dotenv_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
         load_dotenv(dotenv_path)
         
@@ -31,6 +161,87 @@ class AzureOpenAIService:
         
         self.dep_curriculum = dep_curriculum
         self.dep_embed = dep_embed
+        # usage 원장(UsageLedger)/예산 가드(BudgetGuard), 없으면 기록/전환하지 않음
+        self.usage_ledger = usage_ledger
+        self.budget_guard = budget_guard
+        # 작업별 배포 선택: 학습지 출제는 large, 짧은 저부담 작업은 mini (dep_mini 미설정 시 모두 large)
+        self.router = ModelRouter(dep_curriculum, dep_mini)
+        # LLM 호출 기록/재생 (LLM_REPLAY_MODE=record|replay, 기본 off)
+        self.replay = replay if replay is not None else llm_replay.from_env()
+        # 해설 요청 묶음 처리 (EXPLAIN_BATCH=1, 기본 off면 None → 제출마다 개별 호출)
+        self.explanation_batcher = explanation_batcher.from_env(self._explain)
+
+    def _chat(self, name: str, messages: list, model: str = None, validate=None, **kwargs):
+        """
+        모든 chat 호출의 공통 경로: 호출 1회 = span 1개 (모델/토큰 수 기록) + 지연 시간/토큰 메트릭
+        model 생략 시 작업(name)별 라우팅. validate(본문)가 False면 large 배포로 1회 재호출
+        """
+        deployment = self._route(name, model or self.router.deployment_for(name))
+        resp = self._chat_once(name, messages, deployment, **kwargs)
+        if validate is not None and not validate(resp.choices[0].message.content or ""):
+            escalated = self.router.escalation_for(name, deployment)
+            escalated = self._route(name, escalated) if escalated else None
+            if escalated and escalated != deployment:
+                print(f"[model_router] {name}: {deployment} 응답 검증 실패 → {escalated}")
+                RETRIES.inc(name, "escalate")
+                resp = self._chat_once(name, messages, escalated, **kwargs)
+        return resp
+
+    def _route(self, name: str, deployment: str) -> str:
+        if self.budget_guard is not None:
+            # 예산 초과 시 저가 배포로 전환 (또는 BudgetExceededError → 호출부가 캐시된 결과 사용)
+            return self.budget_guard.route(name, deployment)
+        return deployment
+
+    def _chat_once(self, name: str, messages: list, model: str, **kwargs):
+        with span(f"llm.{name}", kind="llm", model=model) as s:
+            resp = self._observe(name, model, lambda: self._create(
+                "chat", name, self.client.chat.completions.create, model=model, messages=messages, **kwargs))
+            record_usage(s, getattr(resp, "usage", None))
+            return resp
+
+    def _embed(self, name: str, texts):
+        """모든 임베딩 호출의 공통 경로 (입력 건수/토큰 수 기록)"""
+        with span(f"embedding.{name}", kind="embedding", model=self.dep_embed,
+                  inputs=len(texts) if isinstance(texts, list) else 1) as s:
+            resp = self._observe(f"embedding.{name}", self.dep_embed, lambda: self._create(
+                "embeddings", f"embedding.{name}", self.client.embeddings.create, input=texts, model=self.dep_embed))
+            record_usage(s, getattr(resp, "usage", None))
+            return resp
+
+    def _create(self, kind: str, call: str, create, **request):
+        """실제 API 호출 (기록/재생 모드면 LLMReplay 경유)"""
+        if self.replay is None:
+            return create(**request)
+        return self.replay.call(kind, call, create, request)
+
+    def _replaying(self) -> bool:
+        return self.replay is not None and self.replay.mode == "replay"
+
+    def _observe(self, call: str, deployment: str, fn):
+        start = time.perf_counter()
+        try:
+            resp = fn()
+        except Exception:
+            LLM_ERRORS.inc(deployment, call)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            LLM_LATENCY.observe(elapsed, deployment, call)
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.inc(deployment, call, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+            LLM_TOKENS.inc(deployment, call, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+            # 재생 응답은 실제 비용이 없으므로 원장/예산에 넣지 않음 (재생 벤치가 비용을 부풀리거나 예산 가드 모드를 바꾸지 않도록)
+            if self.usage_ledger is not None and not self._replaying():
+                try:
+                    cost = self.usage_ledger.record(call, deployment, usage, elapsed * 1000, model=getattr(resp, "model", None))
+                    LLM_COST.inc(deployment, call, amount=cost)
+                    if self.budget_guard is not None:
+                        self.budget_guard.add(cost)
+                except Exception as e:
+                    print(f"[usage] 원장 기록 실패 ({call}): {e}")
+        return resp
 
     def get_initial_curriculum(self, profile):
         """아동 프로필 기반 초기 학습 주제 생성"""
@@ -40,22 +251,20 @@ class AzureOpenAIService:
             grade=profile.grade,
             semester=profile.semester
         )
-        resp = self.client.chat.completions.create(
-            model=self.dep_curriculum,
+        resp = self._chat(
+            "initial_curriculum",
             messages=[
                 {"role": "system", "content": "초등 수학 교육과정 생성 AI"},
                 {"role": "user",   "content": prompt}
-            ]
+            ],
+            validate=is_nonempty
         )
         return resp.choices[0].message.content.strip()
 
     def get_embedding(self, text: str) -> list:
         """텍스트를 임베딩 벡터로 변환"""
         try:
-            response = self.client.embeddings.create(
-                input=text,
-                model=self.dep_embed
-            )
+            response = self._embed("single", text)
             embedding = response.data[0].embedding
             return embedding
         except Exception as e:
@@ -63,13 +272,20 @@ class AzureOpenAIService:
             print(f"Error: {e}")
             raise e
 
+    def get_embeddings(self, texts: list) -> list:
+        """여러 텍스트를 한 번의 요청으로 임베딩 (입력 순서 유지)"""
+        if not texts:
+            return []
+        response = self._embed("batch", list(texts))
+        return [item.embedding for item in sorted(response.data, key=lambda d: getattr(d, "index", 0))]
+
     def generate_materials(self, curriculum_text: str, docs: list):
         """커리큘럼 및 유사 자료를 바탕으로 교재 및 평가 문제 생성"""
         tmpl = env.get_template("materials.txt")
         # 구버전 호환용: curriculum/doc 기반 렌더링은 더 이상 사용하지 않음
         prompt = tmpl.render(grade=0, semester=0, topic="")
-        resp = self.client.chat.completions.create(
-            model=self.dep_curriculum,
+        resp = self._chat(
+            "generate_materials",
             messages=[
                 {"role": "system", "content": "교재 생성 AI"},
                 {"role": "user",   "content": prompt}
@@ -181,16 +397,19 @@ class AzureOpenAIService:
         banned_terms_expanded = self._expand_terms(banned)
         for attempt in range(max_retry + 1):
             prompt = _build_prompt() if attempt == 0 else (_build_prompt() + "\n\n이전 시도에서 금지 주제가 포함되었습니다. 금지 주제를 절대 사용하지 말고 다시 출제하세요.")
-            resp = self.client.chat.completions.create(
-                model=self.dep_curriculum,
+            resp = self._chat(
+                "generate_materials_grade_semester",
                 messages=[
                     {"role": "system", "content": sys_msg},
                     {"role": "user",   "content": prompt}
-                ]
+                ],
+                validate=is_valid_worksheet
             )
             content = resp.choices[0].message.content.strip()
             if not self._contains_banned_terms(content, banned_terms_expanded):
                 break
+            if attempt < max_retry:
+                RETRIES.inc("generate_materials", "banned_term")
 
         # Worksheet/AnswerKey 분리
         worksheet, answer_key = content, ""
@@ -202,91 +421,23 @@ class AzureOpenAIService:
         materials = [worksheet + ("\n\n[AnswerKey]\n" + answer_key if answer_key else "")]
         return lesson, materials
 
-    def save_lesson(self, child_id, lesson_text, docs):
-        """학습 세션 ID 생성 및 저장"""
-        lesson_id = str(uuid.uuid4())
-        # TODO: 필요 시 저장 로직 추가
-        return lesson_id
-
     def create_feedback(self, materials_text, responses_text):
         tmpl = env.get_template("feedback.txt")
         prompt = tmpl.render(materials=materials_text, responses=responses_text)
         
-        # Langfuse trace 시작 (임시 주석 처리)
-        # trace = Trace(
-        #     name="create_feedback",
-        #     user_id="some_user_id",  # 필요시 아동 ID 등
-        #     langfuse=langfuse
-        # )
-        # span = trace.span(
-        #     name="openai-feedback-call",
-        #     input=prompt
-        # )
-        resp = self.client.chat.completions.create(
-            model=self.dep_curriculum,
+        resp = self._chat(
+            "create_feedback",
             messages=[
                 {"role": "system", "content": "피드백 생성 AI"},
                 {"role": "user",   "content": prompt}
-            ]
+            ],
+            validate=is_nonempty
         )
-        output = resp.choices[0].message.content.strip()
-        print("[Langfuse Output]", repr(output))  # 값이 정확히 뭔지 확인
-        # span.output = str(output)  # 혹시 모르니 str로 변환
-        # span.end()
-        return output
+        return resp.choices[0].message.content.strip()
 
     # ===== Deterministic MCQ grading for consistency =====
     def _parse_worksheet_and_key(self, materials_text: str):
-        import re
-        worksheet = materials_text
-        answer_key = ""
-        if "[Worksheet]" in materials_text:
-            parts = materials_text.split("[Worksheet]")
-            worksheet = parts[-1]
-        if "[AnswerKey]" in worksheet:
-            wk, ak = worksheet.split("[AnswerKey]", 1)
-            worksheet = wk.strip()
-            answer_key = ak.strip()
-
-        # Parse problems
-        problems = []
-        pattern = re.compile(r"\[Problem\s*(\d+)\]\s*", re.IGNORECASE)
-        matches = list(pattern.finditer(worksheet))
-        for idx, m in enumerate(matches):
-            start = m.end()
-            end = matches[idx+1].start() if idx+1 < len(matches) else len(worksheet)
-            block = worksheet[start:end].strip()
-            number = int(m.group(1)) if m.group(1).isdigit() else (idx+1)
-            # split stem and choices
-            stem = block
-            choices_block = ""
-            if "Choices:" in block:
-                parts2 = block.split("Choices:", 1)
-                stem = parts2[0].strip()
-                choices_block = parts2[1]
-            def pick(label):
-                mm = re.search(rf"\b{label}\)\s*(.+)", choices_block)
-                return mm.group(1).strip() if mm else ""
-            problems.append({
-                "number": number,
-                "stem": stem,
-                "choices": {
-                    "A": pick("A"),
-                    "B": pick("B"),
-                    "C": pick("C"),
-                    "D": pick("D"),
-                }
-            })
-
-        # Parse answer key lines like: 1) A
-        key_map = {}
-        for line in answer_key.splitlines():
-            line = line.strip()
-            mm = re.match(r"(\d+)\)\s*([ABCD])", line, re.IGNORECASE)
-            if mm:
-                key_map[int(mm.group(1))] = mm.group(2).upper()
-
-        return problems, key_map
+        return parse_worksheet_and_key(materials_text)
 
     def _parse_student_responses(self, responses_text: str):
         import re
@@ -297,8 +448,8 @@ class AzureOpenAIService:
                 resp_map[int(mm.group(1))] = mm.group(2).upper()
         return resp_map
 
-    def grade_multiple_choice(self, materials_text: str, responses_text: str) -> str:
-        """결정론적 채점 + LLM 해설(정답 표기는 코드에서 강제)로 안전하게 결과 생성"""
+    def grade_responses(self, materials_text: str, responses_text: str):
+        """결정론적 채점만 수행 (LLM 호출 없음). 반환: (per_q, score)"""
         problems, key_map = self._parse_worksheet_and_key(materials_text)
         resp_map = self._parse_student_responses(responses_text)
         total = len(problems) if problems else 0
@@ -315,11 +466,18 @@ class AzureOpenAIService:
                 "number": n,
                 "stem": p["stem"],
                 "choices": p["choices"],
+                "band": p["band"],
                 "correct": correct_opt,
                 "student": student_opt,
                 "ok": is_correct
             })
         score = int(round((correct / total) * 100)) if total > 0 else 0
+        return per_q, score
+
+    def grade_multiple_choice(self, materials_text: str, responses_text: str, graded=None) -> str:
+        """결정론적 채점 + LLM 해설(정답 표기는 코드에서 강제)로 안전하게 결과 생성
+        graded: 이미 grade_responses로 채점한 (per_q, score)가 있으면 재사용"""
+        per_q, score = graded or self.grade_responses(materials_text, responses_text)
 
         # 1) [Score]
         score_md = f"[Score]\n총점: {score} 점\n\n"
@@ -335,49 +493,28 @@ class AzureOpenAIService:
         perq_md = "\n".join(perq_lines) + "\n\n"
 
         # 3) [Explanations] - LLM에 '해설만' 요청 후, 정답 표기는 코드에서 강제 삽입
-        import json as _json
-        expl_system = (
-            "한국 초등 수학 해설 작성기. 주어진 문항(stem)과 선택지(choices)를 참고해, 각 문항의 해설 본문만 1~3문장으로 작성. "
-            "정답 글자(A/B/C/D)나 학생 선택, 점수, Correct/O/X는 출력하지 말 것. 새 문제를 만들지 말 것."
-        )
-        expl_payload = {
-            "items": [
-                {
-                    "number": x["number"],
-                    "stem": x["stem"],
-                    "choices": x["choices"],
-                    "correct": x["correct"],
-                    "student": x["student"],
-                    "ok": x["ok"],
-                } for x in per_q
-            ]
-        }
+        items = [
+            {
+                "number": x["number"],
+                "stem": x["stem"],
+                "choices": x["choices"],
+                "correct": x["correct"],
+                "student": x["student"],
+                "ok": x["ok"],
+            } for x in per_q
+        ]
         try:
-            expl_resp = self.client.chat.completions.create(
-                model=self.dep_curriculum,
-                messages=[
-                    {"role": "system", "content": expl_system},
-                    {"role": "user", "content": (
-                        "다음 JSON을 참고하여 각 번호별로 한 줄씩 'n) 해설: ...' 형식으로 출력하세요. "
-                        "틀린 문항은 더 자세하고 친절하게, 쉬운 예 1개를 포함하세요.\n\nJSON:\n" + _json.dumps(expl_payload, ensure_ascii=False)
-                    )}
-                ]
-            )
-            expl_text = expl_resp.choices[0].message.content.strip()
+            # 번호→해설 매핑 (묶음 처리 시 다른 제출의 해설 요청과 함께 1회 호출, 지연 상한을 넘기면 개별 호출)
+            exp_map = None
+            if self.explanation_batcher is not None:
+                try:
+                    exp_map = self.explanation_batcher.submit(items)
+                except explanation_batcher.BatchTimeoutError as e:
+                    print(f"[explanation_batcher] {e} → 개별 호출")
+            if exp_map is None:
+                exp_map = self._explain(items)
         except Exception:
-            expl_text = ""
-
-        # 파싱하여 번호→해설 매핑
-        exp_map = {}
-        for line in expl_text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            # 형태: 'n) 해설: ...'
-            import re as _re
-            m = _re.match(r"(\d+)\)\s*해설\s*:\s*(.+)", line)
-            if m:
-                exp_map[int(m.group(1))] = m.group(2).strip()
+            exp_map = {}
 
         # 결정론적 [Explanations]
         expl_lines = ["[Explanations]"]
@@ -411,49 +548,79 @@ class AzureOpenAIService:
 
         return score_md + perq_md + expl_md + feedback_md
 
-    def create_overall_feedback(self, name, grade, semester, history):
-        """학생의 학습 이력과 피드백을 바탕으로 종합 피드백 생성"""
+    def _explain(self, items: list) -> dict:
+        """해설 LLM 호출 1회: items(번호별 문항/정답/학생 선택) → {번호: 해설}"""
+        import json as _json
+        expl_system = (
+            "한국 초등 수학 해설 작성기. 주어진 문항(stem)과 선택지(choices)를 참고해, 각 문항의 해설 본문만 1~3문장으로 작성. "
+            "정답 글자(A/B/C/D)나 학생 선택, 점수, Correct/O/X는 출력하지 말 것. 새 문제를 만들지 말 것."
+        )
+        expl_resp = self._chat(
+            "grade_explanations",
+            messages=[
+                {"role": "system", "content": expl_system},
+                {"role": "user", "content": (
+                    "다음 JSON을 참고하여 각 번호별로 한 줄씩 'n) 해설: ...' 형식으로 출력하세요. "
+                    "틀린 문항은 더 자세하고 친절하게, 쉬운 예 1개를 포함하세요.\n\nJSON:\n" + _json.dumps({"items": items}, ensure_ascii=False)
+                )}
+            ],
+            validate=lambda text: len(parse_explanations(text)) >= len(items)
+        )
+        return parse_explanations(expl_resp.choices[0].message.content.strip())
+
+    def create_overall_feedback(self, name, grade, semester, history, digests=None, mastery=None):
+        """학생의 학습 이력(단원 다이제스트 + 최근 이력 + 단원별 숙달도)과 피드백을 바탕으로 종합 피드백 생성"""
         tmpl = env.get_template("feedback_summary.txt")
-        prompt = tmpl.render(name=name, grade=grade, semester=semester, history=history)
-
-        # Langfuse trace 시작 (임시 주석 처리)
-        # trace = Trace(
-        #     name="create_overall_feedback",
-        #     user_id=name,  # 필요시 child_id 등으로 변경
-        #     langfuse=langfuse
-        # )
-        # span = trace.span(
-        #     name="openai-overall-feedback-call",
-        #     input=prompt
-        # )
-        resp = self.client.chat.completions.create(
-            model=self.dep_curriculum,
+        prompt = tmpl.render(name=name, grade=grade, semester=semester, history=history, digests=digests or [], mastery=mastery or [])
+
+        resp = self._chat(
+            "overall_feedback",
             messages=[
                 {"role": "system", "content": "종합 피드백 생성 AI"},
                 {"role": "user",   "content": prompt}
-            ]
+            ],
+            validate=is_feedback_report
         )
-        output = resp.choices[0].message.content.strip()
-        # span.output = output
-        # span.end()
-        return output
+        return resp.choices[0].message.content.strip()
+
+    def update_overall_feedback(self, name, grade, semester, previous_summary, new_history):
+        """이전 종합 피드백 + 새로 추가된 이력(delta)만으로 종합 피드백 증분 갱신"""
+        tmpl = env.get_template("feedback_summary_delta.txt")
+        prompt = tmpl.render(
+            name=name,
+            grade=grade,
+            semester=semester,
+            previous_summary=previous_summary,
+            new_history=new_history
+        )
+        resp = self._chat(
+            "overall_feedback_delta",
+            messages=[
+                {"role": "system", "content": "종합 피드백 생성 AI"},
+                {"role": "user",   "content": prompt}
+            ],
+            validate=is_feedback_report
+        )
+        return resp.choices[0].message.content.strip()
 
     def generate_next_material(self, child_id, lesson_id, last_responses=None):
         """이전 학습 반영하여 다음 교재 생성"""
         tmpl = env.get_template("next_material.txt")
         # next_material 템플릿은 이름/학년/학기/이전 주제/피드백을 기대
         prompt = tmpl.render(name=child_id, grade=0, semester=0, topic="", feedback=str(last_responses or ""))
-        resp = self.client.chat.completions.create(
-            model=self.dep_curriculum,
+        resp = self._chat(
+            "next_material",
             messages=[
                 {"role": "system", "content": "다음 교재 생성 AI"},
                 {"role": "user",   "content": prompt}
-            ]
+            ],
+            validate=is_nonempty
         )
         return resp.choices[0].message.content.strip()
     
-    def generate_materials_for_grade_semester_with_rag(self, grade: int, semester: int, related_docs, curriculum_units=None, curriculum_guide="", specified_subject=None, extra_request=None):
-        """RAG 시스템을 활용한 고품질 문제 생성"""
+    def generate_materials_for_grade_semester_with_rag(self, grade: int, semester: int, related_docs, curriculum_units=None, curriculum_guide="", specified_subject=None, extra_request=None, scheduled_unit=None, difficulty_mix=None):
+        """RAG 시스템을 활용한 고품질 문제 생성
+        scheduled_unit/difficulty_mix: 스케줄러(NextLessonScheduler)가 숙달도 기반으로 정한 단원/난이도 구성"""
         from typing import List
         import random
         
@@ -461,9 +628,11 @@ class AzureOpenAIService:
         if not curriculum_units:
             return self.generate_materials_for_grade_semester(grade, semester, related_docs)
         
-        # 지정된 단원이 있으면 우선 사용, 없으면 랜덤 선택
+        # 지정된 단원 > 스케줄러 추천 단원 > 랜덤 선택
         if specified_subject and specified_subject in curriculum_units:
             selected_unit = specified_subject
+        elif scheduled_unit and scheduled_unit in curriculum_units:
+            selected_unit = scheduled_unit
         else:
             selected_unit = random.choice(curriculum_units)
         
@@ -497,15 +666,20 @@ class AzureOpenAIService:
         # 교육과정 가이드 정보가 있으면 프롬프트에 추가
         if curriculum_guide:
             prompt += f"\n\n[교육과정 가이드 참고]\n{curriculum_guide[:1000]}"  # 길이 제한
+        if difficulty_mix:
+            mix_text = ", ".join(f"{label} {difficulty_mix.get(band, 0)}문제" for band, label in
+                                 [("basic", "기본 이해도"), ("reasoning", "추론/사고력"), ("applied", "응용 - 기본"), ("advanced", "응용 - 중고급")])
+            prompt += f"\n\n[난이도 구성]\n총 10문제를 {mix_text}로 구성하고, 섹션 제목(## ...)의 문제 수도 이에 맞게 바꾸세요. 0문제인 섹션은 생략합니다."
         if extra_request:
             prompt += f"\n\n[추가 요청]\n{str(extra_request)[:100]}"
         
-        resp = self.client.chat.completions.create(
-            model=self.dep_curriculum,
+        resp = self._chat(
+            "generate_materials_rag",
             messages=[
                 {"role": "system", "content": enhanced_system_message},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            validate=is_valid_worksheet
         )
         
         lesson_content = resp.choices[0].message.content.strip()
@@ -526,4 +700,33 @@ class AzureOpenAIService:
         lesson = f"[{grade}학년 {semester}학기] {selected_unit}\n\n{lesson_content}"
         materials = [worksheet + ("\n\n[AnswerKey]\n" + answer_key if answer_key else "")]
         
-        return lesson, materials 
\ No newline at end of file
+        return lesson, materials 
+
+    def generate_replacement_problem(self, grade: int, semester: int, unit: str, band: str, avoid: list):
+        """학습지의 문항 1개만 다시 출제 (아동이 이미 푼 문항과 근접 중복일 때, 학습지 전체 재생성 대신)
+        avoid: 피해야 할 기존 문항 본문들. 반환: {stem, choices, answer} 또는 None"""
+        avoid_text = "\n".join(f"- {' '.join(s.split())[:200]}" for s in avoid[:5])
+        prompt = f"""{grade}학년 {semester}학기 수학 '{unit}' 단원의 '{BAND_HEADERS.get(band, band)}' 수준 4지선다 문제 1개를 출제하세요.
+아래 문제들과 소재·수치·문장 구조가 모두 다른 새 문제여야 합니다.
+{avoid_text}
+
+출력 형식(정확히 지킬 것):
+[Problem 1]
+문제 본문
+Choices:
+A) 보기A
+B) 보기B
+C) 보기C
+D) 보기D
+
+[AnswerKey]
+1) 정답(A/B/C/D)"""
+        resp = self._chat(
+            "repair_problem",
+            messages=[
+                {"role": "system", "content": "당신은 초등학교 수학 문제 출제 전문가입니다. 정답이 유일하고 모호하지 않은 문제만 출제합니다."},
+                {"role": "user", "content": prompt}
+            ],
+            validate=lambda text: first_valid_problem(text) is not None
+        )
+        return first_valid_problem(resp.choices[0].message.content or "")
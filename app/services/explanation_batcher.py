@@ -0,0 +1,169 @@
+"""
+해설 요청 묶음 처리 (micro-batching)
+동시에 채점된 여러 제출의 해설 요청을 짧은 창(EXPLAIN_BATCH_WINDOW_MS) 동안 모아 LLM 호출 1회로 보냅니다.
+- 먼저 들어온 요청(리더)이 창이 끝나거나 문항 수가 EXPLAIN_BATCH_MAX_ITEMS에 이르면 모인 요청을 묶어 호출
+  (그룹 커밋과 같은 리더 방식, 백그라운드 스레드 없음 → fork 후에도 그대로 동작)
+- 묶음 안에서는 문항 번호를 1..N으로 다시 매겨 보내고, 응답의 'n) 해설:' 줄을 요청별 원래 번호로 돌려줌
+- 최대 문항 수를 넘는 요청은 다음 묶음으로 넘기고, 그 첫 요청이 새 리더가 됨
+- 묶음 호출이 실패하면 그 묶음의 모든 요청이 같은 예외를 받음 (호출 측은 기존처럼 기본 해설 사용)
+- 지연 상한(EXPLAIN_BATCH_TIMEOUT_SEC): 묶음 호출은 리더 요청 시각 + 상한까지만 기다리고, 넘기면 묶음 전체를
+  BatchTimeoutError로 실패 처리 → 호출 측은 요청마다 개별 호출로 전환 (늦게 끝난 묶음 응답은 버림)
+  대기하던 요청도 상한을 넘기면 BatchTimeoutError (일부만 채워진 결과는 반환하지 않음)
+- 메트릭: explanation_batch_requests(묶음당 요청 수), explanation_batch_wait_seconds(창 대기 시간)
+
+사용 (EXPLAIN_BATCH=1일 때 AzureOpenAIService가 생성):
+    exp_map = batcher.submit(items)   # items: [{number, stem, choices, correct, student, ok}] → {번호: 해설}
+"""
+
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.metrics import EXPLANATION_BATCH_REQUESTS, EXPLANATION_BATCH_WAIT
+
+ENABLED = os.getenv("EXPLAIN_BATCH", "0") == "1"
+WINDOW_MS = float(os.getenv("EXPLAIN_BATCH_WINDOW_MS", "100"))
+# 묶음 하나의 최대 문항 수: 출력 토큰이 문항 수에 비례해 늘므로 묶음 호출 시간(= 꼬리 지연)의 상한
+MAX_ITEMS = int(os.getenv("EXPLAIN_BATCH_MAX_ITEMS", "50"))
+# 요청 1건이 묶음을 기다리는 시간 상한(창 + 묶음 호출), 넘기면 개별 호출로 전환
+TIMEOUT_SEC = float(os.getenv("EXPLAIN_BATCH_TIMEOUT_SEC", "5"))
+
+
+class BatchTimeoutError(TimeoutError):
+    """묶음 해설이 지연 상한 안에 끝나지 않음 (호출 측은 개별 호출로 전환)"""
+
+
+class _Job:
+    __slots__ = ("items", "wake", "lead", "done", "result", "error", "queued_at")
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.items = items
+        self.wake = threading.Event()
+        self.lead = False
+        self.done = False
+        self.result: Optional[Dict[int, str]] = None
+        self.error: Optional[BaseException] = None
+        self.queued_at = time.monotonic()
+
+
+class ExplanationBatcher:
+    def __init__(self, explain: Callable[[List[Dict[str, Any]]], Dict[int, str]], window_ms: float = WINDOW_MS,
+                 max_items: int = MAX_ITEMS, timeout_sec: float = TIMEOUT_SEC):
+        """explain(items) → {번호: 해설}: LLM 호출 1회 (묶음 요청도 같은 함수로 보냄)"""
+        self.explain = explain
+        self.window_sec = window_ms / 1000
+        self.max_items = max_items
+        self.timeout_sec = timeout_sec
+        self._cond = threading.Condition()
+        self._pending: List[_Job] = []
+        self._collecting = False
+        self.batches = 0
+
+    def submit(self, items: List[Dict[str, Any]]) -> Dict[int, str]:
+        job = _Job(items)
+        with self._cond:
+            self._pending.append(job)
+            if not self._collecting:
+                self._collecting = job.lead = True
+            elif sum(len(j.items) for j in self._pending) >= self.max_items:
+                self._cond.notify_all()
+        if not job.lead:
+            # 리더가 결과를 채우거나, 넘겨진 다음 묶음의 리더로 지정될 때까지 대기
+            # (묶음 호출 기한은 먼저 들어온 리더 기준이라 보통 이 대기보다 먼저 끝남)
+            job.wake.wait(self.timeout_sec)
+            with self._cond:
+                if not job.done and not job.lead:
+                    # 대기열에 남아 있으면 빼고, 실행 중인 묶음이면 결과를 기다리지 않고 포기
+                    if job in self._pending:
+                        self._pending.remove(job)
+                    raise BatchTimeoutError("해설 묶음 대기 시간 초과")
+        if not job.done:
+            self._lead(job)
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _lead(self, leader: _Job):
+        deadline = leader.queued_at + self.window_sec
+        with self._cond:
+            while sum(len(j.items) for j in self._pending) < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, count = [], 0
+            for job in self._pending:
+                # 리더 요청은 문항 수와 관계없이 포함 (한 요청이 상한보다 커도 혼자 보냄)
+                if job is not leader and count + len(job.items) > self.max_items:
+                    break
+                batch.append(job)
+                count += len(job.items)
+            self._pending = [j for j in self._pending if j not in batch]
+            if self._pending:
+                # 남은 요청은 다음 묶음: 첫 요청을 리더로 깨움 (창은 그 요청이 들어온 시각부터)
+                self._pending[0].lead = True
+                self._pending[0].wake.set()
+            else:
+                self._collecting = False
+        now = time.monotonic()
+        for job in batch:
+            EXPLANATION_BATCH_WAIT.observe(now - job.queued_at)
+        EXPLANATION_BATCH_REQUESTS.observe(len(batch))
+        self.batches += 1
+        self._run(batch, leader.queued_at + self.timeout_sec)
+
+    def _run(self, batch: List[_Job], deadline: float):
+        results: Dict[_Job, Dict[int, str]] = {job: {} for job in batch}
+        error: Optional[BaseException] = None
+        try:
+            if len(batch) == 1:
+                # 혼자면 개별 호출과 같음 (기한을 넘겨도 다시 부를 이유가 없으므로 그대로 기다림)
+                results[batch[0]] = self.explain(batch[0].items)
+            else:
+                # 묶음 번호 1..N → (요청, 원래 번호)
+                merged, owners = [], {}
+                for job in batch:
+                    for item in job.items:
+                        owners[len(merged) + 1] = (job, item["number"])
+                        merged.append(dict(item, number=len(merged) + 1))
+                for number, text in self._explain_until(merged, deadline).items():
+                    if number in owners:
+                        job, original = owners[number]
+                        results[job][original] = text
+        except BaseException as e:
+            error = e
+        finally:
+            # 결과는 완료 시점에 한 번에 채움 (대기 중인 요청이 일부만 채워진 결과를 보지 않도록)
+            with self._cond:
+                for job in batch:
+                    job.result, job.error = (None, error) if error is not None else (results[job], None)
+                    job.done = True
+                    job.wake.set()
+
+    def _explain_until(self, items: List[Dict[str, Any]], deadline: float) -> Dict[int, str]:
+        """묶음 호출을 별도 스레드에서 실행하고 deadline(monotonic)까지만 대기"""
+        holder: Dict[str, Any] = {}
+        finished = threading.Event()
+
+        def call():
+            try:
+                holder["result"] = self.explain(items)
+            except BaseException as e:
+                holder["error"] = e
+            finally:
+                finished.set()
+
+        threading.Thread(target=contextvars.copy_context().run, args=(call,), daemon=True,
+                         name="explanation-batch").start()
+        if not finished.wait(max(0.0, deadline - time.monotonic())):
+            raise BatchTimeoutError(f"해설 묶음 호출 기한 초과 ({len(items)}문항)")
+        if "error" in holder:
+            raise holder["error"]
+        return holder["result"]
+
+
+def from_env(explain: Callable[[List[Dict[str, Any]]], Dict[int, str]]) -> Optional[ExplanationBatcher]:
+    """EXPLAIN_BATCH=1이면 묶음 처리기, 아니면 None (요청마다 개별 호출)"""
+    return ExplanationBatcher(explain) if ENABLED else None
@@ -0,0 +1,83 @@
+"""
+종합 피드백 캐시 서비스
+(아동, 학습 이력 다이제스트) 단위로 생성된 종합 피드백을 저장합니다.
+- 이력이 그대로면 저장된 요약을 그대로 반환 (LLM 호출 없음)
+- 새 학습만 추가되었으면 이전 요약 + 추가분(delta)만으로 증분 갱신
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.storage_service import SQLiteStorage
+
+
+def history_item_digest(item: Dict[str, Any]) -> str:
+    """이력 항목 1건의 다이제스트"""
+    raw = json.dumps(item, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def history_digest(item_digests: List[str]) -> str:
+    """이력 전체의 다이제스트 (항목 다이제스트의 순서 무관 결합)"""
+    return hashlib.sha1("|".join(sorted(item_digests)).encode("utf-8")).hexdigest()
+
+
+class FeedbackSummaryCache:
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        storage.executescript("""
+            CREATE TABLE IF NOT EXISTS overall_feedback_cache (
+                child_id TEXT PRIMARY KEY,
+                history_digest TEXT,
+                item_digests TEXT,
+                summary TEXT,
+                updated_at REAL
+            );
+        """)
+
+    def lookup(self, child_id: str, history: List[Dict[str, Any]], context: Any = None) -> Tuple[str, Optional[str], List[Dict[str, Any]]]:
+        """
+        캐시 조회
+        context: 이력 외에 요약 결과에 영향을 주는 입력(예: 단원 다이제스트). 달라지면 hit 불가
+        반환: (status, summary, delta_items)
+          - ("hit", 요약, [])          : 이력 변화 없음
+          - ("delta", 이전 요약, 추가분) : 새 항목만 추가됨
+          - ("miss", None, 전체 이력)   : 전체 재요약 필요
+        """
+        row = self.storage.query_one(
+            "SELECT history_digest, item_digests, summary FROM overall_feedback_cache WHERE child_id=?",
+            (child_id,)
+        )
+        if not row or not row[2]:
+            return "miss", None, list(history)
+
+        digests = [history_item_digest(item) for item in history]
+        if self._full_digest(digests, context) == row[0]:
+            return "hit", row[2], []
+
+        # 이전 요약에 반영된 항목이 일부라도 남아 있으면 새 항목만 증분 반영
+        # (최근 이력 창(window) 밖으로 밀려난 항목은 이미 이전 요약에 반영되어 있음)
+        previous = set(json.loads(row[1] or "[]"))
+        delta = [item for item, d in zip(history, digests) if d not in previous]
+        if previous & set(digests) and delta:
+            return "delta", row[2], delta
+        return "miss", None, list(history)
+
+    def store(self, child_id: str, history: List[Dict[str, Any]], summary: str, context: Any = None):
+        """요약 저장 (아동별 최신 1건 유지)"""
+        digests = [history_item_digest(item) for item in history]
+        self.storage.write("""
+            INSERT OR REPLACE INTO overall_feedback_cache (child_id, history_digest, item_digests, summary, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (child_id, self._full_digest(digests, context), json.dumps(digests), summary, time.time()))
+
+    @staticmethod
+    def _full_digest(item_digests: List[str], context: Any) -> str:
+        if context is None:
+            return history_digest(item_digests)
+        return history_digest(item_digests + [history_item_digest({"context": context})])
+
+    def size(self) -> int:
+        return self.storage.query_one("SELECT COUNT(*) FROM overall_feedback_cache")[0]
@@ -0,0 +1,147 @@
+"""
+학습 이력 압축(다이제스트) 서비스
+오래된 학습 이력은 단원별 다이제스트(학습 횟수/평균·최저·최고·최근 점수/기간)로 누적 압축하고,
+종합 피드백 프롬프트에는 다이제스트 + 최근 N건만 포함하여 이력 길이와 무관하게 프롬프트 크기를 제한합니다.
+"""
+
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 프롬프트에 원문 그대로 포함할 최근 학습 건수
+RECENT_WINDOW = int(os.getenv("HISTORY_RECENT_WINDOW", "5"))
+# 프롬프트에 포함할 단원 다이제스트 최대 개수 (최근 학습 단원 우선)
+MAX_DIGESTS = int(os.getenv("HISTORY_MAX_DIGESTS", "12"))
+# 최근 이력 항목별 피드백 최대 길이
+MAX_FEEDBACK_CHARS = 300
+
+_SCORE_RE = re.compile(r"총점:\s*(\d+)\s*점")
+_UNIT_RE = re.compile(r"^\s*\[\s*\d+\s*학년\s*\d+\s*학기\s*\]\s*(.+)$")
+_GRADE_SEMESTER_RE = re.compile(r"\[\s*(\d+)\s*학년\s*(\d+)\s*학기\s*\]")
+
+
+def extract_score(feedback: Optional[str]) -> Optional[int]:
+    """채점 결과 텍스트에서 총점 추출"""
+    if not feedback:
+        return None
+    m = _SCORE_RE.search(feedback)
+    return int(m.group(1)) if m else None
+
+
+def extract_unit(topic: Optional[str]) -> str:
+    """'[3학년 1학기] 덧셈과 뺄셈' 형태의 제목/첫 줄에서 단원명 추출"""
+    line = (topic or "").split("\n", 1)[0].strip()
+    m = _UNIT_RE.match(line)
+    unit = m.group(1).strip() if m else line
+    return unit[:30] or "기타"
+
+
+def extract_grade_semester(topic: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """'[3학년 1학기] ...' 헤더에서 (학년, 학기) 추출"""
+    m = _GRADE_SEMESTER_RE.search((topic or "").split("\n", 1)[0])
+    return (int(m.group(1)), int(m.group(2))) if m else (None, None)
+
+
+def compact_feedback(feedback: Optional[str]) -> str:
+    """채점 결과 전체 대신 총점 + [Feedback] 섹션만 남겨 프롬프트용으로 축약"""
+    if not feedback:
+        return ""
+    score = extract_score(feedback)
+    body = feedback
+    if "[Feedback]" in feedback:
+        body = feedback.split("[Feedback]", 1)[1]
+    body = " ".join(body.split())
+    prefix = f"{score}점 - " if score is not None else ""
+    return (prefix + body)[:MAX_FEEDBACK_CHARS]
+
+
+def new_digest(unit: str) -> Dict[str, Any]:
+    return {
+        "unit": unit,
+        "lessons": 0,
+        "scored": 0,
+        "score_sum": 0,
+        "min_score": None,
+        "max_score": None,
+        "last_score": None,
+        "first_date": None,
+        "last_date": None,
+    }
+
+
+def fold_item(digest: Dict[str, Any], date: Optional[str], score: Optional[int], count_lesson: bool = True) -> Dict[str, Any]:
+    """다이제스트에 학습 1건을 누적 (O(1))"""
+    if count_lesson:
+        digest["lessons"] += 1
+    if date:
+        if not digest["first_date"] or date < digest["first_date"]:
+            digest["first_date"] = date
+        if not digest["last_date"] or date >= digest["last_date"]:
+            digest["last_date"] = date
+            if score is not None:
+                digest["last_score"] = score
+    if score is not None:
+        digest["scored"] += 1
+        digest["score_sum"] += score
+        digest["min_score"] = score if digest["min_score"] is None else min(digest["min_score"], score)
+        digest["max_score"] = score if digest["max_score"] is None else max(digest["max_score"], score)
+        if digest["last_score"] is None:
+            digest["last_score"] = score
+    return digest
+
+
+def digest_for_prompt(digest: Dict[str, Any]) -> Dict[str, Any]:
+    """저장용 다이제스트 → 프롬프트/API용 요약 (평균 점수 포함)"""
+    scored = digest.get("scored") or 0
+    return {
+        "unit": digest["unit"],
+        "lessons": digest.get("lessons") or 0,
+        "scored": scored,
+        "avg_score": int(round(digest["score_sum"] / scored)) if scored else None,
+        "min_score": digest.get("min_score"),
+        "max_score": digest.get("max_score"),
+        "last_score": digest.get("last_score"),
+        "first_date": digest.get("first_date"),
+        "last_date": digest.get("last_date"),
+    }
+
+
+def limit_digests(digests: Iterable[Dict[str, Any]], max_digests: int = MAX_DIGESTS) -> List[Dict[str, Any]]:
+    """최근에 학습한 단원 순으로 최대 max_digests개만 유지"""
+    ordered = sorted(digests, key=lambda d: d.get("last_date") or "", reverse=True)
+    return ordered[:max_digests]
+
+
+def compact_history(history: List[Dict[str, Any]], digests: Optional[List[Dict[str, Any]]] = None,
+                    window: int = RECENT_WINDOW) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (과거→최근 순) 이력을 (다이제스트, 최근 N건)으로 압축
+    - 이미 압축된 다이제스트(digests)가 있으면 그 위에 window 밖의 항목을 누적
+    - 반환되는 최근 항목의 feedback은 compact_feedback으로 축약
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for d in digests or []:
+        base = new_digest(d["unit"])
+        base.update({k: v for k, v in d.items() if k in base and v is not None})
+        if "score_sum" not in d and d.get("avg_score") is not None and d.get("scored"):
+            base["score_sum"] = d["avg_score"] * d["scored"]
+        merged[d["unit"]] = base
+
+    older = history[:-window] if window > 0 else list(history)
+    recent = history[-window:] if window > 0 else []
+    for item in older:
+        unit = extract_unit(item.get("topic"))
+        score = item.get("score")
+        if score is None:
+            score = extract_score(item.get("feedback"))
+        fold_item(merged.setdefault(unit, new_digest(unit)), item.get("date"), score)
+
+    compact_recent = [
+        {
+            "topic": item.get("topic", ""),
+            "date": item.get("date"),
+            "feedback": compact_feedback(item.get("feedback")),
+        }
+        for item in recent
+    ]
+    return limit_digests(digest_for_prompt(d) for d in merged.values()), compact_recent
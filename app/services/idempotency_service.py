@@ -0,0 +1,116 @@
+"""
+멱등 키(Idempotency-Key) 결과 저장소
+Streamlit 재실행/더블 클릭으로 같은 POST가 여러 번 오면 처음 요청만 워크플로우를 실행하고,
+나머지는 저장된 응답을 그대로 돌려줍니다. (LLM/임베딩/Chroma 쓰기 반복 없음)
+- 서버 DB(SQLite)에 저장 → gunicorn 워커 간에도 공유
+- (엔드포인트, 키)를 먼저 선점한 요청만 실행, 실행 중에 온 같은 키 요청은 완료될 때까지 대기 후 같은 응답
+- 같은 키에 다른 요청 본문이면 충돌(422), 실행이 실패하면 키를 풀어 다음 요청이 다시 실행
+- 완료된 응답은 IDEMPOTENCY_TTL_SEC 동안 보관
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Optional, Tuple
+
+from app.services.storage_service import SQLiteStorage
+from app.services.metrics import CACHE_REQUESTS
+
+TTL_SEC = float(os.getenv("IDEMPOTENCY_TTL_SEC", "600"))
+# 실행 중인 같은 키 요청을 기다리는 최대 시간(초), 선점한 요청이 이보다 오래 끝나지 않으면 키를 다시 선점 가능
+WAIT_SEC = float(os.getenv("IDEMPOTENCY_WAIT_SEC", "180"))
+POLL_SEC = 0.2
+MAX_KEY_LENGTH = 200
+
+
+class IdempotencyConflictError(Exception):
+    """같은 멱등 키로 다른 요청 본문이 들어옴"""
+
+
+class IdempotencyInProgressError(Exception):
+    """같은 키의 요청이 아직 실행 중 (대기 시간 초과)"""
+
+
+def request_hash(body: Any) -> str:
+    raw = json.dumps(body, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, storage: SQLiteStorage, ttl_sec: float = TTL_SEC, wait_sec: float = WAIT_SEC):
+        self.storage = storage
+        self.ttl_sec = ttl_sec
+        self.wait_sec = wait_sec
+        self._last_purge = 0.0
+        storage.executescript("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                endpoint TEXT,
+                key TEXT,
+                request_hash TEXT,
+                status_code INTEGER,
+                response TEXT,
+                created_at REAL,
+                expires_at REAL,
+                PRIMARY KEY (endpoint, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at);
+        """)
+
+    def begin(self, endpoint: str, key: str, body_hash: str) -> Optional[Tuple[int, Any]]:
+        """
+        키 선점 시도
+        반환: None → 이 요청이 실행 (끝나면 complete/release 호출), (status_code, 응답) → 저장된 응답 재사용
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyConflictError(f"Idempotency-Key는 {MAX_KEY_LENGTH}자 이하여야 합니다.")
+        self._purge()
+        deadline = time.monotonic() + self.wait_sec
+        while True:
+            now = time.time()
+            # 새 키이거나 만료된 키(완료 후 TTL 경과, 선점 후 대기 시간 초과)만 선점
+            claimed = self.storage.write("""
+                INSERT INTO idempotency_keys (endpoint, key, request_hash, status_code, response, created_at, expires_at)
+                VALUES (?, ?, ?, NULL, NULL, ?, ?)
+                ON CONFLICT(endpoint, key) DO UPDATE SET
+                    request_hash=excluded.request_hash, status_code=NULL, response=NULL,
+                    created_at=excluded.created_at, expires_at=excluded.expires_at
+                WHERE idempotency_keys.expires_at < excluded.created_at
+            """, (endpoint, key, body_hash, now, now + self.wait_sec))
+            if claimed:
+                CACHE_REQUESTS.inc("idempotency", "miss")
+                return None
+            row = self.storage.query_one(
+                "SELECT request_hash, status_code, response FROM idempotency_keys WHERE endpoint=? AND key=?",
+                (endpoint, key)
+            )
+            if row is None:
+                continue
+            if row[0] != body_hash:
+                CACHE_REQUESTS.inc("idempotency", "conflict")
+                raise IdempotencyConflictError("같은 Idempotency-Key로 다른 요청이 전송되었습니다.")
+            if row[1] is not None:
+                CACHE_REQUESTS.inc("idempotency", "hit")
+                return row[1], json.loads(row[2])
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError("같은 Idempotency-Key의 요청이 아직 처리 중입니다.")
+            time.sleep(POLL_SEC)
+
+    def complete(self, endpoint: str, key: str, status_code: int, response: Any):
+        now = time.time()
+        self.storage.write("""
+            UPDATE idempotency_keys SET status_code=?, response=?, expires_at=? WHERE endpoint=? AND key=?
+        """, (status_code, json.dumps(response, ensure_ascii=False), now + self.ttl_sec, endpoint, key))
+
+    def release(self, endpoint: str, key: str):
+        """실행 실패: 선점 해제 (같은 키로 다시 시도 가능)"""
+        self.storage.write(
+            "DELETE FROM idempotency_keys WHERE endpoint=? AND key=? AND status_code IS NULL", (endpoint, key)
+        )
+
+    def _purge(self):
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self.storage.write("DELETE FROM idempotency_keys WHERE expires_at < ?", (now,))
@@ -0,0 +1,170 @@
+"""
+LLM 호출 기록/재생 (record/replay)
+AzureOpenAIService를 거치는 모든 chat/임베딩 요청과 응답을 압축 아카이브(gzip JSONL)에 기록하고,
+재생 모드에서는 네트워크 호출 없이 기록된 응답을 같은 순서로 돌려줍니다. (파서/채점/파이프라인 성능을 커밋 간 비교)
+
+- LLM_REPLAY_MODE: off(기본) | record | replay
+- LLM_REPLAY_PATH: 아카이브 경로 (기본 ./llm_fixtures.jsonl.gz)
+- LLM_REPLAY_LATENCY_SCALE: 재생 시 기록된 지연 시간 배율 (1.0 = 원래 지연, 0 = 대기 없음)
+
+아카이브 1줄 = 호출 1건: {key, kind, call, model, latency_ms, response}
+- key: 요청(메시지/입력, 옵션)의 SHA-256. 프롬프트 원문은 저장하지 않음
+  (배포 이름은 제외하고, 날짜/시각, UUID는 해시 전에 치환 → 환경/실행 시각/lesson_id가 달라도 같은 키)
+- 임베딩 벡터는 float32 base64로 저장
+- 재생: 같은 key의 기록을 순서대로 반환(끝나면 처음부터). chat은 key가 없으면 같은 호출 위치(call)의 기록을 순서대로 대체
+  (무작위 단원 선택 등으로 프롬프트가 달라진 경우). 그래도 없으면 ReplayMissError
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 기록으로 간주하고 잠금 없이 추가
+    fcntl = None
+
+REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "off").lower()
+REPLAY_PATH = os.getenv("LLM_REPLAY_PATH", "./llm_fixtures.jsonl.gz")
+LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0"))
+
+_VOLATILE = (
+    (re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"), "<date>"),
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE), "<uuid>"),
+)
+
+
+class ReplayMissError(RuntimeError):
+    """재생 모드에서 요청에 해당하는 기록이 없을 때 (아카이브를 다시 기록해야 함)"""
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """요청 → 해시 키 (배포 이름 제외, 날짜/UUID 치환 후 정렬된 JSON의 SHA-256)"""
+    request = {k: v for k, v in request.items() if k != "model"}
+    raw = json.dumps({"kind": kind, **request}, ensure_ascii=False, sort_keys=True, default=str)
+    for pattern, placeholder in _VOLATILE:
+        raw = pattern.sub(placeholder, raw)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _pack_embeddings(response: Dict[str, Any]) -> Dict[str, Any]:
+    for item in response.get("data") or []:
+        vector = item.get("embedding")
+        if isinstance(vector, list):
+            item["embedding"] = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+    return response
+
+
+def _unpack_embeddings(response: Dict[str, Any]) -> Dict[str, Any]:
+    for item in response.get("data") or []:
+        vector = item.get("embedding")
+        if isinstance(vector, str):
+            raw = base64.b64decode(vector)
+            item["embedding"] = list(struct.unpack(f"<{len(raw) // 4}f", raw))
+    return response
+
+
+def _to_response(kind: str, data: Dict[str, Any]):
+    from openai.types import CreateEmbeddingResponse
+    from openai.types.chat import ChatCompletion
+    if kind == "embeddings":
+        return CreateEmbeddingResponse.model_validate(_unpack_embeddings(dict(data, data=[dict(d) for d in data["data"]])))
+    return ChatCompletion.model_validate(data)
+
+
+class LLMReplay:
+    def __init__(self, mode: str, path: str = REPLAY_PATH, latency_scale: float = LATENCY_SCALE):
+        if mode not in ("record", "replay"):
+            raise ValueError("mode는 record 또는 replay여야 합니다")
+        self.mode = mode
+        self.path = path
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "hit": 0, "fallback": 0, "miss": 0}
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_call: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"재생할 LLM 기록이 없습니다: {self.path} (LLM_REPLAY_MODE=record로 먼저 기록)")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._by_key.setdefault(entry["key"], []).append(entry)
+                if entry["kind"] == "chat":
+                    self._by_call.setdefault(entry["call"], []).append(entry)
+        print(f"[llm_replay] {self.path}: 기록 {sum(map(len, self._by_key.values()))}건 로드")
+
+    def call(self, kind: str, name: str, create: Callable[..., Any], request: Dict[str, Any]):
+        """kind: chat | embeddings, name: 호출 위치(usage 원장의 call), create: 실제 클라이언트 호출"""
+        key = request_key(kind, request)
+        if self.mode == "replay":
+            return self._replay(kind, name, key)
+        start = time.perf_counter()
+        resp = create(**request)
+        self._record(kind, name, key, request.get("model"), (time.perf_counter() - start) * 1000, resp)
+        return resp
+
+    def _record(self, kind: str, name: str, key: str, model: Optional[str], latency_ms: float, resp):
+        data = resp.model_dump(exclude_unset=True) if hasattr(resp, "model_dump") else resp
+        if kind == "embeddings":
+            data = _pack_embeddings(data)
+        line = json.dumps({"key": key, "kind": kind, "call": name, "model": model,
+                           "latency_ms": round(latency_ms, 1), "response": data}, ensure_ascii=False) + "\n"
+        # 호출마다 gzip 멤버 1개를 추가 (이어 붙인 멤버도 gzip.open으로 한 번에 읽힘, 워커 간에는 flock)
+        blob = gzip.compress(line.encode("utf-8"))
+        with self._lock, open(self.path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            f.write(blob)
+            self.stats["recorded"] += 1
+
+    def _next(self, bucket: str, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        index = self._cursor.get(bucket, 0)
+        self._cursor[bucket] = index + 1
+        return entries[index % len(entries)]
+
+    def _replay(self, kind: str, name: str, key: str):
+        with self._lock:
+            if key in self._by_key:
+                entry = self._next(key, self._by_key[key])
+                self.stats["hit"] += 1
+            elif kind == "chat" and name in self._by_call:
+                entry = self._next("call:" + name, self._by_call[name])
+                self.stats["fallback"] += 1
+            else:
+                self.stats["miss"] += 1
+                raise ReplayMissError(f"LLM 기록 없음: {kind} {name} key={key[:12]}")
+        if self.latency_scale > 0:
+            time.sleep(entry["latency_ms"] * self.latency_scale / 1000)
+        return _to_response(kind, entry["response"])
+
+
+_instances: Dict[tuple, LLMReplay] = {}
+_instances_lock = threading.Lock()
+
+
+def from_env() -> Optional[LLMReplay]:
+    """환경변수 설정에 따른 프로세스 공용 인스턴스 (off면 None)"""
+    if REPLAY_MODE not in ("record", "replay"):
+        return None
+    with _instances_lock:
+        key = (REPLAY_MODE, REPLAY_PATH, LATENCY_SCALE)
+        if key not in _instances:
+            _instances[key] = LLMReplay(REPLAY_MODE, REPLAY_PATH, LATENCY_SCALE)
+            print(f"[llm_replay] {REPLAY_MODE} 모드: {REPLAY_PATH}")
+        return _instances[key]
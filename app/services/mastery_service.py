@@ -0,0 +1,105 @@
+"""
+단원별 숙달도(mastery) 통계 서비스
+/submit_assessment의 결정론적 채점 결과(per_q)로 (아동, 단원)별 집계를 증분 갱신합니다.
+- 응시 횟수, 문항 수/정답 수, 난이도 구간별 문항 수/정답 수
+- 점수 지수이동평균(EMA), 최근 점수
+대시보드와 종합 피드백은 저장된 피드백 문자열을 다시 파싱하지 않고 이 집계만 읽습니다.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.azure_openai_service import DIFFICULTY_BANDS
+from app.services.storage_service import SQLiteStorage
+
+# 점수 EMA 가중치 (최근 응시 반영 비율)
+EMA_ALPHA = float(os.getenv("MASTERY_EMA_ALPHA", "0.3"))
+
+_BAND_COLUMNS = [f"{band}_{kind}" for band in DIFFICULTY_BANDS for kind in ("total", "correct")]
+_COLUMNS = ["unit", "attempts", "questions", "correct"] + _BAND_COLUMNS + ["ema_score", "last_score", "last_lesson_id", "updated_at"]
+
+
+class MasteryService:
+    def __init__(self, storage: SQLiteStorage, ema_alpha: float = EMA_ALPHA):
+        self.storage = storage
+        self.ema_alpha = ema_alpha
+        band_columns = ",\n                ".join(f"{c} INTEGER DEFAULT 0" for c in _BAND_COLUMNS)
+        storage.executescript(f"""
+            CREATE TABLE IF NOT EXISTS unit_mastery (
+                child_id TEXT,
+                unit TEXT,
+                attempts INTEGER DEFAULT 0,
+                questions INTEGER DEFAULT 0,
+                correct INTEGER DEFAULT 0,
+                {band_columns},
+                ema_score REAL,
+                last_score INTEGER,
+                last_lesson_id TEXT,
+                updated_at REAL,
+                PRIMARY KEY (child_id, unit)
+            );
+        """)
+
+    def record_assessment(self, child_id: str, unit: Optional[str], lesson_id: str, per_q: List[Dict[str, Any]], score: int) -> bool:
+        """
+        채점 결과 1건을 (아동, 단원) 집계에 누적 (단일 UPSERT, O(문항 수))
+        같은 lesson_id의 연속 중복 제출은 무시. 반영되었으면 True
+        """
+        if not per_q:
+            return False
+        unit = (unit or "기타").strip()[:30] or "기타"
+        counts = {c: 0 for c in _BAND_COLUMNS}
+        for q in per_q:
+            band = q.get("band") if q.get("band") in DIFFICULTY_BANDS else "basic"
+            counts[f"{band}_total"] += 1
+            if q.get("ok"):
+                counts[f"{band}_correct"] += 1
+        questions = len(per_q)
+        correct = sum(1 for q in per_q if q.get("ok"))
+
+        increments = ", ".join(f"{c} = {c} + excluded.{c}" for c in ["attempts", "questions", "correct"] + _BAND_COLUMNS)
+        return self.storage.write(f"""
+            INSERT INTO unit_mastery (child_id, unit, attempts, questions, correct, {', '.join(_BAND_COLUMNS)},
+                                      ema_score, last_score, last_lesson_id, updated_at)
+            VALUES (?, ?, 1, ?, ?, {', '.join('?' for _ in _BAND_COLUMNS)}, ?, ?, ?, ?)
+            ON CONFLICT(child_id, unit) DO UPDATE SET
+                {increments},
+                ema_score = COALESCE(ema_score, excluded.last_score) + ? * (excluded.last_score - COALESCE(ema_score, excluded.last_score)),
+                last_score = excluded.last_score,
+                last_lesson_id = excluded.last_lesson_id,
+                updated_at = excluded.updated_at
+            WHERE last_lesson_id IS NOT excluded.last_lesson_id
+        """, (child_id, unit, questions, correct, *[counts[c] for c in _BAND_COLUMNS],
+              float(score), score, lesson_id, time.time(), self.ema_alpha)) > 0
+
+    def get_mastery(self, child_id: str) -> List[Dict[str, Any]]:
+        """아동의 단원별 숙달도 집계 (최근 응시 단원 우선)"""
+        rows = self.storage.query_all(
+            f"SELECT {', '.join(_COLUMNS)} FROM unit_mastery WHERE child_id=? ORDER BY updated_at DESC",
+            (child_id,)
+        )
+        return [self._to_summary(dict(zip(_COLUMNS, r))) for r in rows]
+
+    @staticmethod
+    def _to_summary(row: Dict[str, Any]) -> Dict[str, Any]:
+        def ratio(correct, total):
+            return round(correct / total, 3) if total else None
+        return {
+            "unit": row["unit"],
+            "attempts": row["attempts"],
+            "questions": row["questions"],
+            "correct": row["correct"],
+            "accuracy": ratio(row["correct"], row["questions"]),
+            "bands": {
+                band: {
+                    "total": row[f"{band}_total"],
+                    "correct": row[f"{band}_correct"],
+                    "accuracy": ratio(row[f"{band}_correct"], row[f"{band}_total"]),
+                }
+                for band in DIFFICULTY_BANDS
+            },
+            "ema_score": round(row["ema_score"], 1) if row["ema_score"] is not None else None,
+            "last_score": row["last_score"],
+            "updated_at": row["updated_at"],
+        }
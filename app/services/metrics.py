@@ -0,0 +1,287 @@
+"""
+Prometheus 텍스트 형식 메트릭 (GET /metrics)
+- Counter / Histogram: 스레드별 샤드에 누적 (요청 경로에서 잠금 없음, 수집 시에만 샤드 합산)
+- Gauge: 수집 시점에 콜백으로 계산 (Chroma 컬렉션 크기, 캐시 크기 등, 요청 경로 비용 없음)
+- 멀티 워커(gunicorn): METRICS_MULTIPROC_DIR이 설정되면 워커별 스냅샷을 주기적으로 파일에 기록하고,
+  /metrics를 처리하는 워커가 모든 워커 파일의 Counter/Histogram을 합산 (Gauge는 처리한 워커 기준)
+
+사용:
+    LLM_TOKENS = Counter("llm_tokens_total", "LLM 토큰 수", ("deployment", "call", "type"))
+    LLM_TOKENS.inc("gpt-4o", "create_feedback", "prompt", amount=120)
+"""
+
+import bisect
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SEC = float(os.getenv("METRICS_FLUSH_SEC", "5"))
+
+# 초 단위 지연 시간 버킷 (HTTP 요청 / LLM 호출)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        with _registry_lock:
+            _registry.append(self)
+
+    def samples(self) -> Dict[tuple, Any]:
+        raise NotImplementedError
+
+
+class _Sharded(_Metric):
+    """스레드마다 자기 dict에만 쓰고, 수집 시 전체 샤드를 합산"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._local = threading.local()
+        self._shards: List[Dict[tuple, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[tuple, Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[tuple, Any] = {}
+            with self._shards_lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def _snapshots(self) -> List[Dict[tuple, Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+
+class Counter(_Sharded):
+    type = "counter"
+
+    def inc(self, *label_values, amount: float = 1.0):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0.0) + amount
+
+    def samples(self) -> Dict[tuple, float]:
+        total: Dict[tuple, float] = {}
+        for shard in self._snapshots():
+            for key, value in shard.items():
+                total[key] = total.get(key, 0.0) + value
+        return total
+
+
+class Histogram(_Sharded):
+    """값 = [버킷별 개수..., +Inf 개수, 합계, 개수] (버킷은 누적이 아닌 구간 개수로 저장, 출력 시 누적)"""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values):
+        shard = self._shard()
+        counts = shard.get(label_values)
+        if counts is None:
+            counts = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def samples(self) -> Dict[tuple, list]:
+        total: Dict[tuple, list] = {}
+        for shard in self._snapshots():
+            for key, counts in shard.items():
+                counts = list(counts)
+                if key in total:
+                    total[key] = [a + b for a, b in zip(total[key], counts)]
+                else:
+                    total[key] = counts
+        return total
+
+
+class Gauge(_Metric):
+    """
+    수집 시점 콜백 게이지
+    fn: 숫자 1개(레이블 없음) 또는 {레이블 값 튜플: 숫자} 반환. 예외 시 해당 게이지만 생략
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Union[float, Dict[tuple, float]]],
+                 labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def samples(self) -> Dict[tuple, float]:
+        value = self.fn()
+        if isinstance(value, dict):
+            return value
+        return {(): value}
+
+
+# ===== 출력 =====
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _render_metric(lines: List[str], name: str, type: str, help: str, labels: Sequence[str],
+                   samples: Dict[tuple, Any], buckets: Sequence[float] = ()):
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {type}")
+    for key in sorted(samples, key=lambda k: tuple(map(str, k))):
+        value = samples[key]
+        if type == "histogram":
+            cumulative = 0
+            for bound, count in zip(list(buckets) + [float("inf")], value[:-2]):
+                cumulative += count
+                le = 'le="%s"' % _format(bound)
+                lines.append(f"{name}_bucket{_label_text(labels, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labels, key)} {_format(value[-2])}")
+            lines.append(f"{name}_count{_label_text(labels, key)} {value[-1]}")
+        else:
+            lines.append(f"{name}{_label_text(labels, key)} {_format(value)}")
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """이 프로세스의 Counter/Histogram 값 (멀티 워커 합산용, JSON 직렬화 가능)"""
+    result = {}
+    for metric in list(_registry):
+        if isinstance(metric, _Sharded):
+            result[metric.name] = {
+                "type": metric.type,
+                "samples": [[list(key), value] for key, value in metric.samples().items()],
+            }
+    return result
+
+
+def _merged_samples() -> Dict[str, Dict[tuple, Any]]:
+    """모든 워커 스냅샷 파일 합산 (이 프로세스는 최신 값을 직접 사용)"""
+    own = {name: {tuple(k): v for k, v in data["samples"]} for name, data in snapshot().items()}
+    if not METRICS_MULTIPROC_DIR or not os.path.isdir(METRICS_MULTIPROC_DIR):
+        return own
+    merged = own
+    own_file = f"{os.getpid()}.json"
+    for file_name in os.listdir(METRICS_MULTIPROC_DIR):
+        if not file_name.endswith(".json") or file_name == own_file:
+            continue
+        try:
+            with open(os.path.join(METRICS_MULTIPROC_DIR, file_name), encoding="utf-8") as f:
+                other = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, data in other.items():
+            target = merged.setdefault(name, {})
+            for key, value in data["samples"]:
+                key = tuple(key)
+                if key not in target:
+                    target[key] = value
+                elif data["type"] == "histogram":
+                    target[key] = [a + b for a, b in zip(target[key], value)]
+                else:
+                    target[key] = target[key] + value
+    return merged
+
+
+def render() -> str:
+    """Prometheus 텍스트 형식(0.0.4)"""
+    merged = _merged_samples()
+    lines: List[str] = []
+    for metric in list(_registry):
+        if isinstance(metric, Gauge):
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"[metrics] {metric.name} 수집 실패: {e}")
+                continue
+        else:
+            samples = merged.get(metric.name, {})
+        _render_metric(lines, metric.name, metric.type, metric.help, metric.labels, samples,
+                       getattr(metric, "buckets", ()))
+    return "\n".join(lines) + "\n"
+
+
+# ===== 멀티 워커 스냅샷 기록 =====
+_flusher: Optional[threading.Thread] = None
+_flusher_pid = None
+_stop = threading.Event()
+
+
+def flush():
+    """이 워커의 스냅샷을 METRICS_MULTIPROC_DIR/<pid>.json에 원자적으로 기록"""
+    if not METRICS_MULTIPROC_DIR:
+        return
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    path = os.path.join(METRICS_MULTIPROC_DIR, f"{os.getpid()}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp, path)
+
+
+def start():
+    """스냅샷 기록 스레드 시작 (METRICS_MULTIPROC_DIR 설정 시, 프로세스당 1개)"""
+    global _flusher, _flusher_pid
+    if not METRICS_MULTIPROC_DIR or (_flusher is not None and _flusher_pid == os.getpid() and _flusher.is_alive()):
+        return
+    _stop.clear()
+
+    def run():
+        while not _stop.wait(METRICS_FLUSH_SEC):
+            try:
+                flush()
+            except Exception as e:
+                print(f"[metrics] 스냅샷 기록 실패: {e}")
+
+    _flusher_pid = os.getpid()
+    _flusher = threading.Thread(target=run, name="metrics-flush", daemon=True)
+    _flusher.start()
+
+
+def stop():
+    _stop.set()
+    try:
+        flush()
+    except Exception as e:
+        print(f"[metrics] 스냅샷 기록 실패: {e}")
+
+
+# ===== 공용 메트릭 =====
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "API 요청 처리 시간(초)", ("method", "route", "status"))
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "Azure OpenAI 호출 시간(초)", ("deployment", "call"))
+LLM_ERRORS = Counter("llm_errors_total", "Azure OpenAI 호출 실패 수", ("deployment", "call"))
+LLM_TOKENS = Counter("llm_tokens_total", "Azure OpenAI 토큰 수", ("deployment", "call", "type"))
+LLM_COST = Counter("llm_cost_usd_total", "Azure OpenAI 추정 비용(USD, usage 원장 단가 기준)", ("deployment", "call"))
+BUDGET_ACTIONS = Counter("budget_actions_total", "예산 가드 동작 횟수 (저가 배포 전환 / LLM 호출 생략)", ("action", "call"))
+RETRIES = Counter("retries_total", "재시도 수 (금지 주제 재출제, 아웃박스 재시도, 묶음 임베딩 실패 등)", ("operation", "reason"))
+CACHE_REQUESTS = Counter("cache_requests_total", "캐시 조회 결과별 횟수", ("cache", "result"))
+SINGLEFLIGHT_REQUESTS = Counter("singleflight_requests_total", "동일 요청 병합 결과 (leader: 실행, shared: 결과 공유)", ("group", "key", "result"))
+SINGLEFLIGHT_SAVED_SECONDS = Counter("singleflight_saved_seconds_total", "결과 공유로 생략된 실행 시간 추정(초)", ("group", "key"))
+NEAR_DUPLICATES = Counter("near_duplicate_problems_total", "아동 이력과 근접 중복인 문항 처리 (regenerated: 계산 문항 재생성, swapped: 은행 문항 교체, repaired: 1문항 재출제, kept: 유지)", ("action",))
+ANSWER_KEY_CHECKS = Counter("answer_key_checks_total", "정답 키 검증 결과 (ok, fixed: 키 교정, no_answer/ambiguous/duplicate_choices: 문항 교체 대상, skipped: 판단 불가)", ("result",))
+BROKEN_PROBLEMS = Counter("broken_problems_total", "보기가 잘못된 문항 처리 (regenerated/swapped/repaired: 교체, kept: 유지)", ("action",))
+EXPLANATION_BATCH_REQUESTS = Histogram("explanation_batch_requests", "해설 묶음 호출 1회에 포함된 채점 요청 수", buckets=(1, 2, 4, 8, 16, 32))
+EXPLANATION_BATCH_WAIT = Histogram("explanation_batch_wait_seconds", "해설 요청이 묶음 창에서 기다린 시간(초)")
+WORKSHEETS = Counter("worksheets_total", "학습지 출처별 수 (bank: 은행 조립, arithmetic: 계산 문항 생성기, llm: LLM 생성)", ("source",))
+BRANCH_TIMEOUTS = Counter("workflow_branch_timeouts_total", "워크플로우 조회 분기 시간 초과 수 (기본값으로 진행)", ("branch",))
@@ -0,0 +1,67 @@
+"""
+작업(task)별 배포 선택 (모델 티어링)
+- large: 학습지 출제처럼 품질이 중요한 작업 (AOAI_DEPLOY_GPT4O)
+- mini: 해설/종합 피드백처럼 짧고 부담이 적은 작업 (AOAI_DEPLOY_GPT4O_MINI)
+- 작업별 티어는 AOAI_TASK_ROUTES로 재정의 (예: "overall_feedback=large,generate_materials_rag=mini")
+- mini 응답이 작업별 검증을 통과하지 못하면 large로 1회 재호출 (escalation)
+- mini 배포가 설정되지 않으면 모든 작업이 large 사용 (기존 동작)
+
+작업 이름은 AzureOpenAIService._chat()의 name (usage 원장/메트릭의 call 레이블과 동일)
+"""
+
+import os
+from typing import Dict, Optional
+
+TIERS = ("large", "mini")
+
+DEFAULT_TASK_TIERS = {
+    # 학습지 출제: 정답 키/선택지 형식과 교육과정 범위 준수가 중요
+    "generate_materials_rag": "large",
+    "generate_materials_grade_semester": "large",
+    "generate_materials": "large",
+    "repair_problem": "large",
+    # 짧은 출력/저부담 작업
+    "grade_explanations": "mini",
+    "overall_feedback": "mini",
+    "overall_feedback_delta": "mini",
+    "initial_curriculum": "mini",
+    "next_material": "mini",
+    "create_feedback": "mini",
+}
+
+
+def parse_task_routes(raw: str) -> Dict[str, str]:
+    """"task=tier,task=tier" → {task: tier} (알 수 없는 티어는 무시)"""
+    routes = {}
+    for part in (raw or "").split(","):
+        task, _, tier = part.partition("=")
+        task, tier = task.strip(), tier.strip().lower()
+        if task and tier in TIERS:
+            routes[task] = tier
+        elif task:
+            print(f"[model_router] 잘못된 라우팅 설정 무시: {part.strip()}")
+    return routes
+
+
+class ModelRouter:
+    def __init__(self, large: str, mini: Optional[str] = None, routes: Optional[Dict[str, str]] = None):
+        self.large = large
+        self.mini = mini
+        self.tiers = dict(DEFAULT_TASK_TIERS)
+        self.tiers.update(parse_task_routes(os.getenv("AOAI_TASK_ROUTES", "")) if routes is None else routes)
+
+    def tier_for(self, task: str) -> str:
+        """등록되지 않은 작업은 large (품질 우선)"""
+        if not self.mini:
+            return "large"
+        return self.tiers.get(task, "large")
+
+    def deployment_for(self, task: str) -> str:
+        return self.mini if self.tier_for(task) == "mini" else self.large
+
+    def escalation_for(self, task: str, deployment: str) -> Optional[str]:
+        """검증 실패 시 다시 호출할 배포 (이미 large면 None)"""
+        return self.large if deployment != self.large else None
+
+    def routes(self) -> Dict[str, str]:
+        return {task: self.deployment_for(task) for task in self.tiers}
@@ -0,0 +1,177 @@
+"""
+근접 중복 문항 탐지 (MinHash / LSH)
+아동이 이미 푼 문항과 거의 같은 문항(숫자/이름만 조금 다른 지문 등)을 문항 단위로 찾아냅니다.
+- 문항 텍스트(본문 + 보기)의 문자 3-gram 집합 → MinHash 서명 (NEARDUP_NUM_PERM개)
+- LSH: 서명을 NEARDUP_BANDS개 밴드로 나눠 버킷 색인 → 후보만 서명 비교 (추정 Jaccard ≥ NEARDUP_THRESHOLD면 중복)
+- 아동별 색인은 프로세스 메모리에 두고, 조회 시 서버 DB 학습 이력에서 마지막으로 읽은 이후 저장된 학습지만 추가 (증분)
+  → 다른 워커가 저장한 학습지도 다음 조회에 반영
+- numpy가 있으면 서명 계산을 벡터화 (없으면 같은 값을 순수 파이썬으로 계산)
+
+사용:
+    flagged = near_duplicates.find(child_id, problems)   # {문항 번호: (이력 문항 키, 유사도)}
+"""
+
+import hashlib
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 순수 파이썬 경로 사용
+    np = None
+
+from app.services.azure_openai_service import parse_worksheet_and_key
+
+NUM_PERM = int(os.getenv("NEARDUP_NUM_PERM", "64"))
+BANDS = int(os.getenv("NEARDUP_BANDS", "16"))
+# 16밴드 x 4행의 LSH 후보 임계값(≈ (1/16)^(1/4) = 0.5)과 맞춤. 숫자 하나만 바뀐 문항의 실제 Jaccard는 0.56~0.7
+THRESHOLD = float(os.getenv("NEARDUP_THRESHOLD", "0.5"))
+# 색인을 메모리에 유지할 아동 수 (초과 시 가장 오래 쓰지 않은 아동부터 제거, 다음 조회 때 이력에서 다시 구성)
+MAX_CHILDREN = int(os.getenv("NEARDUP_MAX_CHILDREN", "500"))
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MASK64 = (1 << 64) - 1
+_MAX_HASH = (1 << 32) - 1
+_NOISE_RE = re.compile(r"[\s.,!?·:;\"'()\[\]]+")
+
+
+def problem_text(problem: Dict[str, Any]) -> str:
+    """본문 + 보기(A~D 순서)"""
+    choices = problem.get("choices") or {}
+    return " ".join([problem.get("stem") or ""] + [choices.get(c) or "" for c in ("A", "B", "C", "D")])
+
+
+def shingles(text: str) -> List[int]:
+    """공백/구두점 제거 후 문자 3-gram → 32비트 해시 (프로세스 간 같은 값)"""
+    text = _NOISE_RE.sub("", text.lower())
+    if len(text) <= SHINGLE_SIZE:
+        grams = {text}
+    else:
+        grams = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return [int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams]
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._a = [rng.randint(1, _MERSENNE_PRIME - 1) for _ in range(num_perm)]
+        self._b = [rng.randint(0, _MERSENNE_PRIME - 1) for _ in range(num_perm)]
+        if np is not None:
+            self._a_np = np.array(self._a, dtype=np.uint64)
+            self._b_np = np.array(self._b, dtype=np.uint64)
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """순열 i마다 min_h ((a_i*h + b_i) mod 2^64 mod p) & 0xffffffff"""
+        hashes = shingles(text)
+        if np is not None:
+            hv = np.array(hashes, dtype=np.uint64)[:, None]
+            with np.errstate(over="ignore"):
+                values = ((hv * self._a_np + self._b_np) % np.uint64(_MERSENNE_PRIME)) & np.uint64(_MAX_HASH)
+            return tuple(int(v) for v in values.min(axis=0))
+        return tuple(
+            min((((a * h + b) & _MASK64) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in zip(self._a, self._b)
+        )
+
+
+def similarity(sig1: Sequence[int], sig2: Sequence[int]) -> float:
+    """추정 Jaccard 유사도 (같은 값을 가진 순열 비율)"""
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+
+class LSHIndex:
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm은 bands의 배수여야 합니다")
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[Tuple[int, ...], set]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Any, Tuple[int, ...]] = {}
+
+    def _bands(self, sig: Tuple[int, ...]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        for i in range(len(self._buckets)):
+            yield i, sig[i * self.rows:(i + 1) * self.rows]
+
+    def add(self, key: Any, sig: Tuple[int, ...]):
+        if key in self._signatures:
+            return
+        self._signatures[key] = sig
+        for i, band in self._bands(sig):
+            self._buckets[i].setdefault(band, set()).add(key)
+
+    def query(self, sig: Tuple[int, ...], threshold: float = THRESHOLD) -> List[Tuple[Any, float]]:
+        """같은 버킷에 들어간 후보 중 유사도 ≥ threshold (유사도 내림차순)"""
+        candidates = set()
+        for i, band in self._bands(sig):
+            candidates |= self._buckets[i].get(band, set())
+        scored = [(key, similarity(sig, self._signatures[key])) for key in candidates]
+        return sorted([item for item in scored if item[1] >= threshold], key=lambda item: -item[1])
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+class _ChildIndex:
+    __slots__ = ("index", "cursor", "lock")
+
+    def __init__(self, num_perm: int, bands: int):
+        self.index = LSHIndex(num_perm, bands)
+        self.cursor: Optional[Tuple[str, str]] = None
+        self.lock = threading.Lock()
+
+
+class NearDuplicateDetector:
+    def __init__(self, history_repo, num_perm: int = NUM_PERM, bands: int = BANDS, threshold: float = THRESHOLD,
+                 max_children: int = MAX_CHILDREN):
+        self.history_repo = history_repo
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.threshold = threshold
+        self.max_children = max_children
+        self._lock = threading.Lock()
+        self._children: "OrderedDict[str, _ChildIndex]" = OrderedDict()
+
+    def signature(self, problem: Dict[str, Any]) -> Tuple[int, ...]:
+        return self.hasher.signature(problem_text(problem))
+
+    def _child(self, child_id: str) -> _ChildIndex:
+        with self._lock:
+            child = self._children.get(child_id)
+            if child is None:
+                child = self._children[child_id] = _ChildIndex(self.hasher.num_perm, self.bands)
+                while len(self._children) > self.max_children:
+                    self._children.popitem(last=False)
+            else:
+                self._children.move_to_end(child_id)
+            return child
+
+    def _refresh(self, child_id: str, child: _ChildIndex):
+        """마지막으로 읽은 학습지 이후 저장된 이력만 색인에 추가"""
+        for date, lesson_id, materials_text in self.history_repo.materials_after(child_id, child.cursor):
+            problems, _ = parse_worksheet_and_key(materials_text or "")
+            for p in problems:
+                child.index.add((lesson_id, p["number"]), self.signature(p))
+            child.cursor = (date, lesson_id)
+
+    def find(self, child_id: str, problems: List[Dict[str, Any]], exclude_lesson: Optional[str] = None) -> Dict[int, Tuple[Any, float]]:
+        """
+        아동 이력과 근접 중복인 문항 → {문항 번호: ((lesson_id, 번호), 유사도)}
+        exclude_lesson: 비교에서 뺄 학습지 (이미 저장된 현재 학습지)
+        """
+        child = self._child(child_id)
+        with child.lock:
+            self._refresh(child_id, child)
+            flagged = {}
+            for p in problems:
+                matches = [m for m in child.index.query(self.signature(p), self.threshold) if m[0][0] != exclude_lesson]
+                if matches:
+                    flagged[p["number"]] = matches[0]
+            return flagged
+
+    def is_near_duplicate(self, child_id: str, problem: Dict[str, Any]) -> bool:
+        return bool(self.find(child_id, [dict(problem, number=0)]))
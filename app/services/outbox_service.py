@@ -0,0 +1,149 @@
+"""
+평가 응답 Chroma 쓰기 아웃박스
+여러 워커 프로세스가 같은 Chroma 저장소에 동시에 쓰지 않도록, 요청 처리 중에는 SQLite(WAL) 아웃박스에 적재만 하고
+파일 잠금(flock)으로 선출된 단일 writer가 백그라운드에서 임베딩 + Chroma 저장을 수행합니다.
+- writer 프로세스가 종료되면 잠금이 풀리고 다른 워커가 이어받음
+- 실패한 항목은 재시도 간격을 늘리며 최대 MAX_ATTEMPTS회 재시도
+- 채점 응답 경로에서 임베딩 호출/Chroma 쓰기가 빠짐
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.storage_service import SQLiteStorage
+from app.services.tracing import span
+from app.services.metrics import RETRIES
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 실행으로 간주하고 잠금 없이 writer 역할 수행
+    fcntl = None
+
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL_SEC", "1.0"))
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "32"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+
+
+class AssessmentOutbox:
+    def __init__(self, storage: SQLiteStorage, vector_service, azure_service, lock_path: str,
+                 poll_interval: float = POLL_INTERVAL, batch_size: int = BATCH_SIZE):
+        self.storage = storage
+        self.vector_service = vector_service
+        self.azure_service = azure_service
+        self.lock_path = lock_path
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._lock_file = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        storage.executescript("""
+            CREATE TABLE IF NOT EXISTS assessment_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id TEXT,
+                lesson_id TEXT,
+                responses TEXT,
+                materials_text TEXT,
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT,
+                created_at REAL,
+                next_attempt_at REAL
+            );
+        """)
+
+    def enqueue(self, student_id: str, lesson_id: str, responses: List[str], materials_text: Optional[str]):
+        """평가 응답 적재 (요청 처리 경로, SQLite INSERT 1회)"""
+        now = time.time()
+        self.storage.write("""
+            INSERT INTO assessment_outbox (student_id, lesson_id, responses, materials_text, created_at, next_attempt_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (student_id, lesson_id, json.dumps(responses, ensure_ascii=False), materials_text, now, now))
+        self.start()
+        self._wake.set()
+
+    # ===== writer =====
+    def start(self):
+        """백그라운드 writer 스레드 시작 (프로세스당 1개, fork 이후 재호출 시 새로 시작)"""
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._lock_file = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="assessment-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def is_writer(self) -> bool:
+        return self._lock_file is not None or fcntl is None
+
+    def _try_acquire(self) -> bool:
+        if self.is_writer():
+            return True
+        f = open(self.lock_path, "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        print(f"[outbox] pid={os.getpid()} writer 선출")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            drained = 0
+            try:
+                if self._try_acquire():
+                    drained = self.drain()
+            except Exception as e:
+                print(f"[outbox] 처리 실패: {e}")
+            if not drained:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def drain(self, limit: Optional[int] = None) -> int:
+        """대기 중인 항목을 Chroma에 저장. 처리(성공/실패)한 항목 수 반환"""
+        now = time.time()
+        rows = self.storage.query_all("""
+            SELECT id, student_id, lesson_id, responses, materials_text, attempts FROM assessment_outbox
+            WHERE attempts < ? AND next_attempt_at <= ? ORDER BY id LIMIT ?
+        """, (MAX_ATTEMPTS, now, limit or self.batch_size))
+        for id, student_id, lesson_id, responses, materials_text, attempts in rows:
+            try:
+                with span("outbox.write", student_id=student_id, lesson_id=lesson_id, attempts=attempts):
+                    self.vector_service.add_assessment(
+                        student_id=student_id,
+                        lesson_id=lesson_id,
+                        responses=json.loads(responses),
+                        materials_text=materials_text,
+                        azure_service=self.azure_service
+                    )
+                self.storage.write("DELETE FROM assessment_outbox WHERE id=?", (id,))
+            except Exception as e:
+                RETRIES.inc("outbox_write", "error")
+                self.storage.write(
+                    "UPDATE assessment_outbox SET attempts=?, last_error=?, next_attempt_at=? WHERE id=?",
+                    (attempts + 1, str(e)[:500], time.time() + min(2 ** attempts * self.poll_interval, 300), id)
+                )
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        pending, failed = self.storage.query_one(
+            "SELECT COALESCE(SUM(attempts < ?), 0), COALESCE(SUM(attempts >= ?), 0) FROM assessment_outbox",
+            (MAX_ATTEMPTS, MAX_ATTEMPTS)
+        )
+        return {"pending": pending, "failed": failed, "writer": self.is_writer(), "pid": os.getpid()}
@@ -0,0 +1,257 @@
+"""
+문제 은행 서비스
+LLM이 생성한 학습지의 문항([Problem n])을 검증 후 1문항씩 저장하고, 은행의 문항으로 새 학습지를 조립합니다.
+- 저장: 학년/학기/단원/난이도 구간(materials.txt 섹션)별 색인, 보기/정답, 임베딩(float32, 백그라운드 계산)
+- 조립: 아동이 이미 받은 문항을 제외하고 구간별 필요 수만큼 선택 (적게 쓰인 문항 우선, SQLite 조회만 → 수 ms)
+- 구간 하나라도 문항이 모자라면 None → 호출 측이 LLM으로 생성하고, 생성된 문항이 다시 은행을 채움
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.services.azure_openai_service import DIFFICULTY_BANDS, BAND_HEADERS, parse_worksheet_and_key
+from app.services.history_digest_service import extract_unit, extract_grade_semester
+from app.services.storage_service import SQLiteStorage
+
+CHOICE_LABELS = ("A", "B", "C", "D")
+# 임베딩 계산 여부 (유사 문항 검색용, 0이면 문항만 저장)
+EMBED_PROBLEMS = os.getenv("PROBLEM_BANK_EMBED", "1") == "1"
+
+
+def problem_id(stem: str, choices: Dict[str, str]) -> str:
+    """본문/보기 공백 정규화 후 SHA-1 (같은 문항은 한 번만 저장)"""
+    raw = json.dumps([" ".join(stem.split())] + [" ".join(choices[c].split()) for c in CHOICE_LABELS], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def normalize_unit(unit: Optional[str]) -> str:
+    """단원명 정규화 (숙달도 집계와 같은 30자 상한)"""
+    return (unit or "").strip()[:30]
+
+
+def is_valid_problem(problem: Dict[str, Any], answer: Optional[str]) -> bool:
+    """은행에 넣을 수 있는 문항: 본문, 서로 다른 보기 4개, A~D 정답"""
+    choices = problem.get("choices") or {}
+    values = [" ".join((choices.get(c) or "").split()) for c in CHOICE_LABELS]
+    return bool(problem.get("stem")) and all(values) and len(set(values)) == 4 and answer in CHOICE_LABELS
+
+
+def render_worksheet(problems: List[Dict[str, Any]]) -> str:
+    """구간 순서대로 materials.txt 형식의 학습지 + 정답 키 작성 (번호는 1부터 다시 매김)"""
+    lines = ["[Worksheet]"]
+    keys = []
+    number = 0
+    for band in DIFFICULTY_BANDS:
+        items = [p for p in problems if p["band"] == band]
+        if not items:
+            continue
+        lines.append(f"## {BAND_HEADERS[band]} ({len(items)}문제)")
+        for p in items:
+            number += 1
+            lines.append(f"[Problem {number}]")
+            lines.append(p["stem"])
+            lines.append("Choices:")
+            lines.extend(f"{c}) {p['choices'][c]}" for c in CHOICE_LABELS)
+            lines.append("")
+            keys.append(f"{number}) {p['answer']}")
+    return "\n".join(lines).rstrip() + "\n\n[AnswerKey]\n" + "\n".join(keys)
+
+
+class ProblemBank:
+    def __init__(self, storage: SQLiteStorage, azure_service=None, embed: bool = EMBED_PROBLEMS):
+        self.storage = storage
+        self.azure_service = azure_service
+        self.embed = embed and azure_service is not None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        storage.executescript("""
+            CREATE TABLE IF NOT EXISTS problem_bank (
+                problem_id TEXT PRIMARY KEY,
+                grade INTEGER,
+                semester INTEGER,
+                unit TEXT,
+                band TEXT,
+                stem TEXT,
+                choices TEXT,
+                answer TEXT,
+                embedding BLOB,
+                source_lesson_id TEXT,
+                uses INTEGER DEFAULT 0,
+                created_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_problem_bank_unit ON problem_bank(grade, semester, unit, band, uses);
+            CREATE TABLE IF NOT EXISTS problem_exposure (
+                child_id TEXT,
+                problem_id TEXT,
+                seen_at REAL,
+                PRIMARY KEY (child_id, problem_id)
+            );
+        """)
+
+    # ===== 저장 =====
+    def ingest(self, child_id: str, lesson: str, materials_text: str, lesson_id: Optional[str] = None) -> int:
+        """
+        생성된 학습지의 문항 저장 + 해당 아동에게 노출된 것으로 기록
+        학년/학기/단원은 학습지 헤더('[3학년 1학기] 단원')에서 추출, 저장된 새 문항 수 반환
+        """
+        grade, semester = extract_grade_semester(lesson)
+        unit = normalize_unit(extract_unit(lesson))
+        if grade is None or semester is None or not unit:
+            return 0
+        problems, key_map = parse_worksheet_and_key(materials_text)
+        now = time.time()
+        rows = []
+        for p in problems:
+            answer = key_map.get(p["number"])
+            if not is_valid_problem(p, answer):
+                continue
+            choices = {c: p["choices"][c].strip() for c in CHOICE_LABELS}
+            rows.append((problem_id(p["stem"], choices), grade, semester, unit, p["band"], p["stem"].strip(),
+                         json.dumps(choices, ensure_ascii=False), answer, lesson_id, now))
+        if not rows:
+            return 0
+
+        def _ingest(conn):
+            inserted = []
+            for row in rows:
+                cur = conn.execute("""
+                    INSERT OR IGNORE INTO problem_bank
+                        (problem_id, grade, semester, unit, band, stem, choices, answer, source_lesson_id, uses, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+                """, row)
+                if cur.rowcount:
+                    inserted.append(row)
+            conn.executemany(
+                "INSERT OR IGNORE INTO problem_exposure (child_id, problem_id, seen_at) VALUES (?, ?, ?)",
+                [(child_id, row[0], now) for row in rows]
+            )
+            return inserted
+
+        inserted = self.storage.run_write(_ingest)
+        if inserted and self.embed:
+            self._embed([(row[0], f"{row[5]}\n" + " ".join(json.loads(row[6]).values())) for row in inserted])
+        return len(inserted)
+
+    def add_problems(self, grade: int, semester: int, unit: str, problems: List[Dict[str, Any]]) -> int:
+        """
+        아동 노출 기록 없이 문항만 저장 (계산 문항 생성기 등으로 은행을 미리 채울 때)
+        problems: [{stem, choices, answer, band}], 저장된 새 문항 수 반환
+        """
+        unit = normalize_unit(unit)
+        now = time.time()
+        rows = []
+        for p in problems:
+            if not is_valid_problem(p, p.get("answer")):
+                continue
+            choices = {c: p["choices"][c].strip() for c in CHOICE_LABELS}
+            rows.append((problem_id(p["stem"], choices), grade, semester, unit, p["band"], p["stem"].strip(),
+                         json.dumps(choices, ensure_ascii=False), p["answer"], None, now))
+
+        def _add(conn):
+            return conn.executemany("""
+                INSERT OR IGNORE INTO problem_bank
+                    (problem_id, grade, semester, unit, band, stem, choices, answer, source_lesson_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows).rowcount
+        return self.storage.run_write(_add) if rows else 0
+
+    def ingest_async(self, child_id: str, lesson: str, materials_text: str, lesson_id: Optional[str] = None):
+        """요청 경로 밖(백그라운드)에서 저장 + 임베딩 (실패해도 학습지 응답에는 영향 없음)"""
+        def run():
+            try:
+                self.ingest(child_id, lesson, materials_text, lesson_id)
+            except Exception as e:
+                print(f"[problem_bank] 문항 저장 실패: {e}")
+        self._executor().submit(contextvars.copy_context().run, run)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # fork 이후(gunicorn 워커) 새 풀 생성
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="problem-bank")
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _embed(self, items: List[Tuple[str, str]]):
+        try:
+            vectors = self.azure_service.get_embeddings([text for _, text in items])
+        except Exception as e:
+            print(f"[problem_bank] 임베딩 실패 (문항은 임베딩 없이 저장): {e}")
+            return
+        self.storage.write_many("UPDATE problem_bank SET embedding=? WHERE problem_id=?", [
+            (struct.pack(f"<{len(v)}f", *v), pid) for (pid, _), v in zip(items, vectors)
+        ])
+
+    # ===== 조립 =====
+    def assemble(self, child_id: str, grade: int, semester: int, unit: str, mix: Dict[str, int]) -> Optional[Tuple[str, List[str]]]:
+        """
+        은행 문항으로 학습지 조립 → (lesson, [materials_text]) (LLM 생성 결과와 같은 형태)
+        아동이 본 문항 제외, 구간별로 적게 쓰인 문항 우선(같으면 무작위). 모자라는 구간이 있으면 None
+        """
+        unit = normalize_unit(unit)
+        selected = []
+        for band in DIFFICULTY_BANDS:
+            need = int(mix.get(band, 0))
+            if need <= 0:
+                continue
+            rows = self.storage.query_all("""
+                SELECT problem_id, stem, choices, answer FROM problem_bank b
+                WHERE grade=? AND semester=? AND unit=? AND band=?
+                  AND NOT EXISTS (SELECT 1 FROM problem_exposure e WHERE e.child_id=? AND e.problem_id=b.problem_id)
+                ORDER BY uses, RANDOM() LIMIT ?
+            """, (grade, semester, unit, band, child_id, need))
+            if len(rows) < need:
+                return None
+            selected.extend({"problem_id": r[0], "stem": r[1], "choices": json.loads(r[2]), "answer": r[3], "band": band}
+                            for r in rows)
+        if not selected:
+            return None
+        # 선택 즉시 노출 기록 (같은 아동의 다음 요청에서 제외)
+        self.mark_seen(child_id, [p["problem_id"] for p in selected])
+        content = render_worksheet(selected)
+        lesson = f"[{grade}학년 {semester}학기] {unit}\n\n{content}"
+        return lesson, [content.split("[Worksheet]", 1)[1].strip()]
+
+    def pick(self, child_id: str, grade: int, semester: int, unit: str, band: str, exclude: Iterable[str] = (),
+             reject: Optional[Callable[[Dict[str, Any]], bool]] = None, candidates: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        문항 1개 교체용 선택: 아동이 보지 않았고 exclude에 없으며 reject(문항)가 False인 첫 문항 (노출 기록 포함)
+        """
+        exclude = set(exclude)
+        rows = self.storage.query_all("""
+            SELECT problem_id, stem, choices, answer FROM problem_bank b
+            WHERE grade=? AND semester=? AND unit=? AND band=?
+              AND NOT EXISTS (SELECT 1 FROM problem_exposure e WHERE e.child_id=? AND e.problem_id=b.problem_id)
+            ORDER BY uses, RANDOM() LIMIT ?
+        """, (grade, semester, normalize_unit(unit), band, child_id, candidates + len(exclude)))
+        for r in rows:
+            if r[0] in exclude:
+                continue
+            problem = {"problem_id": r[0], "stem": r[1], "choices": json.loads(r[2]), "answer": r[3], "band": band}
+            if reject is None or not reject(problem):
+                self.mark_seen(child_id, [r[0]])
+                return problem
+        return None
+
+    def mark_seen(self, child_id: str, problem_ids: List[str]):
+        now = time.time()
+
+        def _mark(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO problem_exposure (child_id, problem_id, seen_at) VALUES (?, ?, ?)",
+                [(child_id, pid, now) for pid in problem_ids]
+            )
+            conn.executemany("UPDATE problem_bank SET uses=uses+1 WHERE problem_id=?", [(pid,) for pid in problem_ids])
+        self.storage.run_write(_mark)
+
+    def counts(self) -> Dict[str, int]:
+        """난이도 구간별 저장 문항 수"""
+        return dict(self.storage.query_all("SELECT band, COUNT(*) FROM problem_bank GROUP BY band"))
@@ -10,6 +10,11 @@ import PyPDF2
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from app.services.vector_db_service import VectorDBService
 from app.services.azure_openai_service import AzureOpenAIService
+from app.services.tracing import span, traced
+from app.services.metrics import RETRIES
+
+# 임베딩 요청 1회당 텍스트 수
+EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "16"))
 
 
 class RAGService:
@@ -22,6 +27,7 @@ class RAGService:
             length_function=len,
         )
     
+    @traced("rag.initialize")
     def initialize_rag_data(self) -> bool:
         """
         애플리케이션 시작시 PDF와 JSON 데이터를 ChromaDB에 임베딩하여 저장
@@ -71,7 +77,7 @@ class RAGService:
     def _needs_pdf_embedding(self):
         """PDF 임베딩이 필요한지 확인"""
         try:
-            collection = self.vector_service.client.get_collection("math_curriculum_guide")
+            collection = self.vector_service.get_collection("math_curriculum_guide")
             count = collection.count()
             if count > 0:
                 print(f"📚 기존 PDF 가이드 데이터 발견: {count}개 청크")
@@ -85,7 +91,7 @@ class RAGService:
     def _needs_json_embedding(self):
         """JSON 임베딩이 필요한지 확인"""
         try:
-            collection = self.vector_service.client.get_collection("curriculum_units")
+            collection = self.vector_service.get_collection("curriculum_units")
             count = collection.count()
             if count > 0:
                 print(f"📖 기존 교육과정 데이터 발견: {count}개 단원")
@@ -100,6 +106,7 @@ class RAGService:
         """PDF 컬렉션만 삭제"""
         try:
             self.vector_service.client.delete_collection("math_curriculum_guide")
+            self.vector_service.invalidate("math_curriculum_guide")
             print("🗑️  기존 PDF 컬렉션 삭제")
         except Exception as e:
             print(f"PDF 컬렉션 삭제 실패: {e}")
@@ -108,6 +115,7 @@ class RAGService:
         """JSON 컬렉션만 삭제"""
         try:
             self.vector_service.client.delete_collection("curriculum_units")
+            self.vector_service.invalidate("curriculum_units")
             print("🗑️  기존 JSON 컬렉션 삭제")
         except Exception as e:
             print(f"JSON 컬렉션 삭제 실패: {e}")
@@ -140,26 +148,17 @@ class RAGService:
                 metadata={"description": "수학 교육과정 가이드 문서"}
             )
             
-            # 각 청크를 임베딩하여 저장
-            successful_embeds = 0
-            for i, chunk in enumerate(chunks):
-                if chunk.strip():  # 빈 청크 제외
-                    try:
-                        embedding = self.azure_service.get_embedding(chunk)
-                        collection.add(
-                            embeddings=[embedding],
-                            documents=[chunk],
-                            metadatas=[{
-                                "source": "Math_curriculum_guid.pdf",
-                                "chunk_id": i,
-                                "content_type": "curriculum_guide"
-                            }],
-                            ids=[f"guide_chunk_{i}"]
-                        )
-                        successful_embeds += 1
-                    except Exception as embed_error:
-                        print(f"청크 {i} 임베딩 실패: {embed_error}")
-                        continue
+            self.vector_service.invalidate("math_curriculum_guide")
+            
+            # 청크를 묶어서 임베딩/저장 (빈 청크 제외)
+            successful_embeds = self._embed_and_add(collection, [
+                (f"guide_chunk_{i}", chunk, {
+                    "source": "Math_curriculum_guid.pdf",
+                    "chunk_id": i,
+                    "content_type": "curriculum_guide"
+                })
+                for i, chunk in enumerate(chunks) if chunk.strip()
+            ])
             
             print(f"PDF 임베딩 완료: {successful_embeds}개 청크 저장 (총 {len(chunks)}개 중)")
             return successful_embeds > 0
@@ -199,36 +198,21 @@ class RAGService:
                 metadata={"description": "학년별 학기별 교육과정 단원 정보"}
             )
             
-            # 각 학년/학기/단원을 임베딩하여 저장
-            doc_id = 0
+            self.vector_service.invalidate("curriculum_units")
+            
+            # 각 학년/학기/단원을 텍스트로 구성하여 묶어서 임베딩/저장
+            items = []
             for item in curriculum_data:
                 grade = item.get("grade")
                 semester = item.get("semester") 
-                subjects = item.get("subjects", [])
-                
-                for subject in subjects:
-                    # 단원 정보를 텍스트로 구성
-                    unit_text = f"{grade}학년 {semester}학기 수학 단원: {subject}"
-                    
-                    try:
-                        # 임베딩 생성
-                        embedding = self.azure_service.get_embedding(unit_text)
-                        
-                        collection.add(
-                            embeddings=[embedding],
-                            documents=[unit_text],
-                            metadatas=[{
-                                "grade": grade,
-                                "semester": semester,
-                                "unit": subject,
-                                "source": "curriculum.json"
-                            }],
-                            ids=[f"unit_{doc_id}"]
-                        )
-                        doc_id += 1
-                    except Exception as embed_error:
-                        print(f"임베딩 생성 실패 ({unit_text}): {embed_error}")
-                        continue
+                for subject in item.get("subjects", []):
+                    items.append((f"unit_{len(items)}", f"{grade}학년 {semester}학기 수학 단원: {subject}", {
+                        "grade": grade,
+                        "semester": semester,
+                        "unit": subject,
+                        "source": "curriculum.json"
+                    }))
+            doc_id = self._embed_and_add(collection, items)
             
             print(f"Curriculum JSON 임베딩 완료: {doc_id}개 단원 저장")
             return doc_id > 0
@@ -237,65 +221,106 @@ class RAGService:
             print(f"JSON 임베딩 실패: {e}")
             return False
     
+    def _embed_and_add(self, collection, items: List[tuple]) -> int:
+        """
+        (id, 텍스트, 메타데이터) 목록을 EMBED_BATCH_SIZE개씩 묶어 임베딩 1회 + add 1회로 저장
+        묶음 실패 시 해당 묶음만 1건씩 재시도. 저장된 건수 반환
+        """
+        saved = 0
+        for start in range(0, len(items), EMBED_BATCH_SIZE):
+            batch = items[start:start + EMBED_BATCH_SIZE]
+            ids, texts, metadatas = (list(col) for col in zip(*batch))
+            try:
+                embeddings = self.azure_service.get_embeddings(texts)
+                self.vector_service.add_batched(collection, ids, texts, embeddings, metadatas)
+                saved += len(batch)
+                continue
+            except Exception as batch_error:
+                print(f"묶음 임베딩 실패, 1건씩 재시도: {batch_error}")
+                RETRIES.inc("embed_batch", "error")
+            for doc_id, text, metadata in batch:
+                try:
+                    embedding = self.azure_service.get_embedding(text)
+                    with span("chroma.add", kind="chroma", collection=collection.name, n=1):
+                        collection.add(embeddings=[embedding], documents=[text], metadatas=[metadata], ids=[doc_id])
+                    saved += 1
+                except Exception as embed_error:
+                    print(f"임베딩 생성 실패 ({doc_id}): {embed_error}")
+        return saved
+
     def search_curriculum_guide(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         수학 교육과정 가이드에서 유사도 검색
         """
-        try:
-            collection = self.vector_service.client.get_collection("math_curriculum_guide")
-            query_embedding = self.azure_service.get_embedding(query)
-            
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=["documents", "metadatas", "distances"]
-            )
-            
-            search_results = []
-            if results["documents"] and results["documents"][0]:
-                for i in range(len(results["documents"][0])):
-                    search_results.append({
-                        "content": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
-                        "distance": results["distances"][0][i]
-                    })
-            
-            return search_results
-            
-        except Exception as e:
-            print(f"교육과정 가이드 검색 실패: {e}")
-            return []
+        return self.search_curriculum_guide_many([query], top_k)[0]
+
+    def search_curriculum_guide_many(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        여러 질의를 한 번에 검색 (임베딩 1회 + query 1회), 질의별 결과는 로컬 캐시 (가이드 컬렉션은 기동 후 변하지 않음)
+        """
+        with span("rag.search_curriculum_guide", queries=len(queries), top_k=top_k) as s:
+            results: Dict[str, List[Dict[str, Any]]] = {}
+            missing = []
+            for query in dict.fromkeys(queries):
+                hit = self.vector_service.cache_get(("math_curriculum_guide", "query", query, top_k))
+                if hit is None:
+                    missing.append(query)
+                else:
+                    results[query] = hit
+            s.set(cache_misses=len(missing))
+            if missing:
+                try:
+                    collection = self.vector_service.get_collection("math_curriculum_guide")
+                    embeddings = self.azure_service.get_embeddings(missing)
+                    with span("chroma.query", kind="chroma", collection="math_curriculum_guide", n=len(missing)):
+                        raw = collection.query(
+                            query_embeddings=embeddings,
+                            n_results=top_k,
+                            include=["documents", "metadatas", "distances"]
+                        )
+                    for q_idx, query in enumerate(missing):
+                        documents = raw["documents"][q_idx] if raw["documents"] else []
+                        found = [
+                            {
+                                "content": documents[i],
+                                "metadata": raw["metadatas"][q_idx][i],
+                                "distance": raw["distances"][q_idx][i]
+                            }
+                            for i in range(len(documents))
+                        ]
+                        results[query] = found
+                        self.vector_service.cache_put(("math_curriculum_guide", "query", query, top_k), found)
+                except Exception as e:
+                    print(f"교육과정 가이드 검색 실패: {e}")
+            return [results.get(query, []) for query in queries]
     
     def get_curriculum_units(self, grade: int, semester: int) -> List[str]:
         """
         특정 학년/학기의 교육과정 단원 목록 반환
         """
         try:
-            collection = self.vector_service.client.get_collection("curriculum_units")
-            
-            # 메타데이터 필터링으로 해당 학년/학기 단원 검색
-            results = collection.get(
-                where={
-                    "$and": [
-                        {"grade": {"$eq": grade}},
-                        {"semester": {"$eq": semester}}
-                    ]
-                },
-                include=["metadatas"]
-            )
-            
-            units = []
-            if results["metadatas"]:
-                for metadata in results["metadatas"]:
-                    units.append(metadata["unit"])
-            
-            return units
+            # 컬렉션 전체를 1회 조회해 (학년, 학기)별 색인으로 캐시 (이후 요청은 Chroma 조회 없음)
+            index = self.vector_service.cached(("curriculum_units", "index"), self._load_curriculum_index)
+            return list(index.get((grade, semester), []))
             
         except Exception as e:
             print(f"ChromaDB에서 교육과정 단원 검색 실패: {e}")
             # Fallback: JSON 파일에서 직접 읽기
             return self._get_curriculum_units_from_json(grade, semester)
     
+    def _load_curriculum_index(self) -> Dict[tuple, List[str]]:
+        collection = self.vector_service.get_collection("curriculum_units")
+        with span("chroma.get", kind="chroma", collection="curriculum_units"):
+            results = collection.get(include=["metadatas"])
+        if not results["metadatas"]:
+            raise ValueError("curriculum_units 컬렉션이 비어 있습니다")
+        index: Dict[tuple, List[str]] = {}
+        # id(unit_N) 순서 = curriculum.json 순서
+        ordered = sorted(zip(results["ids"], results["metadatas"]), key=lambda r: int(r[0].split("_")[-1]))
+        for _, metadata in ordered:
+            index.setdefault((metadata["grade"], metadata["semester"]), []).append(metadata["unit"])
+        return index
+
     def _get_curriculum_units_from_json(self, grade: int, semester: int) -> List[str]:
         """JSON 파일에서 직접 교육과정 단원 읽기 (fallback)"""
         try:
@@ -317,17 +342,23 @@ class RAGService:
         """
         특정 단원에 대한 가이드 문서 검색
         """
+        return self.search_unit_guides([unit_name], grade, semester, top_k).get(unit_name, [])
+
+    def search_unit_guides(self, unit_names: List[str], grade: int, semester: int, top_k: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        여러 단원의 가이드 문서를 한 번에 검색 (학년/학기 단원 전체를 묶어 조회하면 이후 다른 단원 요청은 캐시에서 응답)
+        """
         try:
             # 검색 쿼리 구성
-            query = f"{grade}학년 {semester}학기 수학 {unit_name} 단원 문제 출제 가이드 교육과정"
+            queries = [f"{grade}학년 {semester}학기 수학 {unit_name} 단원 문제 출제 가이드 교육과정" for unit_name in unit_names]
             
-            results = self.search_curriculum_guide(query, top_k)
-            if results:
-                return results
-            else:
-                print(f"PDF 가이드 검색 결과 없음: {unit_name}")
-                return []
+            guides = {}
+            for unit_name, results in zip(unit_names, self.search_curriculum_guide_many(queries, top_k)):
+                if not results:
+                    print(f"PDF 가이드 검색 결과 없음: {unit_name}")
+                guides[unit_name] = results
+            return guides
                 
         except Exception as e:
             print(f"단원 가이드 검색 실패: {e}")
-            return []
+            return {}
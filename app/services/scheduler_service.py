@@ -0,0 +1,112 @@
+"""
+다음 학습 스케줄러
+단원별 숙달도(mastery) 집계만으로 다음에 학습할 단원과 난이도 구성을 결정합니다. (LLM 호출 없음, 결정론적)
+- 아직 학습하지 않은 단원이 있으면 교육과정 순서대로 우선 배정
+- 그 외에는 간격 반복(숙달도가 높을수록 복습 간격 증가) + UCB 탐색 보너스로 우선순위 계산
+- 난이도 구성은 해당 단원의 난이도 구간별 정답률로 조정
+"""
+
+import json
+import math
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+# 기본 난이도 구성 (materials.txt 형식: 기본 3 / 추론 2 / 응용-기본 3 / 응용-중고급 2)
+DEFAULT_MIX = {"basic": 3, "reasoning": 2, "applied": 3, "advanced": 2}
+# 보충 학습 구성 (기본 정답률이 낮을 때)
+REMEDIAL_MIX = {"basic": 5, "reasoning": 3, "applied": 2, "advanced": 0}
+# 심화 학습 구성 (전반적으로 잘할 때)
+CHALLENGE_MIX = {"basic": 2, "reasoning": 2, "applied": 3, "advanced": 3}
+
+# 간격 반복 기본 간격(초)과 UCB 탐색 가중치
+BASE_INTERVAL = float(os.getenv("SCHEDULER_BASE_INTERVAL_SEC", str(24 * 3600)))
+UCB_WEIGHT = float(os.getenv("SCHEDULER_UCB_WEIGHT", "0.3"))
+
+_CURRICULUM_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resource', 'curriculum.json')
+_BAND_LABELS = {"basic": "기본", "reasoning": "추론", "applied": "응용", "advanced": "중고급"}
+
+
+@lru_cache(maxsize=1)
+def _curriculum_index() -> Dict[tuple, List[str]]:
+    with open(_CURRICULUM_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {(int(item.get("grade", 0)), int(item.get("semester", 0))): list(item.get("subjects") or []) for item in data}
+
+
+def load_curriculum_units(grade: int, semester: int) -> List[str]:
+    """curriculum.json의 학년/학기 단원 목록 (프로세스당 1회 로드)"""
+    try:
+        return list(_curriculum_index().get((int(grade), int(semester)), []))
+    except Exception:
+        return []
+
+
+class NextLessonScheduler:
+    def __init__(self, base_interval: float = BASE_INTERVAL, ucb_weight: float = UCB_WEIGHT):
+        self.base_interval = base_interval
+        self.ucb_weight = ucb_weight
+
+    def plan(self, units: List[str], mastery: List[Dict[str, Any]], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        다음 학습 계획
+        units: 후보 단원 목록(교육과정 순서), mastery: MasteryService.get_mastery() 결과
+        반환: {"unit", "mix", "reason"} (후보가 없으면 None)
+        """
+        if not units:
+            return None
+        now = now if now is not None else time.time()
+        by_unit = {m["unit"]: m for m in mastery or []}
+
+        # 1) 미학습 단원은 교육과정 순서대로
+        for unit in units:
+            if not by_unit.get(unit, {}).get("attempts"):
+                return {"unit": unit, "mix": dict(DEFAULT_MIX), "reason": "new"}
+
+        # 2) 간격 반복 + UCB
+        total_attempts = sum(by_unit[u]["attempts"] for u in units)
+        best_unit, best_priority = units[0], -1.0
+        for unit in units:
+            m = by_unit[unit]
+            level = self._level(m)
+            interval = self.base_interval * (2 ** round(level * 4))
+            elapsed = max(0.0, now - (m.get("updated_at") or 0.0))
+            overdue = min(elapsed / interval, 2.0)
+            explore = self.ucb_weight * math.sqrt(math.log(total_attempts + 1) / m["attempts"])
+            priority = (1.0 - level) * (0.5 + overdue) + explore
+            if priority > best_priority:
+                best_unit, best_priority = unit, priority
+
+        m = by_unit[best_unit]
+        return {"unit": best_unit, "mix": self._mix_for(m), "reason": "review" if self._level(m) < 0.8 else "spaced"}
+
+    @staticmethod
+    def _level(m: Dict[str, Any]) -> float:
+        """0~1 숙달도 (점수 EMA 우선, 없으면 정답률)"""
+        if m.get("ema_score") is not None:
+            return max(0.0, min(1.0, m["ema_score"] / 100.0))
+        return m.get("accuracy") or 0.0
+
+    @staticmethod
+    def _mix_for(m: Dict[str, Any]) -> Dict[str, int]:
+        bands = m.get("bands") or {}
+        basic = (bands.get("basic") or {}).get("accuracy")
+        advanced = (bands.get("advanced") or {}).get("accuracy")
+        if basic is not None and basic < 0.6:
+            return dict(REMEDIAL_MIX)
+        if (m.get("accuracy") or 0) >= 0.8 and (advanced is None or advanced >= 0.8):
+            return dict(CHALLENGE_MIX)
+        return dict(DEFAULT_MIX)
+
+
+def describe_mix(mix: Dict[str, int]) -> str:
+    return " / ".join(f"{_BAND_LABELS[b]} {n}" for b, n in mix.items() if n)
+
+
+def describe_plan(plan: Optional[Dict[str, Any]]) -> Optional[str]:
+    """다음 학습 추천 문구"""
+    if not plan:
+        return None
+    reason = {"new": "새 단원", "review": "복습 필요", "spaced": "간격 복습"}.get(plan["reason"], "")
+    return f"다음 추천 학습: {plan['unit']} ({reason}, {describe_mix(plan['mix'])})"
@@ -0,0 +1,110 @@
+"""
+동일 요청 병합 (single-flight)
+같은 키의 호출이 이미 실행 중이면 새로 실행하지 않고 그 결과를 함께 받음 (실패도 같은 예외로 전달)
+- burst_sec > 0: 완료된 결과를 그 시간 동안 보관해, 몇 초 간격으로 몰려드는 같은 요청도 결과를 공유
+- variant(): 같은 키를 N개 변형으로 나눠 round-robin (한 반 전체가 완전히 같은 학습지를 받지 않도록)
+- 메트릭: singleflight_requests_total{group,key,result=leader|shared|error},
+  singleflight_saved_seconds_total{group,key} (공유로 생략된 실행 시간 추정)
+
+사용:
+    guide_flight = SingleFlight("guide")
+    results = guide_flight.do((grade, semester, unit), lambda: rag_service.search_unit_guide(...))
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.services.metrics import SINGLEFLIGHT_REQUESTS, SINGLEFLIGHT_SAVED_SECONDS
+
+# 메트릭 key 레이블 상한 (초과분은 "other"로 집계, 자유 입력 단원명 등으로 레이블이 무한히 늘지 않도록)
+MAX_LABEL_KEYS = 200
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "finished_at", "duration")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished_at = 0.0
+        self.duration = 0.0
+
+
+class SingleFlight:
+    def __init__(self, group: str, burst_sec: float = 0.0):
+        self.group = group
+        self.burst_sec = burst_sec
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._variants: Dict[Hashable, int] = {}
+        self._labels: Dict[Hashable, str] = {}
+
+    def _label(self, key: Hashable) -> str:
+        label = self._labels.get(key)
+        if label is None:
+            label = "/".join(map(str, key)) if isinstance(key, tuple) else str(key)
+            if len(self._labels) >= MAX_LABEL_KEYS:
+                label = "other"
+            else:
+                self._labels[key] = label
+        return label
+
+    def _purge(self, now: float):
+        expired = [k for k, c in self._calls.items() if c.done.is_set() and now - c.finished_at >= self.burst_sec]
+        for key in expired:
+            del self._calls[key]
+
+    def variant(self, key: Hashable, variants: int) -> int:
+        """같은 키의 요청을 variants개 변형에 차례로 배정 (0..variants-1)"""
+        if variants <= 1:
+            return 0
+        with self._lock:
+            index = self._variants.get(key, 0)
+            self._variants[key] = index + 1
+            if len(self._variants) > MAX_LABEL_KEYS * 4:
+                self._variants.clear()
+        return index % variants
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        return self.do_ex(key, fn)[0]
+
+    def do_ex(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(결과, 공유 여부) 반환"""
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            label = self._label(key)
+        if not leader:
+            call.done.wait()
+            SINGLEFLIGHT_REQUESTS.inc(self.group, label, "shared")
+            SINGLEFLIGHT_SAVED_SECONDS.inc(self.group, label, amount=call.duration)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        start = time.perf_counter()
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            SINGLEFLIGHT_REQUESTS.inc(self.group, label, "error")
+            raise
+        finally:
+            call.duration = time.perf_counter() - start
+            call.finished_at = time.monotonic()
+            with self._lock:
+                # 실패 결과나 보관 시간이 없으면 바로 제거 (다음 요청은 새로 실행)
+                if call.error is not None or self.burst_sec <= 0:
+                    self._calls.pop(key, None)
+            call.done.set()
+        SINGLEFLIGHT_REQUESTS.inc(self.group, label, "leader")
+        return call.result, False
+
+    def inflight(self) -> int:
+        with self._lock:
+            return sum(1 for c in self._calls.values() if not c.done.is_set())
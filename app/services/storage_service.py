@@ -0,0 +1,402 @@
+"""
+SQLite 저장소 계층
+- WAL 모드 + busy_timeout: 읽기와 쓰기가 서로 막지 않고, 여러 프로세스(Streamlit/API/DB 관리자)가 같은 파일을 안전하게 공유
+- 읽기 커넥션 풀: 세션/스레드가 커넥션을 빌려 쓰고 반납 (커넥션별 prepared statement 캐시 재사용)
+- 단일 쓰기 커넥션 + 그룹 커밋: 동시에 들어온 쓰기 작업을 한 트랜잭션으로 묶어 커밋 횟수(fsync)를 줄임
+- 계정/학습 이력용 타입 지정 리포지토리 (AccountRepository, HistoryRepository)
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.services.history_digest_service import (
+    RECENT_WINDOW, MAX_DIGESTS, new_digest, fold_item, digest_for_prompt, extract_score, extract_unit
+)
+
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+STATEMENT_CACHE_SIZE = 256
+
+
+def open_connection(db_path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS) -> sqlite3.Connection:
+    """WAL/busy_timeout이 설정된 커넥션 (autocommit, 트랜잭션은 직접 BEGIN/COMMIT)"""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=busy_timeout_ms / 1000,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class _WriteJob:
+    __slots__ = ("fn", "done", "result", "error")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class SQLiteStorage:
+    def __init__(self, db_path: str, pool_size: int = POOL_SIZE, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=pool_size)
+        self._created = 0
+        self._pool_size = pool_size
+        self._pool_lock = threading.Lock()
+        # 쓰기: 단일 커넥션 + 그룹 커밋
+        self._writer = self._connect()
+        self._write_lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._pending: List[_WriteJob] = []
+        self.commits = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        return open_connection(self.db_path, self.busy_timeout_ms)
+
+    # ===== 읽기 =====
+    @contextmanager
+    def read(self):
+        """풀에서 읽기 커넥션을 빌려 사용 후 반납"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_create = self._created < self._pool_size
+                if can_create:
+                    self._created += 1
+            conn = self._connect() if can_create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def query_all(self, sql: str, params: Iterable[Any] = ()) -> List[tuple]:
+        with self.read() as conn:
+            return conn.execute(sql, tuple(params)).fetchall()
+
+    def query_one(self, sql: str, params: Iterable[Any] = ()) -> Optional[tuple]:
+        with self.read() as conn:
+            return conn.execute(sql, tuple(params)).fetchone()
+
+    # ===== 쓰기 =====
+    def run_write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        쓰기 작업 fn(conn)을 그룹 커밋으로 실행하고 결과 반환
+        먼저 쓰기 락을 잡은 스레드(리더)가 대기 중인 작업을 모두 한 트랜잭션으로 실행.
+        작업별 SAVEPOINT로 한 작업의 실패가 다른 작업에 영향을 주지 않음
+        """
+        job = _WriteJob(fn)
+        with self._queue_lock:
+            self._pending.append(job)
+        with self._write_lock:
+            if not job.done:
+                with self._queue_lock:
+                    batch, self._pending = self._pending, []
+                self._commit_batch(batch)
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _commit_batch(self, batch: List[_WriteJob]):
+        conn = self._writer
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    job.result = job.fn(conn)
+                    conn.execute("RELEASE SAVEPOINT job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO SAVEPOINT job")
+                    conn.execute("RELEASE SAVEPOINT job")
+                    job.error = e
+            conn.execute("COMMIT")
+            self.commits += 1
+            self.writes += len(batch)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for job in batch:
+                if job.error is None:
+                    job.error = e
+        finally:
+            for job in batch:
+                job.done = True
+
+    def write(self, sql: str, params: Iterable[Any] = ()) -> int:
+        """단일 쓰기 문장 실행, 영향받은 행 수 반환"""
+        params = tuple(params)
+        return self.run_write(lambda conn: conn.execute(sql, params).rowcount)
+
+    def write_many(self, sql: str, seq: Iterable[Iterable[Any]]) -> int:
+        rows = [tuple(p) for p in seq]
+        return self.run_write(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    def executescript(self, script: str):
+        """스키마 생성 등 DDL (트랜잭션 밖에서 실행)"""
+        with self._write_lock:
+            self._writer.executescript(script)
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# ===== 리포지토리 =====
+@dataclass
+class Account:
+    id: str
+    name: str
+    pw: str
+    grade: int
+    semester: int
+
+
+@dataclass
+class HistorySummary:
+    lesson_id: str
+    date: str
+    title: str
+    score: Optional[int] = None
+
+
+@dataclass
+class HistoryItem:
+    lesson_id: str
+    date: str
+    title: str
+    content: Optional[str]
+    materials_text: Optional[str]
+    feedback: Optional[str] = None
+
+
+def as_dict(obj) -> Optional[Dict[str, Any]]:
+    return asdict(obj) if obj is not None else None
+
+
+class AccountRepository:
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        storage.executescript("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                id TEXT PRIMARY KEY,
+                name TEXT,
+                pw TEXT,
+                grade INTEGER,
+                semester INTEGER
+            );
+        """)
+
+    def add(self, account: Account):
+        self.storage.write(
+            "INSERT INTO accounts (id, name, pw, grade, semester) VALUES (?, ?, ?, ?, ?)",
+            (account.id, account.name, account.pw, account.grade, account.semester)
+        )
+
+    def get(self, id: str) -> Optional[Account]:
+        row = self.storage.query_one("SELECT id, name, pw, grade, semester FROM accounts WHERE id=?", (id,))
+        return Account(*row) if row else None
+
+
+_DIGEST_COLUMNS = ["unit", "lessons", "scored", "score_sum", "min_score", "max_score", "last_score", "first_date", "last_date"]
+
+
+class HistoryRepository:
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+        storage.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                id TEXT,
+                lesson_id TEXT,
+                date TEXT,
+                title TEXT,
+                content TEXT,
+                materials_text TEXT,
+                feedback TEXT,
+                PRIMARY KEY (id, lesson_id)
+            );
+            CREATE TABLE IF NOT EXISTS history_digest (
+                id TEXT,
+                unit TEXT,
+                lessons INTEGER,
+                scored INTEGER,
+                score_sum INTEGER,
+                min_score INTEGER,
+                max_score INTEGER,
+                last_score INTEGER,
+                first_date TEXT,
+                last_date TEXT,
+                PRIMARY KEY (id, unit)
+            );
+            CREATE TABLE IF NOT EXISTS history_digest_state (
+                id TEXT PRIMARY KEY,
+                folded_date TEXT,
+                folded_lesson_id TEXT
+            );
+        """)
+        # 점수는 별도 컬럼으로 저장 (피드백 본문 정규식 파싱 제거)
+        columns = [r[1] for r in storage.query_all("PRAGMA table_info(history)")]
+        if "score" not in columns:
+            def _migrate(conn):
+                conn.execute("ALTER TABLE history ADD COLUMN score INTEGER")
+                rows = conn.execute("SELECT id, lesson_id, feedback FROM history WHERE feedback IS NOT NULL").fetchall()
+                conn.executemany("UPDATE history SET score=? WHERE id=? AND lesson_id=?",
+                                 [(extract_score(fb), i, l) for i, l, fb in rows])
+            storage.run_write(_migrate)
+        # 아동별 최신순 조회/키셋 페이지네이션용 인덱스
+        storage.executescript("CREATE INDEX IF NOT EXISTS idx_history_id_date ON history (id, date, lesson_id);")
+
+    def add(self, id: str, item: HistoryItem):
+        self.storage.write("""
+            INSERT OR REPLACE INTO history (id, lesson_id, date, title, content, materials_text, feedback, score)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (id, item.lesson_id, item.date, item.title, item.content, item.materials_text, item.feedback, extract_score(item.feedback)))
+
+    def save_lesson(self, id: str, title: str, lesson: str, materials_text: str, date: Optional[str] = None) -> HistoryItem:
+        """생성된 학습지를 새 lesson_id로 저장 (채점 결과는 update_feedback으로 갱신)"""
+        item = HistoryItem(
+            lesson_id=str(uuid.uuid4()),
+            date=date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            title=title,
+            content=lesson,
+            materials_text=materials_text,
+        )
+        self.add(id, item)
+        return item
+
+    def summary_page(self, id: str, before: Optional[Tuple[str, str]] = None, limit: int = 20) -> Tuple[List[HistorySummary], Optional[Tuple[str, str]]]:
+        """
+        이력 요약 (본문 제외, 최신순 키셋 페이지네이션)
+        before: 이전 페이지 마지막 항목의 (date, lesson_id). 다음 페이지 존재 여부 확인을 위해 limit+1건 조회
+        반환: (items, next_cursor)
+        """
+        if before:
+            rows = self.storage.query_all("""
+                SELECT lesson_id, date, title, score FROM history
+                WHERE id=? AND (date, lesson_id) < (?, ?)
+                ORDER BY date DESC, lesson_id DESC LIMIT ?
+            """, (id, before[0], before[1], limit + 1))
+        else:
+            rows = self.storage.query_all("""
+                SELECT lesson_id, date, title, score FROM history
+                WHERE id=? ORDER BY date DESC, lesson_id DESC LIMIT ?
+            """, (id, limit + 1))
+        items = [HistorySummary(*r) for r in rows[:limit]]
+        next_cursor = (items[-1].date, items[-1].lesson_id) if len(rows) > limit else None
+        return items, next_cursor
+
+    def get(self, id: str, lesson_id: str) -> Optional[HistoryItem]:
+        row = self.storage.query_one(
+            "SELECT lesson_id, date, title, content, materials_text, feedback FROM history WHERE id=? AND lesson_id=?",
+            (id, lesson_id)
+        )
+        return HistoryItem(*row) if row else None
+
+    def exists(self, id: str) -> bool:
+        return self.storage.query_one("SELECT 1 FROM history WHERE id=? LIMIT 1", (id,)) is not None
+
+    def materials_after(self, id: str, after: Optional[Tuple[str, str]] = None) -> List[Tuple[str, str, str]]:
+        """(date, lesson_id) 커서 이후 저장된 학습지 [(date, lesson_id, materials_text)] (오래된 순, 근접 중복 색인 증분 갱신용)"""
+        if after:
+            return self.storage.query_all("""
+                SELECT date, lesson_id, materials_text FROM history
+                WHERE id=? AND (date, lesson_id) > (?, ?) ORDER BY date, lesson_id
+            """, (id, after[0], after[1]))
+        return self.storage.query_all(
+            "SELECT date, lesson_id, materials_text FROM history WHERE id=? ORDER BY date, lesson_id", (id,)
+        )
+
+    def update_feedback(self, id: str, lesson_id: str, feedback: str):
+        score = extract_score(feedback)
+
+        def _update(conn):
+            conn.execute("UPDATE history SET feedback=?, score=? WHERE id=? AND lesson_id=?", (feedback, score, id, lesson_id))
+            # 이미 다이제스트로 압축된 학습을 뒤늦게 채점한 경우 점수만 다이제스트에 반영
+            row = conn.execute("""
+                SELECT h.date, substr(h.content, 1, 80) FROM history h
+                JOIN history_digest_state s ON s.id = h.id
+                WHERE h.id=? AND h.lesson_id=? AND (h.date, h.lesson_id) <= (s.folded_date, s.folded_lesson_id)
+            """, (id, lesson_id)).fetchone()
+            if row:
+                self._fold_into_digest(conn, id, row[1], row[0], score, count_lesson=False)
+        self.storage.run_write(_update)
+
+    # ----- 종합 피드백용 다이제스트 -----
+    @staticmethod
+    def _fold_into_digest(conn, id, topic, date, score, count_lesson=True):
+        unit = extract_unit(topic)
+        row = conn.execute(f"SELECT {', '.join(_DIGEST_COLUMNS)} FROM history_digest WHERE id=? AND unit=?", (id, unit)).fetchone()
+        digest = dict(zip(_DIGEST_COLUMNS, row)) if row else new_digest(unit)
+        fold_item(digest, date, score, count_lesson=count_lesson)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO history_digest (id, {', '.join(_DIGEST_COLUMNS)})
+            VALUES (?, {', '.join('?' for _ in _DIGEST_COLUMNS)})
+        """, (id, *[digest[k] for k in _DIGEST_COLUMNS]))
+
+    def fold_digests(self, id: str, window: int = RECENT_WINDOW):
+        """최근 window건을 제외한 아직 압축되지 않은 이력을 단원별 다이제스트에 누적 (증분)"""
+        def _fold(conn):
+            # 최근 window건 바로 앞 항목 = 압축 경계
+            boundary = conn.execute(
+                "SELECT date, lesson_id FROM history WHERE id=? ORDER BY date DESC, lesson_id DESC LIMIT 1 OFFSET ?",
+                (id, window)
+            ).fetchone()
+            if not boundary:
+                return 0
+            folded = conn.execute("SELECT folded_date, folded_lesson_id FROM history_digest_state WHERE id=?", (id,)).fetchone() or ("", "")
+            rows = conn.execute("""
+                SELECT lesson_id, date, substr(content, 1, 80), score FROM history
+                WHERE id=? AND (date, lesson_id) > (?, ?) AND (date, lesson_id) <= (?, ?)
+                ORDER BY date, lesson_id
+            """, (id, folded[0], folded[1], boundary[0], boundary[1])).fetchall()
+            for lesson_id, date, topic, score in rows:
+                self._fold_into_digest(conn, id, topic, date, score)
+            if rows:
+                conn.execute("INSERT OR REPLACE INTO history_digest_state (id, folded_date, folded_lesson_id) VALUES (?, ?, ?)",
+                             (id, boundary[0], boundary[1]))
+            return len(rows)
+        return self.storage.run_write(_fold)
+
+    def for_feedback(self, id: str, window: int = RECENT_WINDOW) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """종합 피드백 요청용 이력: (단원 다이제스트, 최근 window건(과거→최근))"""
+        self.fold_digests(id, window)
+        rows = self.storage.query_all("""
+            SELECT date, substr(content, 1, 80), feedback, score FROM history
+            WHERE id=? ORDER BY date DESC, lesson_id DESC LIMIT ?
+        """, (id, window))
+        recent = []
+        for date, content, feedback, score in reversed(rows):
+            recent.append({
+                # content 첫 줄에서 주제 추출
+                "topic": content.split('\n')[0][:30] if content else "",
+                "feedback": feedback or "",  # None/null을 빈 문자열로 보정
+                "date": date,
+                "score": score
+            })
+        digest_rows = self.storage.query_all(f"""
+            SELECT {', '.join(_DIGEST_COLUMNS)} FROM history_digest
+            WHERE id=? ORDER BY last_date DESC LIMIT ?
+        """, (id, MAX_DIGESTS))
+        digests = [digest_for_prompt(dict(zip(_DIGEST_COLUMNS, r))) for r in digest_rows]
+        return digests, recent
@@ -0,0 +1,339 @@
+"""
+요청 단위 지연 시간 추적 (span)
+- HTTP 요청 / LangGraph 노드 / LLM·임베딩 호출(토큰 수) / Chroma 연산을 span으로 기록
+- 내보내기(TRACE_EXPORTER, 쉼표로 여러 개 지정): jsonl(로컬 파일) | otel(OpenTelemetry) | langfuse
+- 샘플링(TRACE_SAMPLE_RATE): 루트 span에서 결정하고 하위 span은 루트를 따름
+- TRACE_EXPORTER가 비어 있으면(기본) span()은 공용 no-op 객체를 반환 (시간 측정/할당 없음)
+
+사용:
+    with span("chroma.query", collection="math_curriculum_guide") as s:
+        ...
+        s.set(n_results=3)
+
+    @traced("node.fetch_guide")
+    def fetch_guide_node(state): ...
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "./traces.jsonl")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "child-edu-ai")
+
+# 현재 실행 중인 span (스레드/비동기 태스크별, LangGraph/스레드풀 실행 시 컨텍스트 복사로 전달)
+_current: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+# 샘플링에서 제외된 루트 아래임을 표시
+_UNSAMPLED = object()
+
+_exporters: List[Any] = []
+_sample_rate = 1.0
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent", "attrs", "error",
+                 "start_ns", "end_ns", "_t0", "_token", "native")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.error: Optional[str] = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self._t0 = 0.0
+        self._token = None
+        # 내보내기별 원본 객체 (otel span, langfuse observation)
+        self.native: Dict[str, Any] = {}
+
+    def set(self, **attrs) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter()
+        for exporter in _exporters:
+            try:
+                exporter.on_start(self)
+            except Exception as e:
+                print(f"[tracing] {type(exporter).__name__} 시작 실패: {e}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = self.start_ns + int((time.perf_counter() - self._t0) * 1e9)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        for exporter in _exporters:
+            try:
+                exporter.on_end(self)
+            except Exception as e:
+                print(f"[tracing] {type(exporter).__name__} 기록 실패: {e}")
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+            "pid": os.getpid(),
+        }
+
+
+class _NoopSpan:
+    """추적 비활성/하위 미샘플링 span: 아무것도 기록하지 않음"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        return self
+
+
+class _UnsampledRoot(_NoopSpan):
+    """샘플링에서 제외된 루트: 하위 span도 기록하지 않도록 표시만 남김"""
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        self._token = _current.set(_UNSAMPLED)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        return False
+
+
+NOOP = _NoopSpan()
+
+
+def enabled() -> bool:
+    return bool(_exporters)
+
+
+def span(name: str, kind: str = "internal", **attrs):
+    """
+    span 컨텍스트 매니저 반환
+    kind: internal | http | node | llm | embedding | chroma
+    """
+    if not _exporters:
+        return NOOP
+    parent = _current.get()
+    if parent is _UNSAMPLED:
+        return NOOP
+    if parent is None and _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return _UnsampledRoot()
+    return Span(name, kind, parent, attrs)
+
+
+def traced(name: str, kind: str = "internal") -> Callable:
+    """함수 호출 전체를 span으로 기록하는 데코레이터 (비활성 시 플래그 확인 1회)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _exporters:
+                return fn(*args, **kwargs)
+            with span(name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span() -> Optional[Span]:
+    current = _current.get()
+    return current if isinstance(current, Span) else None
+
+
+def record_usage(s, usage) -> None:
+    """OpenAI 응답의 usage(토큰 수)를 span 속성으로 기록"""
+    if usage is None or not isinstance(s, Span):
+        return
+    s.set(
+        prompt_tokens=getattr(usage, "prompt_tokens", None),
+        completion_tokens=getattr(usage, "completion_tokens", None),
+        total_tokens=getattr(usage, "total_tokens", None),
+    )
+
+
+# ===== 내보내기 =====
+class JSONLExporter:
+    """span 종료 시 1줄(JSON)씩 로컬 파일에 추가 (프로세스 간에는 O_APPEND로 줄 단위 유지)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or TRACE_JSONL_PATH
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def on_start(self, s: Span):
+        pass
+
+    def on_end(self, s: Span):
+        line = json.dumps(s.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+
+class OTelExporter:
+    """
+    OpenTelemetry span으로 변환
+    opentelemetry-sdk와 OTLP 내보내기가 설치되어 있고 전역 TracerProvider가 없으면 OTLP(OTEL_EXPORTER_OTLP_ENDPOINT)로 전송하도록 설정
+    """
+
+    def __init__(self):
+        from opentelemetry import trace
+        from opentelemetry.trace import Status, StatusCode
+        self._trace = trace
+        self._error_status = lambda message: Status(StatusCode.ERROR, message)
+        self._provider = None
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            try:
+                from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+            except ImportError:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            if not isinstance(trace.get_tracer_provider(), TracerProvider):
+                self._provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+                self._provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                trace.set_tracer_provider(self._provider)
+        except ImportError:
+            pass  # API만 설치된 경우: 외부에서 설정한 전역 provider 사용 (opentelemetry-instrument 등)
+        self.tracer = trace.get_tracer(SERVICE_NAME)
+
+    def on_start(self, s: Span):
+        parent = s.parent.native.get("otel") if s.parent else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        s.native["otel"] = self.tracer.start_span(s.name, context=context, start_time=s.start_ns,
+                                                   attributes={"kind": s.kind})
+
+    def on_end(self, s: Span):
+        native = s.native.get("otel")
+        if native is None:
+            return
+        for key, value in s.attrs.items():
+            if value is not None:
+                native.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        if s.error:
+            native.set_status(self._error_status(s.error))
+        native.end(end_time=s.end_ns)
+
+    def shutdown(self):
+        if self._provider is not None:
+            self._provider.shutdown()
+
+
+class LangfuseExporter:
+    """
+    Langfuse(v2 SDK)로 전송: 루트 span → trace, LLM/임베딩 호출 → generation(토큰 수), 나머지 → span
+    키는 환경변수 LANGFUSE_PUBLIC_KEY / LANGFUSE_SECRET_KEY / LANGFUSE_HOST에서 읽음
+    """
+
+    def __init__(self):
+        from langfuse import Langfuse
+        self.client = Langfuse()
+
+    def on_start(self, s: Span):
+        from datetime import datetime, timezone
+        start_time = datetime.fromtimestamp(s.start_ns / 1e9, tz=timezone.utc)
+        parent = s.parent.native.get("langfuse") if s.parent else None
+        if parent is None:
+            s.native["langfuse"] = self.client.trace(id=s.trace_id, name=s.name, timestamp=start_time)
+        elif s.kind in ("llm", "embedding"):
+            s.native["langfuse"] = parent.generation(name=s.name, start_time=start_time, model=s.attrs.get("model"))
+        else:
+            s.native["langfuse"] = parent.span(name=s.name, start_time=start_time)
+
+    def on_end(self, s: Span):
+        from datetime import datetime, timezone
+        native = s.native.get("langfuse")
+        if native is None:
+            return
+        metadata = dict(s.attrs, duration_ms=round(s.duration_ms, 3))
+        if s.parent is None or s.parent.native.get("langfuse") is None:
+            native.update(metadata=metadata)
+            return
+        end_time = datetime.fromtimestamp(s.end_ns / 1e9, tz=timezone.utc)
+        kwargs = {"end_time": end_time, "metadata": metadata}
+        if s.error:
+            kwargs.update(level="ERROR", status_message=s.error)
+        if s.kind in ("llm", "embedding"):
+            kwargs["usage"] = {"input": s.attrs.get("prompt_tokens"), "output": s.attrs.get("completion_tokens")}
+        native.end(**kwargs)
+
+    def shutdown(self):
+        self.client.flush()
+
+
+EXPORTERS = {
+    "jsonl": JSONLExporter,
+    "otel": OTelExporter,
+    "langfuse": LangfuseExporter,
+}
+
+
+def configure(exporter: Optional[str] = None, sample_rate: Optional[float] = None) -> List[str]:
+    """
+    내보내기 설정 (기본: 환경변수). 설치되지 않은 내보내기는 경고 후 건너뜀. 활성화된 이름 목록 반환
+    exporter: "jsonl,otel" 형식, 빈 문자열이면 비활성
+    """
+    global _exporters, _sample_rate
+    shutdown()
+    names = [n.strip().lower() for n in (TRACE_EXPORTER if exporter is None else exporter).split(",") if n.strip()]
+    exporters, active = [], []
+    for name in names:
+        if name not in EXPORTERS:
+            print(f"[tracing] 알 수 없는 내보내기: {name}")
+            continue
+        try:
+            exporters.append(EXPORTERS[name]())
+            active.append(name)
+        except ImportError as e:
+            print(f"[tracing] {name} 내보내기 비활성 (패키지 없음: {e})")
+    _sample_rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    _exporters = exporters
+    return active
+
+
+def shutdown():
+    """내보내기 flush/종료 (앱 shutdown 시 호출)"""
+    global _exporters
+    exporters, _exporters = _exporters, []
+    for exporter in exporters:
+        try:
+            exporter.shutdown()
+        except Exception as e:
+            print(f"[tracing] {type(exporter).__name__} 종료 실패: {e}")
+
+
+configure()
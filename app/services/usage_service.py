@@ -0,0 +1,236 @@
+"""
+LLM 토큰/비용 원장과 예산 가드
+- 모든 chat/임베딩 응답의 usage를 usage_ledger 테이블에 1행씩 추가 (추가만, 수정 없음)
+- 어떤 요청(endpoint)/아동(child_id)에서 호출했는지는 usage_scope()로 지정한 요청 컨텍스트에서 가져옴
+- 집계: 엔드포인트 / 아동 / 배포(deployment) / 호출 위치(call)별 토큰·비용 합계 (GET /usage)
+- 예산 가드: 기간(일/월) 누적 비용이 USAGE_BUDGET_USD를 넘으면 chat 호출을 저가 배포(AOAI_DEPLOY_FALLBACK)로 전환,
+  USAGE_HARD_BUDGET_USD를 넘거나 저가 배포가 없으면 LLM 호출 대신 캐시된 결과만 사용 (BudgetExceededError)
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.metrics import BUDGET_ACTIONS
+from app.services.storage_service import SQLiteStorage
+
+# 100만 토큰당 USD (입력, 출력). 배포 이름 또는 응답의 model 이름에 키가 포함되면 적용 (긴 키 우선)
+DEFAULT_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+BUDGET_USD = float(os.getenv("USAGE_BUDGET_USD", "0"))  # 0이면 가드 비활성
+HARD_BUDGET_USD = float(os.getenv("USAGE_HARD_BUDGET_USD", "0"))
+BUDGET_PERIOD = os.getenv("USAGE_BUDGET_PERIOD", "day")  # day | month
+BUDGET_REFRESH_SEC = float(os.getenv("USAGE_BUDGET_REFRESH_SEC", "30"))
+FALLBACK_DEPLOYMENT = os.getenv("AOAI_DEPLOY_FALLBACK")
+
+ROLLUP_COLUMNS = ("endpoint", "child_id", "deployment", "call")
+
+_scope: contextvars.ContextVar = contextvars.ContextVar("usage_scope", default=(None, None))
+
+
+class BudgetExceededError(RuntimeError):
+    """예산 초과로 LLM 호출을 생략해야 할 때 (호출부는 캐시된 결과로 대체)"""
+
+
+@contextlib.contextmanager
+def usage_scope(endpoint: str, child_id: Optional[str] = None):
+    """이 블록 안의 LLM 호출을 endpoint/child_id로 원장에 기록"""
+    token = _scope.set((endpoint, child_id))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def load_prices() -> Dict[str, Tuple[float, float]]:
+    """기본 단가 + USAGE_PRICES_JSON(JSON 문자열 또는 파일 경로, {"배포": [입력, 출력]})"""
+    prices = dict(DEFAULT_PRICES)
+    raw = os.getenv("USAGE_PRICES_JSON", "")
+    if raw:
+        try:
+            if os.path.exists(raw):
+                with open(raw, encoding="utf-8") as f:
+                    raw = f.read()
+            prices.update({k: tuple(v) for k, v in json.loads(raw).items()})
+        except (OSError, ValueError, TypeError) as e:
+            print(f"[usage] USAGE_PRICES_JSON 읽기 실패: {e}")
+    return prices
+
+
+class UsageLedger:
+    def __init__(self, storage: SQLiteStorage, prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.storage = storage
+        self.prices = prices or load_prices()
+        self._price_keys = sorted(self.prices, key=len, reverse=True)
+        storage.executescript("""
+            CREATE TABLE IF NOT EXISTS usage_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                endpoint TEXT,
+                child_id TEXT,
+                call TEXT,
+                deployment TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                cost_usd REAL,
+                latency_ms INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_usage_ts ON usage_ledger(ts);
+        """)
+
+    def price(self, *names: Optional[str]) -> Tuple[float, float]:
+        for name in names:
+            lowered = (name or "").lower()
+            for key in self._price_keys:
+                if key in lowered:
+                    return self.prices[key]
+        return (0.0, 0.0)
+
+    def cost(self, deployment: str, prompt_tokens: int, completion_tokens: int, model: Optional[str] = None) -> float:
+        # 배포 이름에 단가가 지정되어 있으면 우선, 없으면 응답의 실제 모델 이름으로 조회
+        input_price, output_price = self.price(deployment, model)
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+
+    def record(self, call: str, deployment: str, usage: Any, latency_ms: float, model: Optional[str] = None) -> float:
+        """응답 1건의 usage 기록. 비용(USD) 반환"""
+        prompt_tokens = int(getattr(usage, "prompt_tokens", 0) or 0)
+        completion_tokens = int(getattr(usage, "completion_tokens", 0) or 0)
+        cost = self.cost(deployment, prompt_tokens, completion_tokens, model)
+        endpoint, child_id = _scope.get()
+        self.storage.write("""
+            INSERT INTO usage_ledger (ts, endpoint, child_id, call, deployment, prompt_tokens, completion_tokens, cost_usd, latency_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (time.time(), endpoint or "background", child_id, call, deployment,
+              prompt_tokens, completion_tokens, cost, int(latency_ms)))
+        return cost
+
+    def spend_since(self, since: float) -> float:
+        return self.storage.query_one("SELECT COALESCE(SUM(cost_usd), 0) FROM usage_ledger WHERE ts >= ?", (since,))[0]
+
+    def rollup(self, by: str = "endpoint", since: Optional[float] = None, child_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """by(endpoint|child_id|deployment|call)별 호출 수/토큰/비용/평균·p50 지연 합계 (비용 내림차순)"""
+        if by not in ROLLUP_COLUMNS:
+            raise ValueError(f"by는 {ROLLUP_COLUMNS} 중 하나여야 합니다")
+        where, params = ["ts >= ?"], [since or 0]
+        if child_id:
+            where.append("child_id = ?")
+            params.append(child_id)
+        rows = self.storage.query_all(f"""
+            SELECT {by}, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(cost_usd), AVG(latency_ms)
+            FROM usage_ledger WHERE {' AND '.join(where)}
+            GROUP BY {by} ORDER BY SUM(cost_usd) DESC, COUNT(*) DESC
+        """, params)
+        # p50: 그룹별 지연 시간 정렬 목록의 중앙값 (SQLite에 백분위 함수 없음)
+        latencies: Dict[Any, List[int]] = {}
+        for key, latency in self.storage.query_all(f"""
+            SELECT {by}, latency_ms FROM usage_ledger WHERE {' AND '.join(where)} ORDER BY {by}, latency_ms
+        """, params):
+            latencies.setdefault(key, []).append(latency or 0)
+        return [
+            {"key": key, "calls": calls, "prompt_tokens": prompt, "completion_tokens": completion,
+             "cost_usd": round(cost or 0, 6), "avg_latency_ms": round(latency or 0, 1),
+             "p50_latency_ms": _median(latencies.get(key, []))}
+            for key, calls, prompt, completion, cost, latency in rows
+        ]
+
+
+def _median(sorted_values: List[int]) -> float:
+    n = len(sorted_values)
+    if not n:
+        return 0.0
+    mid = n // 2
+    return float(sorted_values[mid]) if n % 2 else (sorted_values[mid - 1] + sorted_values[mid]) / 2
+
+
+def period_start(period: str = BUDGET_PERIOD, now: Optional[float] = None) -> float:
+    """현재 예산 기간의 시작 시각 (로컬 시간 자정 / 월초)"""
+    current = datetime.fromtimestamp(now if now is not None else time.time())
+    start = current.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "month":
+        start = start.replace(day=1)
+    return start.timestamp()
+
+
+class BudgetGuard:
+    """
+    기간 누적 비용에 따라 chat 호출 배포 결정
+    - 누적 비용은 원장에서 BUDGET_REFRESH_SEC마다 다시 읽고(멀티 워커 합산), 그 사이에는 이 프로세스 기록분을 더함
+    """
+
+    def __init__(self, ledger: UsageLedger, budget_usd: float = BUDGET_USD, hard_budget_usd: float = HARD_BUDGET_USD,
+                 fallback_deployment: Optional[str] = FALLBACK_DEPLOYMENT, period: str = BUDGET_PERIOD,
+                 refresh_sec: float = BUDGET_REFRESH_SEC):
+        self.ledger = ledger
+        self.budget_usd = budget_usd
+        self.hard_budget_usd = hard_budget_usd
+        self.fallback_deployment = fallback_deployment
+        self.period = period
+        self.refresh_sec = refresh_sec
+        self._lock = threading.Lock()
+        self._spend = 0.0
+        self._period_start = 0.0
+        self._refreshed_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_usd > 0 or self.hard_budget_usd > 0
+
+    def spend(self) -> float:
+        now = time.time()
+        start = period_start(self.period, now)
+        with self._lock:
+            if start == self._period_start and now - self._refreshed_at < self.refresh_sec:
+                return self._spend
+        spend = self.ledger.spend_since(start)
+        with self._lock:
+            self._spend, self._period_start, self._refreshed_at = spend, start, now
+        return spend
+
+    def add(self, cost: float):
+        with self._lock:
+            self._spend += cost
+
+    def mode(self) -> str:
+        """ok | downgrade | cache_only"""
+        if not self.enabled:
+            return "ok"
+        spend = self.spend()
+        if self.hard_budget_usd > 0 and spend >= self.hard_budget_usd:
+            return "cache_only"
+        if self.budget_usd > 0 and spend >= self.budget_usd:
+            return "downgrade" if self.fallback_deployment else "cache_only"
+        return "ok"
+
+    def route(self, call: str, deployment: str) -> str:
+        """이 호출에 사용할 배포. 캐시만 허용되는 상태면 BudgetExceededError"""
+        mode = self.mode()
+        if mode == "downgrade":
+            BUDGET_ACTIONS.inc("downgrade", call)
+            return self.fallback_deployment
+        if mode == "cache_only":
+            BUDGET_ACTIONS.inc("cache_only", call)
+            raise BudgetExceededError(f"예산 초과로 LLM 호출 생략: {call}")
+        return deployment
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode(),
+            "period": self.period,
+            "spend_usd": round(self.spend(), 6) if self.enabled else None,
+            "budget_usd": self.budget_usd or None,
+            "hard_budget_usd": self.hard_budget_usd or None,
+            "fallback_deployment": self.fallback_deployment,
+        }
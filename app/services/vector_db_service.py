@@ -1,30 +1,156 @@
-from chromadb import PersistentClient
+from chromadb import PersistentClient, HttpClient
+from chromadb.config import Settings
 import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
 from app.services.azure_openai_service import AzureOpenAIService
+from app.services.tracing import span
+from app.services.metrics import CACHE_REQUESTS
 import openai
 
+# embedded: 로컬 디렉터리(PersistentClient), http: Chroma 서버(HttpClient, 여러 API 복제본이 공유)
+CHROMA_MODE = os.getenv("CHROMA_MODE", "embedded")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_SSL = os.getenv("CHROMA_SSL", "").lower() in ("1", "true", "yes")
+# http 모드 keep-alive 커넥션 풀 크기
+CHROMA_HTTP_MAX_CONNECTIONS = int(os.getenv("CHROMA_HTTP_MAX_CONNECTIONS", "20"))
+# 교육과정 컬렉션 조회 결과 로컬 캐시 유지 시간(초)
+CHROMA_CACHE_TTL = float(os.getenv("CHROMA_CACHE_TTL_SEC", "600"))
+# add 1회당 최대 건수
+CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "64"))
+
 class VectorDBService:
-    def __init__(self, persist_directory):
-        self.client = PersistentClient(path=persist_directory)
-        self.collection = self.client.get_or_create_collection(name="learning")
+    def __init__(self, persist_directory, mode: Optional[str] = None, host: Optional[str] = None,
+                 port: Optional[int] = None, ssl: Optional[bool] = None, cache_ttl: float = CHROMA_CACHE_TTL):
+        self.persist_directory = persist_directory
+        self.mode = mode or CHROMA_MODE
+        self.host = host or CHROMA_HOST
+        self.port = port or CHROMA_PORT
+        self.ssl = CHROMA_SSL if ssl is None else ssl
+        self.cache_ttl = cache_ttl
+        # 클라이언트는 첫 사용 시 생성 (멀티 워커: fork 이후 워커별로 생성, fork 전에 만든 클라이언트는 재사용하지 않음)
+        self._client = None
+        self._collection = None
+        self._collections: Dict[str, Any] = {}
+        self._cache: Dict[Any, tuple] = {}
+        self._pid = None
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
         # self.dep_curriculum = os.getenv("AOAI_DEPLOY_GPT4O")  # Uncomment if needed
 
+    def _create_client(self):
+        if self.mode == "http":
+            settings = Settings(
+                anonymized_telemetry=False,
+                chroma_http_keepalive_secs=60.0,
+                chroma_http_max_keepalive_connections=CHROMA_HTTP_MAX_CONNECTIONS,
+            )
+            return HttpClient(host=self.host, port=self.port, ssl=self.ssl, settings=settings)
+        return PersistentClient(path=self.persist_directory)
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                self._client = self._create_client()
+                self._collection = None
+                self._collections = {}
+                self._pid = os.getpid()
+            return self._client
+
+    @property
+    def collection(self):
+        client = self.client
+        with self._lock:
+            if self._collection is None:
+                self._collection = client.get_or_create_collection(name="learning")
+            return self._collection
+
+    def get_collection(self, name: str):
+        """컬렉션 핸들 재사용 (http 모드에서 조회마다 컬렉션 메타 요청 제거). 없으면 예외"""
+        client = self.client
+        with self._lock:
+            handle = self._collections.get(name)
+        if handle is None:
+            with span("chroma.get_collection", kind="chroma", collection=name):
+                handle = client.get_collection(name)
+            with self._lock:
+                self._collections[name] = handle
+        return handle
+
+    def invalidate(self, name: Optional[str] = None):
+        """컬렉션 재생성/삭제 시 핸들과 조회 캐시 폐기"""
+        with self._lock:
+            if name is None:
+                self._collections.clear()
+                self._cache.clear()
+            else:
+                self._collections.pop(name, None)
+                for key in [k for k in self._cache if k[0] == name]:
+                    del self._cache[key]
+
+    def cache_get(self, key: tuple) -> Any:
+        """로컬 조회 캐시 (key[0]은 컬렉션 이름). 없거나 만료되면 None"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.cache_hits += 1
+                CACHE_REQUESTS.inc("chroma_read", "hit")
+                return entry[1]
+            self.cache_misses += 1
+            CACHE_REQUESTS.inc("chroma_read", "miss")
+            return None
+
+    def cache_put(self, key: tuple, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + (self.cache_ttl if ttl is None else ttl), value)
+
+    def cache_size(self) -> int:
+        return len(self._cache)
+
+    def cached(self, key: tuple, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        읽기 캐시 (read-through)
+        TTL 안에서는 Chroma에 다시 묻지 않고 로컬 값을 반환. 예외는 캐시하지 않음
+        """
+        value = self.cache_get(key)
+        if value is None:
+            value = loader()
+            self.cache_put(key, value, ttl)
+        return value
+
+    def add_batched(self, collection, ids: List[str], documents: List[str], embeddings: List[List[float]],
+                    metadatas: List[Dict[str, Any]], batch_size: int = CHROMA_BATCH_SIZE):
+        """여러 건을 batch_size 단위로 묶어 add (요청 수 감소)"""
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            with span("chroma.add", kind="chroma", collection=collection.name, n=len(ids[start:end])):
+                collection.add(ids=ids[start:end], documents=documents[start:end],
+                               embeddings=embeddings[start:end], metadatas=metadatas[start:end])
+
     def add_assessment(self, student_id: str, lesson_id: str, responses: list, materials_text: str, azure_service):
         print(f"add_assessment called: student_id={student_id}, lesson_id={lesson_id}, responses={responses}")
         embedding = azure_service.get_embedding(" ".join(responses))
         metadata = {"student_id": student_id, "lesson_id": lesson_id, "type": "assessment", "materials_text": materials_text}
-        self.collection.add(
-            documents=[" ".join(responses)],
-            embeddings=[embedding],
-            ids=[f"{student_id}_{lesson_id}_resp"],
-            metadatas=[metadata]
-        )
+        # 같은 (학생, 학습지) 응답은 고정 ID → 재제출/아웃박스 재시도에도 add 중복 오류 없이 덮어씀
+        with span("chroma.upsert", kind="chroma", collection="learning", n=1):
+            self.collection.upsert(
+                documents=[" ".join(responses)],
+                embeddings=[embedding],
+                ids=[f"{student_id}_{lesson_id}_resp"],
+                metadatas=[metadata]
+            )
         print("add_assessment finished")
 
     def query_by_grade_semester(self, grade: int, semester: int, top_k: int = 5) -> list:
         """학년/학기 메타데이터로 필터링하여 자료 조회 (임베딩 불필요)"""
         where = {"$and": [{"grade": grade}, {"semester": semester}]}
-        res = self.collection.get(where=where)
+        with span("chroma.get", kind="chroma", collection="learning") as s:
+            res = self.collection.get(where=where)
+            s.set(n=len(res.get("ids") or []))
         documents = res.get("documents", []) or []
         metadatas = res.get("metadatas", []) or []
         # 길이 정렬 및 상한 적용
@@ -50,7 +176,8 @@ class VectorDBService:
                 {"type": "assessment"}
             ]
         }
-        results = self.collection.get(where=where)
+        with span("chroma.get", kind="chroma", collection="learning"):
+            results = self.collection.get(where=where)
         if not results["ids"]:
             return None
         latest_idx = -1
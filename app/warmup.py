@@ -0,0 +1,38 @@
+"""
+멀티 워커 기동 전 1회 실행하는 워밍업
+gunicorn.conf.py의 on_starting 훅에서 별도 프로세스로 실행합니다. (마스터 프로세스에는 Chroma/SQLite 연결을 만들지 않음)
+- RAG 데이터(PDF/교육과정 JSON) 임베딩 적재: 워커들이 fork 이후 동시에 Chroma에 쓰지 않도록 여기서 한 번만 수행
+
+실행: python -m app.warmup
+"""
+
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from app.services.azure_openai_service import AzureOpenAIService
+from app.services.vector_db_service import VectorDBService
+from app.services.rag_service import RAGService
+from app.services.storage_service import SQLiteStorage
+from app.services.usage_service import UsageLedger, usage_scope
+
+
+def warm_up() -> bool:
+    load_dotenv()
+    vector_service = VectorDBService(persist_directory=os.getenv("CHROMA_DB_PATH", "./chroma_db"))
+    azure_service = AzureOpenAIService(
+        endpoint=os.getenv("AOAI_ENDPOINT"),
+        key=os.getenv("AOAI_API_KEY"),
+        dep_curriculum=os.getenv("AOAI_DEPLOY_GPT4O"),
+        dep_embed=os.getenv("AOAI_DEPLOY_EMBED_3_LARGE"),
+        usage_ledger=UsageLedger(SQLiteStorage(os.getenv("SERVER_DB_PATH", "./server_data.db")))
+    )
+    rag_service = RAGService(vector_service, azure_service)
+    print("RAG 시스템 초기화 중 (워커 기동 전)...")
+    with usage_scope("warmup"):
+        return rag_service.initialize_rag_data()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if warm_up() else 1)
@@ -1,7 +1,8 @@
 from langgraph.graph import StateGraph, START, END
 from app.workflow.nodes import (
     init_profile_node,
-    fetch_course_node,
+    fetch_related_docs_node,
+    fetch_guide_node,
     generate_materials_node,
     submit_assessment_node,
     create_feedback_node,
@@ -10,18 +11,23 @@ from app.workflow.nodes import (
 from app.models.schemas import EducationWorkflowState
 
 def create_init_profile_graph() -> StateGraph:
-    """초기 프로필 기반 교재 생성 워크플로우"""
+    """
+    초기 프로필 기반 교재 생성 워크플로우
+    init_profile → (관련 자료 | 단원·숙달도 → 가이드 검색) 병렬 분기 → 합류 후 학습지 생성
+    """
     graph = StateGraph(state_schema=EducationWorkflowState)
     
     # 노드 추가
     graph.add_node("init_profile", init_profile_node)
-    graph.add_node("fetch_course", fetch_course_node)
+    graph.add_node("fetch_related_docs", fetch_related_docs_node)
+    graph.add_node("fetch_guide", fetch_guide_node)
     graph.add_node("generate_materials", generate_materials_node)
     
-    # 엣지 연결
+    # 엣지 연결 (리스트 시작점: 모든 분기가 끝난 뒤 실행)
     graph.add_edge(START, "init_profile")
-    graph.add_edge("init_profile", "fetch_course")
-    graph.add_edge("fetch_course", "generate_materials")
+    graph.add_edge("init_profile", "fetch_related_docs")
+    graph.add_edge("init_profile", "fetch_guide")
+    graph.add_edge(["fetch_guide", "fetch_related_docs"], "generate_materials")
     graph.add_edge("generate_materials", END)
     
     return graph.compile()
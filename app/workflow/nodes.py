@@ -5,129 +5,453 @@ dotenv_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
 load_dotenv(dotenv_path)
 
 import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from app.services.azure_openai_service import AzureOpenAIService
 from app.services.vector_db_service import VectorDBService
 from app.services.rag_service import RAGService
+from app.services.storage_service import SQLiteStorage, HistoryRepository
+from app.services.feedback_cache_service import FeedbackSummaryCache
+from app.services.outbox_service import AssessmentOutbox
+from app.services.problem_bank_service import ProblemBank, problem_id, render_worksheet
+from app.services.near_duplicate_service import NearDuplicateDetector
+from app.services.arithmetic_generator import ArithmeticGenerator, supports as arithmetic_supports
+from app.services.answer_key_verifier import verify_problem, BROKEN
+from app.services.azure_openai_service import parse_worksheet_and_key
+from app.services.usage_service import UsageLedger, BudgetGuard, BudgetExceededError
+from app.services.tracing import traced
+from app.services.metrics import CACHE_REQUESTS, BRANCH_TIMEOUTS, NEAR_DUPLICATES, WORKSHEETS, ANSWER_KEY_CHECKS, BROKEN_PROBLEMS
+from app.services.singleflight import SingleFlight
+from app.services.history_digest_service import compact_history, extract_unit, extract_grade_semester
+from app.services.mastery_service import MasteryService
+from app.services.scheduler_service import NextLessonScheduler, DEFAULT_MIX, load_curriculum_units, describe_plan
 from app.models.schemas import EducationWorkflowState, LearningResponse, FeedbackResponse, OverallFeedbackResponse
 
 key = os.getenv("AOAI_API_KEY")
 endpoint = os.getenv("AOAI_ENDPOINT")
-if not key:
-    raise RuntimeError("환경변수 AOAI_API_KEY가 설정되어 있지 않습니다.")
+if not key or not endpoint:
+    # import는 허용 (벤치/점검 스크립트), LLM 호출 시점에 오류. 키 없이 로컬 실행은 etc/fake_aoai_server.py 참고
+    print("[nodes] 경고: 환경변수 AOAI_API_KEY/AOAI_ENDPOINT가 설정되어 있지 않습니다. LLM 호출은 실패합니다.")
+server_storage = SQLiteStorage(os.getenv("SERVER_DB_PATH", "./server_data.db"))
+# LLM 토큰/비용 원장 + 예산 가드 (USAGE_BUDGET_USD 미설정 시 기록만)
+usage_ledger = UsageLedger(server_storage)
+budget_guard = BudgetGuard(usage_ledger)
 azure_service = AzureOpenAIService(
-    endpoint=os.getenv("AOAI_ENDPOINT"),
-    key=key,
+    endpoint=endpoint or "https://unset.openai.azure.com/",
+    key=key or "unset",
     dep_curriculum=os.getenv("AOAI_DEPLOY_GPT4O"),
     dep_embed=os.getenv("AOAI_DEPLOY_EMBED_3_LARGE"),
+    # 해설/종합 피드백 등 저부담 작업용 (미설정 시 모든 작업이 AOAI_DEPLOY_GPT4O)
+    dep_mini=os.getenv("AOAI_DEPLOY_GPT4O_MINI"),
+    usage_ledger=usage_ledger,
+    budget_guard=budget_guard,
 )
 vector_service = VectorDBService(persist_directory=os.getenv("CHROMA_DB_PATH", "./chroma_db"))
 rag_service = RAGService(vector_service, azure_service)
+feedback_cache = FeedbackSummaryCache(server_storage)
+mastery_service = MasteryService(server_storage)
+history_repo = HistoryRepository(server_storage)
+# 평가 응답의 Chroma 쓰기는 아웃박스를 거쳐 단일 writer가 수행 (멀티 워커 안전)
+assessment_outbox = AssessmentOutbox(
+    server_storage, vector_service, azure_service,
+    lock_path=os.getenv("CHROMA_WRITER_LOCK", server_storage.db_path + ".chroma-writer.lock")
+)
+scheduler = NextLessonScheduler()
+# 문제 은행: 생성된 문항을 저장하고, 문항이 충분한 단원은 LLM 없이 학습지 조립
+problem_bank = ProblemBank(server_storage, azure_service)
+PROBLEM_BANK_ASSEMBLE = os.getenv("PROBLEM_BANK_ASSEMBLE", "1") == "1"
+# 계산 단원(덧셈/곱셈/분수 계산 등)은 은행에 문항이 모자라도 LLM 대신 템플릿 생성기로 출제 (문장제 단원은 LLM)
+arithmetic = ArithmeticGenerator()
+ARITHMETIC_GENERATOR = os.getenv("ARITHMETIC_GENERATOR", "1") == "1"
+# 근접 중복 문항을 계산 생성기로 다시 뽑는 최대 횟수
+ARITHMETIC_RETRIES = 5
+# 근접 중복 문항: 아동 이력과 거의 같은 문항은 은행 문항으로 교체, 없으면 그 문항만 LLM으로 재출제(NEARDUP_REPAIR)
+near_duplicates = NearDuplicateDetector(history_repo)
+NEARDUP_CHECK = os.getenv("NEARDUP_CHECK", "1") == "1"
+NEARDUP_REPAIR = os.getenv("NEARDUP_REPAIR", "1") == "1"
+# 정답 키 검증: 계산 문항의 키를 유리수 계산으로 확인해 교정, 맞는 보기가 없거나 여러 개인 문항은 근접 중복과 같은 순서로 교체
+ANSWER_KEY_CHECK = os.getenv("ANSWER_KEY_CHECK", "1") == "1"
+
+# init_profile 조회 분기별 시간 제한(초): 초과 시 기본값(빈 결과)으로 학습지 생성을 진행
+BRANCH_TIMEOUTS_SEC = {
+    "units": float(os.getenv("FETCH_UNITS_TIMEOUT_SEC", "5")),
+    "related_docs": float(os.getenv("FETCH_DOCS_TIMEOUT_SEC", "3")),
+    "mastery": float(os.getenv("FETCH_MASTERY_TIMEOUT_SEC", "3")),
+    "guide": float(os.getenv("FETCH_GUIDE_TIMEOUT_SEC", "8")),
+}
+# 시간 제한 대기용 풀: 초과된 조회는 백그라운드에서 끝까지 실행 (결과는 캐시에만 반영)
+_branch_pool = ThreadPoolExecutor(max_workers=int(os.getenv("FETCH_BRANCH_WORKERS", "16")), thread_name_prefix="fetch-branch")
+
+
+def start_branch(fn):
+    """조회를 풀에서 시작 (요청 컨텍스트: 추적 span, usage 범위 유지)"""
+    return _branch_pool.submit(contextvars.copy_context().run, fn)
+
+
+def branch_result(branch: str, future, default):
+    """BRANCH_TIMEOUTS_SEC[branch] 안에 끝나지 않거나 실패하면 default 반환"""
+    try:
+        return future.result(timeout=BRANCH_TIMEOUTS_SEC[branch])
+    except FutureTimeoutError:
+        BRANCH_TIMEOUTS.inc(branch)
+        print(f"[init_profile] {branch} 조회 시간 초과 ({BRANCH_TIMEOUTS_SEC[branch]}s) → 기본값으로 진행")
+    except Exception as e:
+        print(f"[init_profile] {branch} 조회 실패: {e}")
+    return default
+
+
+def run_with_timeout(branch: str, fn, default):
+    return branch_result(branch, start_branch(fn), default)
+
+# 동일 요청 병합: 같은 학년/학기/단원 요청이 몰릴 때 조회는 항상, 학습지 생성은 설정 시 결과 공유
+SINGLEFLIGHT_RETRIEVAL = os.getenv("SINGLEFLIGHT_RETRIEVAL", "1") == "1"
+SINGLEFLIGHT_WORKSHEET = os.getenv("SINGLEFLIGHT_WORKSHEET", "0") == "1"
+# 학습지 공유 시 변형 수 (같은 키의 요청을 N개 생성에 round-robin) / 완료 후 공유 유지 시간(초)
+WORKSHEET_VARIANTS = int(os.getenv("SINGLEFLIGHT_WORKSHEET_VARIANTS", "1"))
+WORKSHEET_BURST_SEC = float(os.getenv("SINGLEFLIGHT_BURST_SEC", "30"))
+retrieval_flights = {name: SingleFlight(name) for name in ("units", "related_docs", "guide")}
+worksheet_flight = SingleFlight("worksheet", burst_sec=WORKSHEET_BURST_SEC)
+
+
+def coalesced(group: str, key: tuple, fn):
+    """조회 병합이 켜져 있으면 같은 키의 실행 중 조회 결과를 공유"""
+    if not SINGLEFLIGHT_RETRIEVAL:
+        return fn()
+    return retrieval_flights[group].do(key, fn)
 
+
+def normalize_subject(subject) -> str:
+    return " ".join((subject or "").split()).lower()
+
+
+def worksheet_key(profile, plan) -> tuple:
+    """학습지 공유 키: 학년/학기/단원/난이도 구성 (추가 요청이 있거나 단원이 정해지지 않으면 None → 공유 안 함)"""
+    if getattr(profile, "extra_request", None):
+        return None
+    unit = normalize_subject(profile.subject) or (plan["unit"] if plan else "")
+    if not unit:
+        return None
+    mix = tuple(sorted(plan["mix"].items())) if plan and not profile.subject else ()
+    return (profile.grade, profile.semester, unit, mix)
+
+@traced("node.init_profile", kind="node")
 def init_profile_node(state: EducationWorkflowState) -> EducationWorkflowState:
     """아동 프로필 정보 확인 (현재는 특별한 동작 없음)"""
     return state
 
-def fetch_course_node(state: EducationWorkflowState) -> EducationWorkflowState:
-    """학년/학기 기반 교육과정 조회 (RAG 시스템 사용)"""
-    if state.child_profile:
-        # RAG 시스템에서 해당 학년/학기의 교육과정 단원 조회
-        units = rag_service.get_curriculum_units(
-            grade=state.child_profile.grade,
-            semester=state.child_profile.semester
-        )
-        
-        # 기존 ChromaDB 검색도 병행 (호환성 유지)
-        docs = vector_service.query_by_grade_semester(
-            grade=state.child_profile.grade,
-            semester=state.child_profile.semester
-        )
-        
-        state.related_docs = docs
-        state.curriculum_units = units  # 새로운 필드 추가
-    return state
+# ===== init_profile 병렬 조회 분기 =====
+# 분기 노드는 자기 필드만 담은 dict를 반환 (같은 단계에서 병렬 실행되는 노드끼리 상태 키가 겹치지 않도록)
+# LangGraph는 단계(superstep) 단위로 실행되므로, 가이드 검색이 의존하는 단원/숙달도 조회는 별도 노드가 아닌
+# 가이드 분기 안에서 동시에 실행 (관련 자료 조회가 느려도 가이드 검색이 그 단계 종료를 기다리지 않음)
+@traced("node.fetch_related_docs", kind="node")
+def fetch_related_docs_node(state: EducationWorkflowState) -> dict:
+    """기존 ChromaDB 학년/학기 자료 조회 (호환성 유지)"""
+    if not state.child_profile:
+        return {}
+    profile = state.child_profile
+    docs = run_with_timeout("related_docs", lambda: coalesced(
+        "related_docs", (profile.grade, profile.semester),
+        lambda: vector_service.query_by_grade_semester(grade=profile.grade, semester=profile.semester)
+    ), [])
+    return {"related_docs": docs}
+
+@traced("node.fetch_guide", kind="node")
+def fetch_guide_node(state: EducationWorkflowState) -> dict:
+    """
+    단원 목록 + 숙달도 동시 조회 → 출제 단원 결정(스케줄러, LLM 호출 없음) → 해당 단원의 교육과정 가이드 검색
+    """
+    if not state.child_profile:
+        return {}
+    profile = state.child_profile
+    specified_subject = profile.subject
+    units_future = start_branch(lambda: coalesced(
+        "units", (profile.grade, profile.semester),
+        lambda: rag_service.get_curriculum_units(grade=profile.grade, semester=profile.semester)
+    ))
+    # 단원 미지정 시에만 스케줄러 입력(숙달도) 필요
+    mastery_future = None if specified_subject else start_branch(lambda: mastery_service.get_mastery(profile.child_id))
+    curriculum_units = branch_result("units", units_future, [])
+    mastery = branch_result("mastery", mastery_future, []) if mastery_future else []
+    plan = None
+    if curriculum_units and not specified_subject:
+        plan = scheduler.plan(curriculum_units, mastery)
+        print(f"[scheduler] plan={plan}")
+    curriculum_guide = ""
+    if curriculum_units:
+        # 출제할 단원에 대한 가이드 검색: 학년/학기 단원 전체를 한 번에 조회해 다른 단원을 받는 아동은 캐시에서 응답
+        unit_name = specified_subject or (plan["unit"] if plan else curriculum_units[0])
+        if unit_name in curriculum_units:
+            guide_key, guide_units = (profile.grade, profile.semester), list(curriculum_units)
+        else:
+            guide_key, guide_units = (profile.grade, profile.semester, unit_name), [unit_name]
+        guides = run_with_timeout("guide", lambda: coalesced(
+            "guide", guide_key,
+            lambda: rag_service.search_unit_guides(guide_units, grade=profile.grade, semester=profile.semester, top_k=3)
+        ), {})
+        guide_results = guides.get(unit_name, [])
+        if guide_results:
+            curriculum_guide = "\n\n".join([result["content"] for result in guide_results[:2]])
+    return {"curriculum_units": curriculum_units, "lesson_plan": plan, "curriculum_guide": curriculum_guide}
 
+@traced("node.generate_materials", kind="node")
 def generate_materials_node(state: EducationWorkflowState) -> EducationWorkflowState:
     """맞춤 교재 및 평가 문제 생성 (자료가 없어도 생성되도록)"""
     if state.child_profile:
-        curriculum_text = f"{state.child_profile.grade}학년 {state.child_profile.semester}학기 수학"
         related_docs = state.related_docs or []
-        # RAG 시스템에서 교육과정 가이드 검색
-        curriculum_units = getattr(state, 'curriculum_units', [])
-        curriculum_guide = ""
-        if curriculum_units:
-            # 첫 번째 단원에 대한 가이드 검색
-            unit_name = curriculum_units[0] if curriculum_units else ""
-            guide_results = rag_service.search_unit_guide(
-                unit_name=unit_name,
-                grade=state.child_profile.grade,
-                semester=state.child_profile.semester,
-                top_k=3
-            )
-            
-            if guide_results:
-                curriculum_guide = "\n\n".join([result["content"] for result in guide_results[:2]])
-        
+        curriculum_units = state.curriculum_units or []
+        specified_subject = getattr(state.child_profile, 'subject', None)
+        curriculum_guide = state.curriculum_guide or ""
+        plan = state.lesson_plan
+        extra_request = getattr(state.child_profile, 'extra_request', None)
+
         # 학년/학기에 맞는 주제를 자동 선택하여 문제 생성 (RAG 가이드 포함)
-        lesson, materials = azure_service.generate_materials_for_grade_semester_with_rag(
-            state.child_profile.grade,
-            state.child_profile.semester,
-            related_docs,
-            curriculum_units,
-            curriculum_guide,
-            specified_subject=getattr(state.child_profile, 'subject', None),
-            extra_request=getattr(state.child_profile, 'extra_request', None)
+        def generate():
+            return azure_service.generate_materials_for_grade_semester_with_rag(
+                state.child_profile.grade,
+                state.child_profile.semester,
+                related_docs,
+                curriculum_units,
+                curriculum_guide,
+                specified_subject=specified_subject,
+                extra_request=extra_request,
+                scheduled_unit=plan["unit"] if plan else None,
+                difficulty_mix=plan["mix"] if plan and plan["mix"] != DEFAULT_MIX else None
+            )
+
+        # 문제 은행 우선: 단원이 정해지고 추가 요청이 없으면 아동이 보지 않은 문항으로 조립
+        bank_unit = specified_subject if specified_subject in curriculum_units else (plan["unit"] if plan else None)
+        assembled = None
+        if PROBLEM_BANK_ASSEMBLE and bank_unit and not extra_request:
+            assembled = problem_bank.assemble(
+                state.child_profile.child_id, state.child_profile.grade, state.child_profile.semester,
+                bank_unit, plan["mix"] if plan else DEFAULT_MIX
+            )
+            CACHE_REQUESTS.inc("problem_bank", "hit" if assembled else "miss")
+        source = "bank" if assembled is not None else "llm"
+        if (assembled is None and ARITHMETIC_GENERATOR and bank_unit and not extra_request
+                and arithmetic_supports(state.child_profile.grade, state.child_profile.semester, bank_unit)):
+            assembled = arithmetic.worksheet(
+                state.child_profile.grade, state.child_profile.semester,
+                bank_unit, plan["mix"] if plan else DEFAULT_MIX
+            )
+            source = "arithmetic"
+        WORKSHEETS.inc(source)
+
+        key = worksheet_key(state.child_profile, plan) if SINGLEFLIGHT_WORKSHEET else None
+        if assembled is not None:
+            lesson, materials = assembled
+        elif key is None:
+            lesson, materials = generate()
+        else:
+            # 같은 단원 요청이 몰리면 생성 결과 공유 (아동별 lesson_id/이력은 각각 저장)
+            key += (worksheet_flight.variant(key, WORKSHEET_VARIANTS),)
+            lesson, materials = worksheet_flight.do(key, generate)
+        if NEARDUP_CHECK or ANSWER_KEY_CHECK:
+            lesson, materials = review_problems(state.child_profile, bank_unit or extract_unit(lesson), lesson, materials)
+        materials_text = "\n".join(materials)
+        # 학습지를 서버에 저장 (채점 시 lesson_id만으로 조회)
+        extracted_title = lesson.split(']')[-1].split('\n')[0].strip() or '수학'
+        subject_text = f" - {specified_subject}" if specified_subject else ""
+        saved = history_repo.save_lesson(
+            state.child_profile.child_id,
+            title=f"{state.child_profile.grade}학년 {state.child_profile.semester}학기 {extracted_title}{subject_text}",
+            lesson=lesson,
+            materials_text=materials_text
         )
-        lesson_id = azure_service.save_lesson(state.child_profile.child_id, lesson, related_docs)
+        # 학습지 문항을 은행에 저장 (새 문항만 추가, 추가 요청 반영 문항/바로 다시 만들 수 있는 계산 문항 제외, 백그라운드)
+        if not extra_request and source != "arithmetic":
+            problem_bank.ingest_async(state.child_profile.child_id, lesson, materials_text, saved.lesson_id)
 
         state.lesson = lesson
         state.materials = materials
-        state.lesson_id = lesson_id
+        state.lesson_id = saved.lesson_id
 
-        materials_text = "\n".join(materials)
         state.learning_response = LearningResponse(
             lesson=lesson,
             materials_text=materials_text,
-            lesson_id=lesson_id
+            lesson_id=saved.lesson_id,
+            title=saved.title,
+            date=saved.date
         )
     return state
 
+def review_problems(profile, unit: str, lesson: str, materials: list):
+    """
+    학습지 문항 점검 후 문제 있는 문항만 고침 (학습지 전체 재생성 없음)
+    - 정답 키 검증(ANSWER_KEY_CHECK): 키만 틀리면 키 교정, 맞는 보기가 없거나 여러 개/같은 보기면 교체
+    - 근접 중복(NEARDUP_CHECK): 아동이 이미 푼 문항과 거의 같으면 교체
+    교체: 계산 단원은 생성기로 다시 뽑기 → 은행의 같은 단원/구간 문항 → 없으면 1문항 재출제 → 그래도 없으면 원래 문항 유지
+    """
+    problems, key_map = parse_worksheet_and_key("\n".join(materials))
+    if not problems or any(p["number"] not in key_map for p in problems):
+        return lesson, materials
+    fixed, broken = False, set()
+    for p in problems:
+        p["answer"] = key_map[p["number"]]
+        if ANSWER_KEY_CHECK:
+            status, p["answer"] = verify_problem(p, p["answer"])
+            ANSWER_KEY_CHECKS.inc(status)
+            fixed = fixed or status == "fixed"
+            if status in BROKEN:
+                broken.add(p["number"])
+    flagged = near_duplicates.find(profile.child_id, problems) if NEARDUP_CHECK else {}
+    if not (fixed or broken or flagged):
+        return lesson, materials
+
+    def reject(problem):
+        """교체 후보 검사: 잘못된 보기거나 근접 중복이면 제외 (키만 틀린 후보는 키 교정)"""
+        if ANSWER_KEY_CHECK:
+            status, problem["answer"] = verify_problem(problem, problem["answer"])
+            if status in BROKEN:
+                return True
+        return NEARDUP_CHECK and near_duplicates.is_near_duplicate(profile.child_id, problem)
+
+    in_sheet = {problem_id(p["stem"], p["choices"]) for p in problems}
+    for p in problems:
+        if p["number"] not in flagged and p["number"] not in broken:
+            continue
+        counter = NEAR_DUPLICATES if p["number"] in flagged else BROKEN_PROBLEMS
+        replacement = None
+        if ARITHMETIC_GENERATOR and arithmetic_supports(profile.grade, profile.semester, unit):
+            action = "regenerated"
+            for _ in range(ARITHMETIC_RETRIES):
+                candidate = arithmetic.problem(profile.grade, profile.semester, unit, p["band"])
+                if problem_id(candidate["stem"], candidate["choices"]) not in in_sheet and not reject(candidate):
+                    replacement = candidate
+                    break
+        if replacement is None:
+            action = "swapped"
+            replacement = problem_bank.pick(profile.child_id, profile.grade, profile.semester, unit, p["band"],
+                                            exclude=in_sheet, reject=reject)
+        if replacement is None and NEARDUP_REPAIR:
+            action = "repaired"
+            try:
+                replacement = azure_service.generate_replacement_problem(
+                    profile.grade, profile.semester, unit, p["band"], avoid=[p["stem"]])
+            except Exception as e:
+                print(f"[review] 문항 재출제 실패: {e}")
+            if replacement is not None and reject(replacement):
+                replacement = None
+        if replacement is None:
+            counter.inc("kept")
+            continue
+        p.update(stem=replacement["stem"], choices=replacement["choices"], answer=replacement["answer"])
+        in_sheet.add(problem_id(p["stem"], p["choices"]))
+        counter.inc(action)
+
+    content = render_worksheet(problems)
+    header = lesson.split("\n", 1)[0]
+    return f"{header}\n\n{content}", [content.split("[Worksheet]", 1)[1].strip()]
+
+@traced("node.submit_assessment", kind="node")
 def submit_assessment_node(state: EducationWorkflowState) -> EducationWorkflowState:
     """평가 응답 저장"""
     if state.assessment_input:
-        vector_service.add_assessment(
+        # 학습지 본문은 서버 저장본 사용 (요청에는 ID와 답안만)
+        saved = history_repo.get(state.assessment_input.child_id, state.assessment_input.lesson_id)
+        if saved:
+            state.assessment_input.materials_text = saved.materials_text
+            grade, semester = extract_grade_semester(saved.content)
+            state.assessment_input.unit = state.assessment_input.unit or extract_unit(saved.content)
+            state.assessment_input.grade = state.assessment_input.grade or grade
+            state.assessment_input.semester = state.assessment_input.semester or semester
+        if not state.assessment_input.materials_text:
+            return state
+        assessment_outbox.enqueue(
             student_id=state.assessment_input.child_id,
             lesson_id=state.assessment_input.lesson_id,
             responses=[state.assessment_input.responses_text],
-            materials_text=state.assessment_input.materials_text,
-            azure_service=azure_service
+            materials_text=state.assessment_input.materials_text
         )
         state.responses = state.assessment_input.responses_text
     return state
 
+@traced("node.create_feedback", kind="node")
 def create_feedback_node(state: EducationWorkflowState) -> EducationWorkflowState:
     """피드백 및 다음 교재 생성"""
     if state.responses and state.assessment_input:
         # 결정론적 객관식 채점으로 정확도 향상
-        feedback = azure_service.grade_multiple_choice(
+        graded = azure_service.grade_responses(
             state.assessment_input.materials_text,
             state.responses
         )
+        # 단원별 숙달도 집계 증분 갱신 (LLM 호출 전, 채점 결과만 사용)
+        per_q, score = graded
+        mastery_service.record_assessment(
+            child_id=state.assessment_input.child_id,
+            unit=state.assessment_input.unit,
+            lesson_id=state.assessment_input.lesson_id,
+            per_q=per_q,
+            score=score
+        )
+        feedback = azure_service.grade_multiple_choice(
+            state.assessment_input.materials_text,
+            state.responses,
+            graded=graded
+        )
         state.feedback = feedback
+        history_repo.update_feedback(state.assessment_input.child_id, state.assessment_input.lesson_id, feedback)
+        # 다음 학습 추천: 갱신된 숙달도로 로컬 스케줄링 (추가 LLM 호출 없음)
+        next_lesson = None
+        if state.assessment_input.grade and state.assessment_input.semester:
+            units = load_curriculum_units(state.assessment_input.grade, state.assessment_input.semester)
+            plan = scheduler.plan(units, mastery_service.get_mastery(state.assessment_input.child_id))
+            next_lesson = describe_plan(plan)
+        state.next_lesson = next_lesson
         state.feedback_response = FeedbackResponse(
-            feedback=feedback
+            feedback=feedback,
+            next_lesson=next_lesson
         )
     return state
 
+@traced("node.create_overall_feedback", kind="node")
 def create_overall_feedback_node(state: EducationWorkflowState) -> EducationWorkflowState:
-    """학습 이력 기반 종합 피드백 생성"""
+    """학습 이력 기반 종합 피드백 생성 (이력 다이제스트 캐시 사용)"""
     # 필요한 정보: 이름, 나이, 이력 리스트(history)
+    # 이력을 보내지 않은 요청은 서버에 저장된 이력(다이제스트 + 최근 N건) 사용
+    if state.child_profile and not state.history and state.child_profile.child_id not in (None, "", "dummy"):
+        state.history_digests, state.history = history_repo.for_feedback(state.child_profile.child_id)
     if state.child_profile and hasattr(state, 'history') and state.history:
-        # history: [{interests, topic, feedback}, ...] 형태로 가정
-        feedback = azure_service.create_overall_feedback(
-            name=state.child_profile.name,
-            grade=state.child_profile.grade,
-            semester=state.child_profile.semester,
-            history=state.history
-        )
+        profile = state.child_profile
+        # 오래된 이력은 단원별 다이제스트로 압축, 최근 N건만 원문 유지 → 프롬프트 크기 제한
+        digests, recent = compact_history(state.history, state.history_digests)
+        # child_id가 없는 요청("dummy")은 캐시하지 않음
+        use_cache = bool(profile.child_id) and profile.child_id != "dummy"
+        # 단원별 숙달도 집계 (O(단원 수) 조회)
+        mastery = mastery_service.get_mastery(profile.child_id) if use_cache else []
+        status, cached, delta = ("miss", None, recent)
+        if use_cache:
+            status, cached, delta = feedback_cache.lookup(profile.child_id, recent, context=[digests, mastery])
+        CACHE_REQUESTS.inc("overall_feedback", status if use_cache else "bypass")
+        print(f"[overall_feedback] cache={status} recent={len(recent)} digests={len(digests)} delta={len(delta)}")
+
+        if status == "hit":
+            feedback = cached
+        elif status == "delta":
+            # 이전 요약 + 새 이력만 전송하여 토큰/지연 절감
+            try:
+                feedback = azure_service.update_overall_feedback(
+                    name=profile.name,
+                    grade=profile.grade,
+                    semester=profile.semester,
+                    previous_summary=cached,
+                    new_history=delta
+                )
+            except BudgetExceededError:
+                # 예산 초과: 직전 종합 피드백을 그대로 반환 (캐시 갱신 없음)
+                state.overall_feedback_response = OverallFeedbackResponse(feedback=cached)
+                return state
+        else:
+            # history: [{topic, date, feedback}, ...] 형태로 가정
+            feedback = azure_service.create_overall_feedback(
+                name=profile.name,
+                grade=profile.grade,
+                semester=profile.semester,
+                history=recent,
+                digests=digests,
+                mastery=mastery
+            )
+        if use_cache and status != "hit":
+            feedback_cache.store(profile.child_id, recent, feedback, context=[digests, mastery])
         state.overall_feedback_response = OverallFeedbackResponse(feedback=feedback)
     return state
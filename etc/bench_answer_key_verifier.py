@@ -0,0 +1,63 @@
+"""
+정답 키 검증 벤치마크
+계산 단원 생성기 문항의 정답 키를 일부러 틀리게 바꾸거나 보기 하나를 지워 맞는 보기를 없앤 뒤
+검증기가 (1) 맞는 키는 ok (2) 틀린 키는 fixed로 원래 정답을 찾고 (3) 맞는 보기가 없으면 no_answer 인지,
+문장제/부정 발문은 skipped로 두는지 확인하고 문항당 검증 시간을 측정합니다.
+
+실행: python etc/bench_answer_key_verifier.py [단원·구간별 문항 수]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.answer_key_verifier import verify_problem, CHOICE_LABELS
+from app.services.arithmetic_generator import ArithmeticGenerator, UNIT_SPECS
+from app.services.azure_openai_service import DIFFICULTY_BANDS
+
+WORD_PROBLEMS = [
+    {"stem": "사과가 12개씩 3봉지 있습니다. 사과는 모두 몇 개입니까?", "choices": {"A": "36", "B": "15", "C": "9", "D": "4"}},
+    {"stem": "다음 중 계산 결과가 다른 하나는 무엇입니까?\n㉠ 3 + 4", "choices": {"A": "7", "B": "8", "C": "9", "D": "10"}},
+    {"stem": "12 × 3 = 36입니다. 36 ÷ 4의 몫은?", "choices": {"A": "9", "B": "8", "C": "7", "D": "6"}},
+    {"stem": "쿠키를 한 번에 3 × 4개씩 구웠고, 그중 2개를 먹었습니다. 남은 쿠키는 몇 개입니까?",
+     "choices": {"A": "10개", "B": "12개", "C": "14개", "D": "8개"}},
+    {"stem": "길이가 12 + 8 cm인 끈을 반으로 자르면 한 도막은 몇 cm입니까?",
+     "choices": {"A": "10 cm", "B": "20 cm", "C": "16 cm", "D": "4 cm"}},
+]
+
+
+def run(problems):
+    results, times = Counter(), []
+    for problem, key, expected in problems:
+        start = time.perf_counter()
+        status, answer = verify_problem(problem, key)
+        times.append((time.perf_counter() - start) * 1e6)
+        results[(status, answer == expected)] += 1
+    return results, statistics.median(times), max(times)
+
+
+if __name__ == "__main__":
+    per_band = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = random.Random(1)
+    gen = ArithmeticGenerator(seed=1)
+    correct, wrong_key, no_answer = [], [], []
+    for grade, semester, unit in UNIT_SPECS:
+        for band in DIFFICULTY_BANDS:
+            for _ in range(per_band):
+                p = gen.problem(grade, semester, unit, band)
+                correct.append((p, p["answer"], p["answer"]))
+                wrong_key.append((p, rng.choice([c for c in CHOICE_LABELS if c != p["answer"]]), p["answer"]))
+                wrong = "몫 999, 나머지 0" if p["choices"][p["answer"]].startswith("몫") else "9999"
+                broken = dict(p, choices=dict(p["choices"], **{p["answer"]: wrong}))
+                no_answer.append((broken, p["answer"], p["answer"]))
+
+    for name, problems in [("맞는 키", correct), ("틀린 키", wrong_key), ("맞는 보기 없음", no_answer),
+                           ("문장제/부정 발문", [(p, "A", "A") for p in WORD_PROBLEMS])]:
+        results, p50, worst = run(problems)
+        summary = ", ".join(f"{status}{'' if ok else '(키 불일치)'} {count}" for (status, ok), count in results.most_common())
+        print(f"{name:<10} {len(problems):>6}문항 | {summary} | 문항당 p50 {p50:.1f}µs, max {worst:.0f}µs")
@@ -0,0 +1,76 @@
+"""
+계산 단원 문항 생성기 벤치마크 / 문제 은행 채우기
+(1) 단원별 학습지 1장(10문항) 생성 시간과 문항당 시간 (LLM 출제 1회는 수 초)
+(2) batch() 일괄 생성 처리량 (numpy 벡터화 추출 vs 문항별 추출, 벡터화는 조건 있는 덧셈/뺄셈만)
+(3) 생성한 학습지가 모두 materials.txt 형식으로 파싱되고 보기 4개가 서로 다른지 검사
+
+실행: python etc/bench_arithmetic_generator.py [단원별 학습지 수]
+은행 채우기: python etc/bench_arithmetic_generator.py --fill-bank [구간별 문항 수]
+    (SERVER_DB_PATH의 problem_bank에 계산 단원 × 난이도 구간마다 문항 저장, 아동 노출 기록 없음)
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import arithmetic_generator as ag
+from app.services.azure_openai_service import DIFFICULTY_BANDS, parse_worksheet_and_key
+from app.services.scheduler_service import DEFAULT_MIX
+
+
+def check(lesson_materials):
+    problems, key_map = parse_worksheet_and_key(lesson_materials[1][0])
+    return (len(problems) == sum(DEFAULT_MIX.values())
+            and all(p["number"] in key_map and len(set(p["choices"].values())) == 4 for p in problems))
+
+
+def bench_worksheets(runs):
+    gen = ag.ArithmeticGenerator(seed=1)
+    print(f"{'단원':<36} | {'학습지 p50 ms':>13} {'문항당 µs':>10} {'형식 오류':>9}")
+    for grade, semester, unit in ag.UNIT_SPECS:
+        times, bad = [], 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = gen.worksheet(grade, semester, unit, DEFAULT_MIX)
+            times.append((time.perf_counter() - start) * 1000)
+            bad += not check(result)
+        p50 = statistics.median(times)
+        print(f"{f'{grade}-{semester} {unit}':<36} | {p50:>13.3f} {p50 * 1000 / sum(DEFAULT_MIX.values()):>10.1f} {bad:>9}")
+
+
+def bench_batch(n=20000):
+    gen = ag.ArithmeticGenerator(seed=2)
+    for grade, semester, unit in [(2, 1, "덧셈과 뺄셈"), (2, 2, "곱셈구구"), (3, 1, "나눗셈")]:
+        start = time.perf_counter()
+        gen.batch(grade, semester, unit, "basic", n)
+        vectorized = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(n):
+            gen.problem(grade, semester, unit, "basic")
+        single = time.perf_counter() - start
+        print(f"batch {grade}-{semester} {unit} x{n}: {n / vectorized:,.0f}문항/s (문항별 생성 {n / single:,.0f}문항/s, numpy: {ag.np is not None})")
+
+
+def fill_bank(per_band):
+    from app.services.problem_bank_service import ProblemBank
+    from app.services.storage_service import SQLiteStorage
+
+    bank = ProblemBank(SQLiteStorage(os.getenv("SERVER_DB_PATH", "./server_data.db")), embed=False)
+    gen = ag.ArithmeticGenerator()
+    start = time.perf_counter()
+    total = 0
+    for grade, semester, unit in ag.UNIT_SPECS:
+        for band in DIFFICULTY_BANDS:
+            total += bank.add_problems(grade, semester, unit, gen.batch(grade, semester, unit, band, per_band))
+    print(f"새 문항 {total}개 저장 ({time.perf_counter() - start:.1f}s), 구간별: {bank.counts()}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--fill-bank":
+        fill_bank(int(sys.argv[2]) if len(sys.argv) > 2 else 200)
+    else:
+        bench_worksheets(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
+        bench_batch()
@@ -0,0 +1,89 @@
+"""
+해설 요청 묶음 처리(micro-batching) 벤치마크
+해설 LLM 호출을 지연 모델(기본 지연 + 문항당 출력 지연)과 동시 호출 상한(rate limit 대신)이 있는 대역 함수로 바꾸고,
+제출 N건이 초당 R건으로 들어올 때 (1) 제출마다 개별 호출 (2) ExplanationBatcher 묶음 호출 의
+LLM 호출 수, 처리 시간, 요청 지연 p50/p99, 지연 상한을 넘겨 개별 호출로 전환된 수를 비교합니다.
+
+실행: python etc/bench_explanation_batch.py [제출 수] [초당 제출 수]
+    조정: BENCH_BASE_MS(호출 기본 지연), BENCH_ITEM_MS(문항당 출력 지연), BENCH_CONCURRENCY(동시 호출 상한),
+          EXPLAIN_BATCH_WINDOW_MS, EXPLAIN_BATCH_MAX_ITEMS, EXPLAIN_BATCH_TIMEOUT_SEC
+"""
+
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.explanation_batcher import ExplanationBatcher, BatchTimeoutError, WINDOW_MS, MAX_ITEMS, TIMEOUT_SEC
+
+BASE_MS = float(os.getenv("BENCH_BASE_MS", "400"))
+ITEM_MS = float(os.getenv("BENCH_ITEM_MS", "30"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "4"))
+ITEMS_PER_SUBMISSION = 10
+
+
+class FakeLLM:
+    """동시 호출 상한이 있는 해설 호출 대역 (지연 = 기본 + 문항 수 × 문항당)"""
+
+    def __init__(self):
+        self.slots = threading.Semaphore(CONCURRENCY)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def explain(self, items):
+        with self.slots:
+            with self.lock:
+                self.calls += 1
+            time.sleep((BASE_MS + ITEM_MS * len(items)) / 1000)
+        return {item["number"]: f"{item['stem']} 해설" for item in items}
+
+
+def run(submissions, rate, batched):
+    llm = FakeLLM()
+    batcher = ExplanationBatcher(llm.explain) if batched else None
+    latencies, errors, fallbacks = [], [], []
+    rng = random.Random(1)
+
+    def submit(i):
+        items = [{"number": n, "stem": f"s{i}-{n}"} for n in range(1, ITEMS_PER_SUBMISSION + 1)]
+        start = time.perf_counter()
+        try:
+            try:
+                result = batcher.submit(items) if batcher else llm.explain(items)
+            except BatchTimeoutError:
+                # 서비스와 같이 지연 상한을 넘긴 묶음은 개별 호출로 전환
+                fallbacks.append(i)
+                result = llm.explain(items)
+            assert result == {n: f"s{i}-{n} 해설" for n in range(1, ITEMS_PER_SUBMISSION + 1)}
+        except Exception as e:
+            errors.append(e)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = []
+    start = time.perf_counter()
+    for i in range(submissions):
+        t = threading.Thread(target=submit, args=(i,))
+        t.start()
+        threads.append(t)
+        time.sleep(rng.expovariate(rate))
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return llm.calls, elapsed, statistics.median(latencies), p99, len(fallbacks), len(errors)
+
+
+if __name__ == "__main__":
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"제출 {submissions}건, 초당 {rate}건, 호출 지연 {BASE_MS:.0f}ms + 문항당 {ITEM_MS:.0f}ms, 동시 호출 {CONCURRENCY}, "
+          f"창 {WINDOW_MS:.0f}ms, 묶음 최대 {MAX_ITEMS}문항, 지연 상한 {TIMEOUT_SEC:.0f}s")
+    print(f"{'mode':>8} | {'LLM 호출':>8} {'처리 s':>7} {'p50 ms':>8} {'p99 ms':>8} {'개별 전환':>8} {'오류':>4}")
+    for name, batched in [("개별", False), ("묶음", True)]:
+        calls, elapsed, p50, p99, fallbacks, errors = run(submissions, rate, batched)
+        print(f"{name:>8} | {calls:>8} {elapsed:>7.1f} {p50:>8.0f} {p99:>8.0f} {fallbacks:>8} {errors:>4}")
@@ -0,0 +1,69 @@
+"""
+종합 피드백 프롬프트 크기/생성 시간 벤치마크
+학습 이력 10 / 100 / 1000건에 대해
+(1) 전체 이력을 그대로 넣는 기존 방식
+(2) 서버가 요청마다 전체 이력을 압축하는 방식 (구 클라이언트 호환 경로)
+(3) 클라이언트가 저장해 둔 다이제스트 + 최근 N건만 보내는 방식 (기본 경로)
+의 프롬프트 길이와 빌드 시간을 비교합니다.
+
+실행: python etc/bench_history_window.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from jinja2 import Environment, FileSystemLoader
+from app.services.history_digest_service import compact_history
+
+template_dir = os.path.join(os.path.dirname(__file__), '..', 'prompts')
+env = Environment(loader=FileSystemLoader(template_dir))
+UNITS = ["덧셈과 뺄셈", "곱셈", "나눗셈", "평면도형", "길이와 시간", "분수와 소수"]
+
+
+def make_history(n, seed=0):
+    rnd = random.Random(seed)
+    history = []
+    for i in range(n):
+        score = rnd.choice([40, 60, 70, 80, 90, 100])
+        feedback = (
+            f"[Score]\n총점: {score} 점\n\n[PerQuestion]\n"
+            + "\n".join(f"{q}) 학생: (A) | 정답: (B) | 채점: X" for q in range(1, 11))
+            + "\n\n[Explanations]\n"
+            + "\n".join(f"{q}) 정답: (B) - 간단한 풀이 과정을 따라 정답 보기를 확인해 보세요." for q in range(1, 11))
+            + "\n\n[Feedback]\n좋아요! 틀린 유형의 개념을 복습해 봅시다.\n"
+        )
+        history.append({
+            "topic": f"[3학년 1학기] {rnd.choice(UNITS)}",
+            "feedback": feedback,
+            "date": f"2025-{1 + i // 300:02d}-{1 + (i // 10) % 28:02d} 10:{i % 60:02d}:00",
+        })
+    return history
+
+
+def render(history, digests):
+    tmpl = env.get_template("feedback_summary.txt")
+    return tmpl.render(name="홍길동", grade=3, semester=1, history=history, digests=digests)
+
+
+def bench(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - start) / repeat * 1000, out
+
+
+if __name__ == "__main__":
+    print(f"{'lessons':>8} | {'full chars':>10} {'ms':>6} | {'server-compact chars':>20} {'ms':>6} | {'persisted chars':>15} {'ms':>6}")
+    for n in (10, 100, 1000):
+        history = make_history(n)
+        full_ms, full_prompt = bench(lambda: render(history, []))
+        server_ms, server_prompt = bench(lambda: render(*reversed(compact_history(history))))
+        # 클라이언트에 누적 저장된 다이제스트 (요청 시점에는 이미 계산되어 있음)
+        stored_digests, _ = compact_history(history[:-5], window=0)
+        recent = history[-5:]
+        persisted_ms, persisted_prompt = bench(lambda: render(*reversed(compact_history(recent, stored_digests))))
+        print(f"{n:>8} | {len(full_prompt):>10} {full_ms:>6.2f} | {len(server_prompt):>20} {server_ms:>6.2f} | {len(persisted_prompt):>15} {persisted_ms:>6.2f}")
@@ -0,0 +1,116 @@
+"""
+init_profile 워크플로우 병렬 분기 벤치마크
+조회 서비스(단원 색인, 관련 자료, 숙달도, 가이드 검색)와 학습지 생성을 지정한 지연의 대역 함수로 바꾼 뒤
+(1) 직렬: init_profile → 단원 → 관련 자료 → 숙달도 → 가이드 → 생성 (기존 fetch_course → generate_materials 순서)
+(2) 병렬: create_init_profile_graph() (관련 자료 | 단원·숙달도 동시 → 가이드) → 생성
+의 워크플로우 시간과 조회 단계(임계 경로)를 비교하고, 관련 자료 조회가 시간 제한을 넘는 경우도 측정합니다.
+
+실행: python etc/bench_init_profile_fanout.py [반복 수]
+    지연(ms) 조정: BENCH_UNITS_MS, BENCH_DOCS_MS, BENCH_MASTERY_MS, BENCH_GUIDE_MS, BENCH_GENERATE_MS
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+tmp = tempfile.mkdtemp(prefix="bench-fanout-")
+os.environ.setdefault("AOAI_API_KEY", "bench")
+os.environ.setdefault("AOAI_ENDPOINT", "http://127.0.0.1:9")
+os.environ["SERVER_DB_PATH"] = os.path.join(tmp, "server.db")
+os.environ["CHROMA_DB_PATH"] = os.path.join(tmp, "chroma")
+
+from langgraph.graph import StateGraph, START, END
+
+from app.models.schemas import ChildProfileInput, EducationWorkflowState
+from app.workflow import nodes
+from app.workflow.graph import create_init_profile_graph
+
+DELAYS_MS = {
+    "units": float(os.getenv("BENCH_UNITS_MS", "40")),          # 단원 색인 (캐시 미스 시 Chroma get)
+    "related_docs": float(os.getenv("BENCH_DOCS_MS", "120")),   # learning 컬렉션 메타데이터 조회
+    "mastery": float(os.getenv("BENCH_MASTERY_MS", "10")),      # SQLite 숙달도 조회
+    "guide": float(os.getenv("BENCH_GUIDE_MS", "250")),         # 임베딩 1회 + Chroma query
+    "generate": float(os.getenv("BENCH_GENERATE_MS", "500")),   # 학습지 생성 LLM 호출
+}
+UNITS = ["9까지의 수", "여러 가지 모양", "덧셈과 뺄셈"]
+
+
+def delayed(name, value):
+    def fn(*args, **kwargs):
+        time.sleep(DELAYS_MS[name] / 1000)
+        return value
+    return fn
+
+
+def install_stubs():
+    """노드가 사용하는 서비스 메서드를 지연 대역으로 교체 (벤치 전용, 앱 코드는 그대로)"""
+    nodes.rag_service.get_curriculum_units = delayed("units", UNITS)
+    nodes.vector_service.query_by_grade_semester = delayed("related_docs", [])
+    nodes.mastery_service.get_mastery = delayed("mastery", [])
+    nodes.rag_service.search_unit_guide = delayed("guide", [{"content": "가이드"}])
+    nodes.rag_service.search_unit_guides = delayed("guide", {unit: [{"content": "가이드"}] for unit in UNITS})
+    nodes.azure_service.generate_materials_for_grade_semester_with_rag = delayed(
+        "generate", ("[수학 학습지]", ["[Problem 1]"]))
+    nodes.history_repo.save_lesson = lambda child_id, title, lesson, materials_text: types.SimpleNamespace(
+        lesson_id="bench", title=title, date="2024-01-01 00:00:00")
+
+
+def legacy_fetch_node(state: EducationWorkflowState) -> dict:
+    """기존 직렬 순서: 단원 → 관련 자료 → 숙달도 → 가이드"""
+    profile = state.child_profile
+    units = nodes.rag_service.get_curriculum_units(grade=profile.grade, semester=profile.semester)
+    docs = nodes.vector_service.query_by_grade_semester(grade=profile.grade, semester=profile.semester)
+    plan = nodes.scheduler.plan(units, nodes.mastery_service.get_mastery(profile.child_id))
+    guide = nodes.rag_service.search_unit_guide(unit_name=plan["unit"], grade=profile.grade, semester=profile.semester)
+    return {"curriculum_units": units, "related_docs": docs, "lesson_plan": plan,
+            "curriculum_guide": "\n\n".join(g["content"] for g in guide)}
+
+
+def create_sequential_graph():
+    graph = StateGraph(state_schema=EducationWorkflowState)
+    graph.add_node("init_profile", nodes.init_profile_node)
+    graph.add_node("fetch_course", legacy_fetch_node)
+    graph.add_node("generate_materials", nodes.generate_materials_node)
+    graph.add_edge(START, "init_profile")
+    graph.add_edge("init_profile", "fetch_course")
+    graph.add_edge("fetch_course", "generate_materials")
+    graph.add_edge("generate_materials", END)
+    return graph.compile()
+
+
+def measure(workflow, runs):
+    times = []
+    for i in range(runs):
+        state = EducationWorkflowState(child_profile=ChildProfileInput(child_id=f"c{i}", name="bench", grade=1, semester=1))
+        start = time.perf_counter()
+        final = workflow.invoke(state)
+        times.append((time.perf_counter() - start) * 1000)
+        assert final["learning_response"] is not None
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    install_stubs()
+    sequential, parallel = create_sequential_graph(), create_init_profile_graph()
+    measure(parallel, 2)  # 스레드풀/그래프 준비
+
+    generate = DELAYS_MS["generate"]
+    seq_ms, par_ms = measure(sequential, runs), measure(parallel, runs)
+    print(f"지연 설정(ms): {DELAYS_MS}")
+    print(f"{'graph':>10} | {'workflow p50 ms':>16} {'조회 단계 ms':>13}")
+    print(f"{'직렬':>10} | {seq_ms:>16.1f} {seq_ms - generate:>13.1f}")
+    print(f"{'병렬':>10} | {par_ms:>16.1f} {par_ms - generate:>13.1f}")
+    print(f"임계 경로 단축: {(seq_ms - par_ms):.1f}ms ({(1 - (par_ms - generate) / (seq_ms - generate)) * 100:.0f}%)")
+
+    # 관련 자료 조회가 시간 제한을 넘는 경우: 제한 시간만큼만 기다리고 빈 결과로 생성 진행
+    docs_ms, DELAYS_MS["related_docs"] = DELAYS_MS["related_docs"], 3000
+    nodes.BRANCH_TIMEOUTS_SEC["related_docs"] = 0.5
+    install_stubs()
+    slow_ms = measure(parallel, 3)
+    print(f"관련 자료 3000ms 지연 + 제한 0.5s: workflow p50 {slow_ms:.1f}ms (제한 없는 직렬이면 약 {seq_ms + 3000 - docs_ms:.0f}ms)")
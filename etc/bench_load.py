@@ -0,0 +1,286 @@
+"""
+API 부하 테스트 (end-to-end)
+/init_profile → /submit_assessment → /overall_feedback 를 목표 RPS로 호출하고
+엔드포인트별 p50/p95/p99 지연과 처리량(완료 건/초)을 출력합니다.
+
+--api를 생략하면 로컬 fake Azure OpenAI 서버(etc/fake_aoai_server.py)와 API(uvicorn 또는 --gunicorn)를
+임시 DB/Chroma 경로로 띄운 뒤 측정합니다. (실제 키 불필요)
+    python etc/bench_load.py --rps 2 --duration 60
+    python etc/bench_load.py --rps 4 --duration 60 --gunicorn --latency-ms 1500 --rate-429 0.05
+    python etc/bench_load.py --api http://localhost:8000 --rps 1 --duration 30   # 이미 실행 중인 서버
+
+- 열린 부하(open loop): 요청 시작 시각을 1/RPS 간격으로 미리 정하고, 지연은 예정 시각부터 측정 (서버가 밀리면 대기 시간 포함)
+- 요청 구성(--mix): init_profile로 받은 학습지를 채점 제출에 사용하고, 제출한 아동에 대해 종합 피드백 요청
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_aoai_server
+
+ENDPOINTS = ("init_profile", "submit_assessment", "overall_feedback")
+TIMEOUT = 300
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))]
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"알 수 없는 엔드포인트: {name} ({', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ===== 서버 실행 =====
+class LocalStack:
+    """fake Azure OpenAI + API 서버 (임시 디렉터리의 DB/Chroma 사용)"""
+
+    def __init__(self, args):
+        self.fake = fake_aoai_server.from_args(args).start()
+        self.tmp = tempfile.mkdtemp(prefix="bench-load-")
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = dict(
+            os.environ,
+            AOAI_ENDPOINT=self.fake.url,
+            AOAI_API_KEY="fake",
+            AOAI_DEPLOY_GPT4O="fake-gpt-4o",
+            AOAI_DEPLOY_EMBED_3_LARGE="fake-embed",
+            CHROMA_DB_PATH=os.path.join(self.tmp, "chroma"),
+            SERVER_DB_PATH=os.path.join(self.tmp, "server.db"),
+        )
+        if args.mini:
+            env["AOAI_DEPLOY_GPT4O_MINI"] = "fake-gpt-4o-mini"
+        if args.skip_rag_init:
+            env["RAG_WARMUP_DONE"] = "1"
+        if args.gunicorn:
+            command = [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{self.port}"]
+            if args.workers:
+                env["WEB_CONCURRENCY"] = str(args.workers)
+        else:
+            command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port), "--log-level", "warning"]
+        self.log = open(os.path.join(self.tmp, "server.log"), "w")
+        self.process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout: float):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit(f"API 서버가 종료되었습니다. 로그: {self.log.name}")
+            try:
+                if requests.get(self.url + "/metrics", timeout=2).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        raise SystemExit(f"API 서버 준비 시간 초과. 로그: {self.log.name}")
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+        self.fake.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+# ===== 부하 생성 =====
+class LoadTest:
+    def __init__(self, api: str, children: int, seed: int = 0):
+        self.api = api.rstrip("/")
+        self.children = [f"bench_child_{i}" for i in range(children)]
+        self.rnd = random.Random(seed)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 채점 대기 학습지 / 채점까지 마친 아동
+        self.lessons = collections.deque()
+        self.assessed: List[str] = []
+        self.results: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+
+    def session(self) -> requests.Session:
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = self._local.session = requests.Session()
+        return s
+
+    def _post(self, path: str, payload: Dict) -> requests.Response:
+        return self.session().post(self.api + path, json=payload, timeout=TIMEOUT)
+
+    def init_profile(self) -> Optional[requests.Response]:
+        with self._lock:
+            child = self.rnd.choice(self.children)
+            grade, semester = self.rnd.randint(1, 6), self.rnd.randint(1, 2)
+        resp = self._post("/init_profile", {"child_id": child, "name": child, "grade": grade, "semester": semester})
+        if resp.ok:
+            body = resp.json()
+            with self._lock:
+                self.lessons.append((child, body["lesson_id"]))
+        return resp
+
+    def submit_assessment(self) -> Optional[requests.Response]:
+        with self._lock:
+            if not self.lessons:
+                return None
+            child, lesson_id = self.lessons.popleft()
+            answers = "\n".join(f"{n}번 답: {self.rnd.choice('ABCD')}" for n in range(1, 11))
+        resp = self._post("/submit_assessment", {"child_id": child, "lesson_id": lesson_id, "responses_text": answers})
+        if resp.ok:
+            with self._lock:
+                self.assessed.append(child)
+        return resp
+
+    def overall_feedback(self) -> Optional[requests.Response]:
+        with self._lock:
+            if not self.assessed:
+                return None
+            child = self.rnd.choice(self.assessed)
+        return self._post("/overall_feedback", {"child_id": child, "name": child, "grade": 3, "semester": 1})
+
+    def pick(self, mix: Dict[str, float]) -> str:
+        with self._lock:
+            name = self.rnd.choices(list(mix), weights=list(mix.values()))[0]
+            # 선행 데이터가 없으면 학습지 생성부터
+            if (name == "submit_assessment" and not self.lessons) or (name == "overall_feedback" and not self.assessed):
+                return "init_profile"
+        return name
+
+    def one(self, name: str, scheduled: float, record: bool = True):
+        try:
+            resp = getattr(self, name)()
+            status = resp.status_code if resp is not None else "skipped"
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - scheduled
+        if not record:
+            return
+        with self._lock:
+            if status == 200:
+                self.results[name].append(elapsed)
+            else:
+                self.errors[name][status] += 1
+
+    def seed(self, count: int):
+        """측정 전 학습지/제출 이력 준비 (집계 제외)"""
+        for _ in range(count):
+            self.one("init_profile", time.perf_counter(), record=False)
+        for _ in range(count // 2):
+            self.one("submit_assessment", time.perf_counter(), record=False)
+
+    def run(self, rps: float, duration: float, mix: Dict[str, float], concurrency: int) -> float:
+        total = int(rps * duration)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for i in range(total):
+                scheduled = start + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.one, self.pick(mix), scheduled)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict[str, Dict]:
+        summary = {}
+        for name in ENDPOINTS:
+            latencies = sorted(self.results.get(name, []))
+            errors = dict(self.errors.get(name, {}))
+            if not latencies and not errors:
+                continue
+            summary[name] = {
+                "ok": len(latencies),
+                "errors": errors,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "throughput_rps": len(latencies) / elapsed,
+            }
+        return summary
+
+
+def print_report(summary: Dict[str, Dict], elapsed: float, fake_stats: Optional[Dict] = None):
+    print(f"\n경과 {elapsed:.1f}s")
+    print(f"{'endpoint':<18} | {'ok':>5} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>7}")
+    for name, row in summary.items():
+        print(f"{name:<18} | {row['ok']:>5} {sum(row['errors'].values()):>5} {row['p50_ms']:>9.0f} "
+              f"{row['p95_ms']:>9.0f} {row['p99_ms']:>9.0f} {row['throughput_rps']:>7.2f}")
+    for name, row in summary.items():
+        if row["errors"]:
+            print(f"  {name} 오류: {row['errors']}")
+    if fake_stats:
+        print(f"fake Azure OpenAI 호출: {fake_stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API 부하 테스트")
+    parser.add_argument("--api", default=None, help="측정할 API 주소 (생략 시 fake 서버 + API를 직접 실행)")
+    parser.add_argument("--rps", type=float, default=1.0, help="목표 요청 수/초")
+    parser.add_argument("--duration", type=float, default=30.0, help="측정 시간(초)")
+    parser.add_argument("--mix", default="init_profile=2,submit_assessment=2,overall_feedback=1", help="엔드포인트별 가중치")
+    parser.add_argument("--children", type=int, default=20, help="아동 수 (child_id 개수)")
+    parser.add_argument("--seed-lessons", type=int, default=4, help="측정 전 준비할 학습지 수")
+    parser.add_argument("--concurrency", type=int, default=64, help="동시 요청 스레드 수")
+    parser.add_argument("--json", default=None, help="결과를 JSON 파일로 저장")
+    group = parser.add_argument_group("로컬 실행 (--api 생략 시)")
+    group.add_argument("--gunicorn", action="store_true", help="gunicorn 멀티 워커로 실행 (기본: uvicorn 1프로세스)")
+    group.add_argument("--workers", type=int, default=0, help="gunicorn 워커 수 (WEB_CONCURRENCY)")
+    group.add_argument("--mini", action="store_true", help="저부담 작업을 mini 배포로 라우팅")
+    group.add_argument("--skip-rag-init", action="store_true", help="시작 시 교육과정 PDF 색인 생략")
+    group.add_argument("--ready-timeout", type=float, default=300.0, help="API 준비 대기 시간(초)")
+    fake_aoai_server.add_arguments(group)
+    args = parser.parse_args()
+
+    stack = None
+    api = args.api
+    if api is None:
+        stack = LocalStack(args)
+        print(f"fake Azure OpenAI {stack.fake.url}, API {stack.url} 준비 중...")
+        stack.wait_ready(args.ready_timeout)
+        api = stack.url
+    try:
+        test = LoadTest(api, args.children)
+        test.seed(args.seed_lessons)
+        if stack is not None:
+            stack.fake.stats.clear()
+        print(f"측정: {args.rps} req/s x {args.duration:.0f}s, mix={args.mix}")
+        elapsed = test.run(args.rps, args.duration, parse_mix(args.mix), args.concurrency)
+        summary = test.report(elapsed)
+        print_report(summary, elapsed, dict(stack.fake.stats) if stack is not None else None)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "elapsed_sec": elapsed, "endpoints": summary}, f, ensure_ascii=False, indent=2)
+    finally:
+        if stack is not None:
+            stack.close()
@@ -0,0 +1,88 @@
+"""
+근접 중복 문항 탐지(MinHash/LSH) 벤치마크
+합성 문항 N개로 아동 이력 색인을 만든 뒤
+(1) 이력 문항의 변형(숫자/이름 일부 변경) (2) 새 문항 을 조회해 탐지율/오탐률과 문항당 조회 시간을 측정하고
+모든 이력 문항과 정확한 Jaccard를 비교하는 전수 비교와 시간을 비교합니다.
+
+실행: python etc/bench_near_duplicate.py [이력 문항 수]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import near_duplicate_service as nd
+
+NAMES = ["철수", "영희", "민수", "지우", "서연", "하준", "도윤", "수아"]
+ITEMS = ["사과", "연필", "구슬", "사탕", "공책", "딱지", "풍선", "쿠키"]
+PLACES = ["바구니", "필통", "상자", "주머니", "가방", "접시"]
+TEMPLATES = [
+    "{n1}는 {item}을 {a}개 가지고 있었습니다. {n2}에게 {b}개를 받았다면 {n1}가 가진 {item}은 모두 몇 개입니까?",
+    "{place}에 {item}이 {a}개 있습니다. 그중 {b}개를 {n1}가 먹었습니다. 남은 {item}은 몇 개입니까?",
+    "{n1}와 {n2}가 {item}을 각각 {a}개, {b}개 모았습니다. 두 사람이 모은 {item}의 차는 몇 개입니까?",
+    "한 {place}에 {item}이 {a}개씩 들어 있습니다. {place} {b}개에 들어 있는 {item}은 모두 몇 개입니까?",
+]
+
+
+def make_problem(rng, template=None, **fixed):
+    values = dict(n1=rng.choice(NAMES), n2=rng.choice(NAMES), item=rng.choice(ITEMS), place=rng.choice(PLACES),
+                  a=rng.randint(2, 40), b=rng.randint(2, 20))
+    values.update(fixed)
+    template = template if template is not None else rng.choice(TEMPLATES)
+    answer = values["a"] + values["b"]
+    choices = {c: str(answer + d) for c, d in zip("ABCD", rng.sample(range(-3, 4), 4))}
+    return {"stem": template.format(**values), "choices": choices}, (template, values)
+
+
+def perturb(rng, origin):
+    """같은 틀에서 숫자 하나만 바꾼 변형"""
+    template, values = origin
+    changed = dict(values, b=values["b"] + rng.choice([-1, 1]))
+    return make_problem(rng, template, **changed)[0]
+
+
+def exact_jaccard(x, y):
+    a, b = set(nd.shingles(nd.problem_text(x))), set(nd.shingles(nd.problem_text(y)))
+    return len(a & b) / len(a | b)
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(7)
+    hasher, index = nd.MinHasher(), nd.LSHIndex()
+    history = [make_problem(rng) for _ in range(size)]
+    start = time.perf_counter()
+    for i, (problem, _) in enumerate(history):
+        index.add(i, hasher.signature(nd.problem_text(problem)))
+    build_ms = (time.perf_counter() - start) * 1000
+
+    variants = [perturb(rng, history[rng.randrange(size)][1]) for _ in range(200)]
+    # 이력과 겹치지 않는 새 문항: 다른 틀
+    fresh = [{"stem": f"길이가 {rng.randint(10, 90)}cm인 끈을 {rng.randint(2, 9)}도막으로 똑같이 자르면 한 도막은 몇 cm입니까?",
+              "choices": {c: str(rng.randint(1, 40)) for c in "ABCD"}} for _ in range(200)]
+
+    def run(problems):
+        times, hits = [], 0
+        for p in problems:
+            t = time.perf_counter()
+            matches = index.query(hasher.signature(nd.problem_text(p)))
+            times.append((time.perf_counter() - t) * 1000)
+            hits += bool(matches)
+        return hits / len(problems), statistics.median(times), max(times)
+
+    recall, v_p50, v_max = run(variants)
+    false_rate, f_p50, f_max = run(fresh)
+    start = time.perf_counter()
+    for p in variants[:20]:
+        max(exact_jaccard(p, h) for h, _ in history)
+    brute_ms = (time.perf_counter() - start) * 1000 / 20
+
+    print(f"numpy: {nd.np is not None}, 순열 {nd.NUM_PERM}, 밴드 {nd.BANDS}, 임계값 {nd.THRESHOLD}")
+    print(f"이력 {size}문항 색인: {build_ms:.1f}ms ({build_ms / size * 1000:.0f}µs/문항)")
+    print(f"변형 문항 탐지율 {recall:.1%} (조회 p50 {v_p50:.3f}ms, max {v_max:.3f}ms)")
+    print(f"새 문항 오탐률 {false_rate:.1%} (조회 p50 {f_p50:.3f}ms, max {f_max:.3f}ms)")
+    print(f"전수 Jaccard 비교: 문항당 {brute_ms:.1f}ms")
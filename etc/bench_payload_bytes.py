@@ -0,0 +1,73 @@
+"""
+요청/응답 바이트 수 벤치마크
+(1) /init_profile 응답: 기존 LearningResponse(lesson + materials_text, 정답 키 포함) vs compact 모드(구조화된 문항 1회, 정답 키 제외)
+(2) /submit_assessment 요청: 기존(materials_text 재업로드) vs ID + 답안만
+각각 원본 / gzip / brotli(설치된 경우) 크기를 비교합니다.
+
+실행: python etc/bench_payload_bytes.py
+"""
+
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.schemas import LearningResponse, CompactLearningResponse, AssessmentInput
+from app.services.azure_openai_service import parse_worksheet_and_key
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SECTIONS = [("기본 이해도", 3), ("추론 능력", 2), ("응용력 - 기본", 3), ("응용력 - 중고급", 2)]
+
+
+def make_worksheet():
+    lines, number = ["[Worksheet]"], 1
+    for title, count in SECTIONS:
+        lines.append(f"## {title} ({count}문제)")
+        for _ in range(count):
+            lines += [
+                f"[Problem {number}]",
+                f"민수는 사탕을 {number * 12}개 가지고 있었습니다. 친구에게 {number * 3}개를 주고, 다시 {number * 5}개를 받았습니다. "
+                "지금 민수가 가진 사탕은 모두 몇 개인지 구하세요.",
+                "Choices:",
+                f"A) {number * 14}개", f"B) {number * 14 + 1}개", f"C) {number * 14 - 1}개", f"D) {number * 15}개",
+                "",
+            ]
+            number += 1
+    worksheet = "\n".join(lines)
+    answer_key = "[AnswerKey]\n" + "\n".join(f"{i}) A" for i in range(1, number))
+    return worksheet, answer_key
+
+
+def sizes(model, **dump_kwargs) -> str:
+    raw = model.model_dump_json(**dump_kwargs).encode("utf-8")
+    out = f"{len(raw):>7} raw {len(gzip.compress(raw)):>7} gzip"
+    if brotli is not None:
+        out += f" {len(brotli.compress(raw)):>7} br"
+    return out
+
+
+if __name__ == "__main__":
+    worksheet, answer_key = make_worksheet()
+    lesson = "[3학년 1학기] 덧셈과 뺄셈\n\n" + worksheet
+    materials_text = worksheet + "\n\n" + answer_key
+    full = LearningResponse(lesson=lesson, materials_text=materials_text, lesson_id="0" * 36,
+                            title="3학년 1학기 덧셈과 뺄셈", date="2025-01-01 10:00:00")
+    problems, _ = parse_worksheet_and_key(materials_text)
+    compact = CompactLearningResponse(lesson_id=full.lesson_id, title=full.title, date=full.date,
+                                      header=lesson.split("\n", 1)[0], problems=problems)
+    responses_text = "\n".join(f"{i}번 답: A" for i in range(1, 11))
+    submit_before = AssessmentInput(child_id="child01", lesson_id=full.lesson_id, responses_text=responses_text,
+                                    materials_text=materials_text, unit="덧셈과 뺄셈", grade=3, semester=1)
+    submit_after = AssessmentInput(child_id="child01", lesson_id=full.lesson_id, responses_text=responses_text)
+
+    print("/init_profile 응답")
+    print(f"  full    {sizes(full)}")
+    print(f"  compact {sizes(compact)}")
+    print("/submit_assessment 요청")
+    print(f"  before  {sizes(submit_before)}")
+    print(f"  after   {sizes(submit_after, exclude_none=True)}")
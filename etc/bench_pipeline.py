@@ -0,0 +1,106 @@
+"""
+LangGraph 파이프라인 재현 벤치마크 (LLM 기록/재생)
+고정된 시나리오(아동 N명: 학습지 생성 → 채점 제출 → 종합 피드백)를 앱 프로세스 안에서 실행하고
+엔드포인트별 p50/p95 지연을 출력합니다. 재생 모드는 네트워크/키 없이 같은 LLM 응답으로 반복 실행됩니다.
+
+1) 기록 (실제 Azure OpenAI 또는 --fake로 로컬 fake 서버)
+    python etc/bench_pipeline.py record --fixtures ./fixtures/pipeline.jsonl.gz --sessions 5
+2) 재생 (커밋 간 비교: 지연 배율 0이면 LLM 대기 없이 파서/채점/그래프/저장소 시간만)
+    python etc/bench_pipeline.py replay --fixtures ./fixtures/pipeline.jsonl.gz --latency-scale 0
+
+DB/Chroma는 실행마다 임시 디렉터리를 사용합니다. (RAG 초기화 포함, --skip-rag-init으로 생략)
+"""
+
+import argparse
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_sessions(client, sessions: int) -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {"init_profile": [], "submit_assessment": [], "overall_feedback": []}
+
+    def timed(name, path, payload):
+        start = time.perf_counter()
+        resp = client.post(path, json=payload)
+        timings[name].append(time.perf_counter() - start)
+        resp.raise_for_status()
+        return resp.json()
+
+    for i in range(sessions):
+        child = f"pipeline_child_{i}"
+        grade, semester = 1 + i % 6, 1 + i % 2
+        lesson = timed("init_profile", "/init_profile",
+                       {"child_id": child, "name": child, "grade": grade, "semester": semester})
+        answers = "\n".join(f"{n}번 답: {'ABCD'[(i + n) % 4]}" for n in range(1, 11))
+        timed("submit_assessment", "/submit_assessment",
+              {"child_id": child, "lesson_id": lesson["lesson_id"], "responses_text": answers})
+        timed("overall_feedback", "/overall_feedback",
+              {"child_id": child, "name": child, "grade": grade, "semester": semester})
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LangGraph 파이프라인 기록/재생 벤치마크")
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("--fixtures", default="./fixtures/pipeline.jsonl.gz", help="LLM 기록 아카이브 경로")
+    parser.add_argument("--sessions", type=int, default=5, help="아동(시나리오) 수")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="재생 지연 배율 (0 = 대기 없음)")
+    parser.add_argument("--fake", action="store_true", help="기록 시 로컬 fake Azure OpenAI 서버 사용")
+    parser.add_argument("--skip-rag-init", action="store_true", help="RAG 초기화(PDF 임베딩) 생략")
+    args = parser.parse_args()
+
+    args.fixtures = os.path.abspath(args.fixtures)
+    # resource/ 등 앱의 상대 경로 기준
+    os.chdir(ROOT)
+    tmp = tempfile.mkdtemp(prefix="bench-pipeline-")
+    fake = None
+    if args.mode == "record" and os.path.exists(args.fixtures):
+        os.remove(args.fixtures)
+    if args.fake:
+        import fake_aoai_server
+        fake = fake_aoai_server.FakeAOAIServer(latency_ms=200, tokens_per_sec=0).start()
+        os.environ.update(AOAI_ENDPOINT=fake.url, AOAI_API_KEY="fake",
+                          AOAI_DEPLOY_GPT4O="fake-gpt-4o", AOAI_DEPLOY_EMBED_3_LARGE="fake-embed")
+    # 앱 import 전에 설정 (모듈 로드 시 환경변수를 읽음)
+    os.environ.update(
+        LLM_REPLAY_MODE=args.mode,
+        LLM_REPLAY_PATH=args.fixtures,
+        LLM_REPLAY_LATENCY_SCALE=str(args.latency_scale),
+        CHROMA_DB_PATH=os.path.join(tmp, "chroma"),
+        SERVER_DB_PATH=os.path.join(tmp, "server.db"),
+    )
+    if args.skip_rag_init:
+        os.environ["RAG_WARMUP_DONE"] = "1"
+    # 단원 무작위 선택 등 앱 내부 난수 고정 (재생 시 같은 프롬프트 → 같은 기록)
+    random.seed(0)
+    try:
+        from fastapi.testclient import TestClient
+        import main
+        from app.workflow.nodes import azure_service
+
+        with TestClient(main.app) as client:
+            started = time.perf_counter()
+            timings = run_sessions(client, args.sessions)
+            elapsed = time.perf_counter() - started
+        print(f"\n{args.mode}: sessions={args.sessions} 경과 {elapsed:.2f}s")
+        print(f"{'endpoint':<18} | {'n':>3} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, values in timings.items():
+            values.sort()
+            p95 = values[min(len(values) - 1, math.ceil(0.95 * len(values)) - 1)]  # nearest-rank
+            print(f"{name:<18} | {len(values):>3} {statistics.median(values) * 1000:>9.1f} {p95 * 1000:>9.1f}")
+        print(f"LLM 기록/재생: {azure_service.replay.stats}")
+    finally:
+        if fake is not None:
+            fake.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,72 @@
+"""
+동일 요청 병합(single-flight) 벤치마크
+같은 반(학년/학기/단원)의 아동 N명이 동시에 init_profile을 요청하는 상황을 지연 대역 서비스로 재현하고
+(1) 병합 없음 (2) 조회 병합 (3) 조회 + 학습지 공유(변형 수 지정) 의 호출 수와 처리 시간을 비교합니다.
+
+실행: python etc/bench_singleflight.py [동시 요청 수] [학습지 변형 수]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_init_profile_fanout as fanout
+from app.models.schemas import ChildProfileInput, EducationWorkflowState
+from app.workflow import nodes
+from app.workflow.graph import create_init_profile_graph
+
+SUBJECT = "덧셈과 뺄셈"
+
+
+def counting_stubs():
+    """fanout 벤치의 지연 대역에 호출 수 집계를 덧붙임"""
+    fanout.install_stubs()
+    counts = {}
+    targets = {
+        "units": (nodes.rag_service, "get_curriculum_units"),
+        "related_docs": (nodes.vector_service, "query_by_grade_semester"),
+        "guide": (nodes.rag_service, "search_unit_guides"),
+        "generate": (nodes.azure_service, "generate_materials_for_grade_semester_with_rag"),
+    }
+    for name, (obj, attr) in targets.items():
+        original = getattr(obj, attr)
+
+        def counted(*args, _name=name, _fn=original, **kwargs):
+            counts[_name] = counts.get(_name, 0) + 1
+            return _fn(*args, **kwargs)
+        setattr(obj, attr, counted)
+    return counts
+
+
+def burst(workflow, concurrency):
+    def one(i):
+        profile = ChildProfileInput(child_id=f"c{i}", name="bench", grade=1, semester=1, subject=SUBJECT)
+        return workflow.invoke(EducationWorkflowState(child_profile=profile))["learning_response"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(concurrency)))
+    assert all(r is not None for r in results)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    variants = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    workflow = create_init_profile_graph()
+    nodes.WORKSHEET_VARIANTS = variants
+
+    print(f"동시 요청 {concurrency}건, 지연 설정(ms): {fanout.DELAYS_MS}")
+    print(f"{'mode':>16} | {'elapsed ms':>10} {'units':>6} {'docs':>5} {'guide':>6} {'generate':>9}")
+    for mode, retrieval, worksheet in (("off", False, False), ("retrieval", True, False),
+                                       (f"+worksheet x{variants}", True, True)):
+        nodes.SINGLEFLIGHT_RETRIEVAL, nodes.SINGLEFLIGHT_WORKSHEET = retrieval, worksheet
+        # 이전 모드의 보관 결과가 섞이지 않도록 새 인스턴스
+        nodes.worksheet_flight = nodes.SingleFlight("worksheet", burst_sec=nodes.WORKSHEET_BURST_SEC)
+        counts = counting_stubs()
+        elapsed = burst(workflow, concurrency)
+        print(f"{mode:>16} | {elapsed:>10.1f} {counts.get('units', 0):>6} {counts.get('related_docs', 0):>5} "
+              f"{counts.get('guide', 0):>6} {counts.get('generate', 0):>9}")
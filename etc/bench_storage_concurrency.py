@@ -0,0 +1,109 @@
+"""
+SQLite 저장소 동시성 벤치마크
+여러 세션(스레드)이 동시에 학습 이력을 쓰고(add + 채점 결과 갱신) 사이드바 이력을 읽을 때
+(1) 기존 방식: 공유 커넥션 1개 + 롤백 저널 + 쓰기마다 커밋
+(2) SQLiteStorage: WAL + 읽기 커넥션 풀 + 그룹 커밋
+의 처리량, 쓰기 지연(p50/p95), 커밋 횟수를 비교합니다.
+
+실행: python etc/bench_storage_concurrency.py [세션 수] [세션당 학습 수]
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.storage_service import SQLiteStorage, HistoryRepository, HistoryItem
+
+FEEDBACK = "[Score]\n총점: 80 점\n\n[Feedback]\n좋아요!"
+
+
+class LegacyHistory:
+    """기존 streamlit_app.py 방식 (공유 커넥션, 쓰기마다 commit)"""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.commits = 0
+        self.conn.execute("""
+            CREATE TABLE history (id TEXT, lesson_id TEXT, date TEXT, title TEXT, content TEXT,
+                                  materials_text TEXT, feedback TEXT, score INTEGER, PRIMARY KEY (id, lesson_id))
+        """)
+        self.conn.execute("CREATE INDEX idx_history_id_date ON history (id, date, lesson_id)")
+        self.conn.commit()
+
+    def add(self, id, item):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+                              (id, item.lesson_id, item.date, item.title, item.content, item.materials_text, item.feedback))
+            self.conn.commit()
+            self.commits += 1
+
+    def update_feedback(self, id, lesson_id, feedback):
+        with self.lock:
+            self.conn.execute("UPDATE history SET feedback=?, score=80 WHERE id=? AND lesson_id=?", (feedback, id, lesson_id))
+            self.conn.commit()
+            self.commits += 1
+
+    def summary_page(self, id, limit=20):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT lesson_id, date, title, score FROM history WHERE id=? ORDER BY date DESC, lesson_id DESC LIMIT ?",
+                (id, limit + 1)
+            ).fetchall()
+
+
+def run(repo, sessions, lessons):
+    latencies = []
+    lat_lock = threading.Lock()
+
+    def session(n):
+        child = f"child{n}"
+        local = []
+        for i in range(lessons):
+            lesson_id = f"{n}-{i}"
+            item = HistoryItem(lesson_id, f"2025-01-01 10:{i // 60:02d}:{i % 60:02d}", f"[3학년 1학기] 곱셈 #{i}",
+                               "[3학년 1학기] 곱셈\n" + "문제 " * 200, "문제 " * 300)
+            t = time.perf_counter()
+            repo.add(child, item)
+            repo.update_feedback(child, lesson_id, FEEDBACK)
+            local.append(time.perf_counter() - t)
+            repo.summary_page(child)
+        with lat_lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "lessons/s": sessions * lessons / elapsed,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p95 ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    lessons = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = LegacyHistory(os.path.join(tmp, "legacy.db"))
+        legacy_result = run(legacy, sessions, lessons)
+
+        storage = SQLiteStorage(os.path.join(tmp, "storage.db"))
+        storage_result = run(HistoryRepository(storage), sessions, lessons)
+        storage.close()
+
+    print(f"sessions={sessions} lessons/session={lessons} (쓰기 {sessions * lessons * 2}건)")
+    print(f"{'backend':>10} | {'lessons/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'commits':>8}")
+    print(f"{'legacy':>10} | {legacy_result['lessons/s']:>10.0f} {legacy_result['p50 ms']:>8.2f} {legacy_result['p95 ms']:>8.2f} {legacy.commits:>8}")
+    print(f"{'storage':>10} | {storage_result['lessons/s']:>10.0f} {storage_result['p50 ms']:>8.2f} {storage_result['p95 ms']:>8.2f} {storage.commits:>8}")
@@ -0,0 +1,56 @@
+"""
+추적(span) 오버헤드 벤치마크
+노드 1개 + LLM 호출 1개 + Chroma 연산 2개 형태의 중첩 span을 반복 실행해 호출 1회당 추가 시간을 비교합니다.
+(1) 비활성(TRACE_EXPORTER 미설정) (2) jsonl 전체 기록 (3) jsonl 10% 샘플링
+
+실행: python etc/bench_tracing_overhead.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import tracing
+from app.services.tracing import span, traced
+
+N = 20000
+
+
+@traced("node.bench", kind="node")
+def node():
+    with span("llm.bench", kind="llm", model="bench") as s:
+        s.set(prompt_tokens=100, completion_tokens=50, total_tokens=150)
+    with span("chroma.get", kind="chroma", collection="bench"):
+        pass
+    with span("chroma.query", kind="chroma", collection="bench", n=1):
+        pass
+
+
+def plain():
+    pass
+
+
+def per_call_us(fn):
+    start = time.perf_counter()
+    for _ in range(N):
+        fn()
+    return (time.perf_counter() - start) / N * 1e6
+
+
+if __name__ == "__main__":
+    path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    tracing.TRACE_JSONL_PATH = path
+    results = []
+    baseline = per_call_us(plain)
+    for label, exporter, rate in [("비활성", "", 1.0), ("jsonl 100%", "jsonl", 1.0), ("jsonl 10%", "jsonl", 0.1)]:
+        tracing.configure(exporter, sample_rate=rate)
+        results.append((label, per_call_us(node) - baseline))
+        tracing.shutdown()
+    lines = sum(1 for _ in open(path, encoding="utf-8"))
+    print(f"{'':<12} {'요청(span 4개)당 추가 시간':>24}")
+    for label, us in results:
+        print(f"{label:<12} {us:>20.2f} us")
+    print(f"기록된 span: {lines}줄 ({path})")
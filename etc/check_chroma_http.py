@@ -0,0 +1,107 @@
+"""
+Chroma 서버(HttpClient) 모드 점검/비교
+로컬에 Chroma 서버를 띄운 뒤 실행합니다.
+    chroma run --path ./chroma_server_data --port 8001
+    python etc/check_chroma_http.py [host] [port]
+
+임시 컬렉션에 단원/가이드 형태의 문서를 적재하고
+(1) 1건씩 add vs 묶음 add
+(2) 질의 1건씩 query vs 묶음 query
+(3) 단원 목록 조회: 매번 get vs 읽기 캐시
+의 소요 시간을 embedded(PersistentClient)와 http(HttpClient) 모드에서 비교합니다. (임베딩은 난수 벡터 사용, LLM 호출 없음)
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.vector_db_service import VectorDBService
+
+DIM = 64
+DOCS = 256
+QUERIES = 16
+LOOKUPS = 200
+
+
+def vec(rnd):
+    return [rnd.random() for _ in range(DIM)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(service: VectorDBService):
+    rnd = random.Random(0)
+    name = f"check_{os.getpid()}_{service.mode}"
+    client = service.client
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    collection = client.create_collection(name)
+    ids = [f"unit_{i}" for i in range(DOCS)]
+    docs = [f"{1 + i % 6}학년 {1 + i % 2}학기 수학 단원: 단원{i}" for i in range(DOCS)]
+    metas = [{"grade": 1 + i % 6, "semester": 1 + i % 2, "unit": f"단원{i}"} for i in range(DOCS)]
+    embs = [vec(rnd) for _ in range(DOCS)]
+    half = DOCS // 2
+
+    def add_single():
+        for i in range(half):
+            collection.add(ids=[ids[i]], documents=[docs[i]], metadatas=[metas[i]], embeddings=[embs[i]])
+
+    def add_batched():
+        service.add_batched(collection, ids[half:], docs[half:], embs[half:], metas[half:])
+
+    queries = [vec(rnd) for _ in range(QUERIES)]
+
+    def query_single():
+        for q in queries:
+            collection.query(query_embeddings=[q], n_results=3)
+
+    def query_batched():
+        collection.query(query_embeddings=queries, n_results=3)
+
+    def lookup(grade, semester):
+        return collection.get(where={"$and": [{"grade": grade}, {"semester": semester}]}, include=["metadatas"])
+
+    def get_each():
+        for i in range(LOOKUPS):
+            lookup(1 + i % 6, 1 + i % 2)
+
+    def get_cached():
+        for i in range(LOOKUPS):
+            service.cached((name, "units", 1 + i % 6, 1 + i % 2), lambda: lookup(1 + i % 6, 1 + i % 2))
+
+    result = {
+        f"add x{half} (1건씩)": timed(add_single),
+        f"add x{half} (묶음)": timed(add_batched),
+        f"query x{QUERIES} (1건씩)": timed(query_single),
+        f"query x{QUERIES} (묶음)": timed(query_batched),
+        f"단원 조회 x{LOOKUPS} (매번 get)": timed(get_each),
+        f"단원 조회 x{LOOKUPS} (읽기 캐시)": timed(get_cached),
+    }
+    assert collection.count() == DOCS
+    client.delete_collection(name)
+    return result
+
+
+if __name__ == "__main__":
+    host = sys.argv[1] if len(sys.argv) > 1 else "localhost"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8001
+    tmp = tempfile.mkdtemp()
+    try:
+        embedded = run(VectorDBService(tmp, mode="embedded"))
+        http = run(VectorDBService(tmp, mode="http", host=host, port=port))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"{'':<28} {'embedded ms':>12} {'http ms':>10}")
+    for key in embedded:
+        print(f"{key:<28} {embedded[key]:>12.1f} {http[key]:>10.1f}")
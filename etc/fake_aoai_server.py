@@ -0,0 +1,292 @@
+"""
+로컬 Azure OpenAI 대역(fake) 서버
+AzureOpenAI 클라이언트가 호출하는 두 경로만 구현합니다. (표준 라이브러리만 사용, 실제 키/네트워크 불필요)
+    POST /openai/deployments/{배포}/chat/completions
+    POST /openai/deployments/{배포}/embeddings
+    GET  /stats   (배포/작업별 호출 수, 주입한 429 수)
+
+- 응답 지연: 첫 토큰까지 로그정규분포(중앙값 --latency-ms, sigma --latency-sigma) + 출력 토큰 수 / --tokens-per-sec
+- 429 주입: --rate-429 확률 또는 동시 처리 수가 --max-inflight를 넘으면 Retry-After와 함께 429 (클라이언트 재시도 경로 확인)
+- 프롬프트 종류별 고정 응답: 학습지(prompts/materials.txt 형식, 정답 키 포함) / 'n) 해설:' 줄 / 채점 피드백 /
+  종합 학습 리포트 / 다음 학습 / 커리큘럼 주제 목록
+- 임베딩: 글자 2-gram 해시 벡터(정규화) → 같은 문장은 같은 벡터, 비슷한 문장은 가까운 벡터
+
+실행:
+    python etc/fake_aoai_server.py --port 8090 --latency-ms 800 --tokens-per-sec 60 --rate-429 0.02
+    AOAI_ENDPOINT=http://localhost:8090 AOAI_API_KEY=fake uvicorn main:app
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+PATH_PATTERN = re.compile(r"^/openai/deployments/([^/]+)/(chat/completions|embeddings)$")
+
+# 학습지 섹션 (materials.txt: 기본 3 / 추론 2 / 응용-기본 3 / 응용-중고급 2)
+SECTIONS = (
+    ("기본 이해도", 3),
+    ("추론/사고력", 2),
+    ("응용(이전 개념 혼합) - 기본", 3),
+    ("응용 - 중고급", 2),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 (한국어 약 2글자/토큰)"""
+    return max(1, len(text) // 2)
+
+
+# ===== 고정 응답 =====
+def canned_worksheet(rnd: random.Random) -> str:
+    lines, keys, number = ["[Worksheet]"], [], 0
+    for title, count in SECTIONS:
+        lines.append(f"## {title} ({count}문제)")
+        for _ in range(count):
+            number += 1
+            a, b = rnd.randint(2, 9 * number), rnd.randint(1, 9)
+            answer = a + b
+            choices = [answer, answer + 1, answer - 1, answer + 2]
+            rnd.shuffle(choices)
+            lines.append(f"[Problem {number}]")
+            lines.append(f"{a} + {b} 의 값을 고르세요.")
+            lines.append("Choices:")
+            lines.extend(f"{label}) {value}" for label, value in zip("ABCD", choices))
+            lines.append("")
+            keys.append(f"{number}) {'ABCD'[choices.index(answer)]}")
+    return "\n".join(lines + ["[AnswerKey]"] + keys)
+
+
+def canned_explanations(prompt: str) -> str:
+    numbers = [int(n) for n in re.findall(r'"number":\s*(\d+)', prompt)] or list(range(1, 11))
+    return "\n".join(f"{n}) 해설: 두 수를 차례로 더해 값을 구합니다. 일의 자리부터 더하면 실수를 줄일 수 있어요." for n in numbers)
+
+
+def canned_grading() -> str:
+    return ("[Score]\n총점: 80 점\n\n[PerQuestion]\n"
+            + "\n".join(f"{n}) 학생: (A) | 정답: (A) | 채점: O" for n in range(1, 11))
+            + "\n\n[Explanations]\n"
+            + "\n".join(f"{n}) 정답: (A) - 두 수를 더해 값을 구합니다." for n in range(1, 11)))
+
+
+def canned_report() -> str:
+    return ("# 📊 종합 학습 리포트\n\n## 최근 변화 요약\n- 최근 3회 점수가 꾸준히 유지되고 있습니다.\n\n"
+            "## 잘하는 점\n- 기본 계산이 정확합니다.\n\n## 보완할 점\n- 응용 문제에서 조건을 놓치는 경우가 있습니다.\n\n"
+            "## 추천 학습 방향\n- 결론: 현재 수준 유지\n- 근거: 응용 문항 정답률이 아직 낮습니다.\n\n"
+            "## 학생에게\n- 지금처럼 차근차근 풀어 보세요!")
+
+
+def canned_next_material() -> str:
+    return ("[Topic]\n두 자리 수의 덧셈\n[Problem]\n24 + 13 의 값을 구하세요.\n[Answer]\n37\n"
+            "[Explanation]\n일의 자리 4+3=7, 십의 자리 2+1=3 이므로 37입니다.")
+
+
+def canned_curriculum() -> str:
+    return "1. 수 세기\n2. 덧셈\n3. 뺄셈\n4. 여러 가지 모양\n5. 비교하기"
+
+
+def canned_reply(messages: List[Dict], rnd: random.Random, worksheet: Optional[str] = None) -> str:
+    """프롬프트 내용으로 작업 종류를 판별해 앱의 파서가 받아들이는 형식의 응답 생성"""
+    prompt = "\n".join(str(m.get("content") or "") for m in messages)
+    if "해설:" in prompt and "JSON" in prompt:
+        return canned_explanations(prompt)
+    if "[StudentResponses]" in prompt:
+        return canned_grading()
+    if "종합 학습 리포트" in prompt:
+        return canned_report()
+    if "[AnswerKey]" in prompt:
+        return worksheet or canned_worksheet(rnd)
+    if "[Topic]" in prompt:
+        return canned_next_material()
+    return canned_curriculum()
+
+
+def hashed_embedding(text: str, dim: int) -> List[float]:
+    vec = [0.0] * dim
+    for i in range(max(1, len(text) - 1)):
+        digest = hashlib.blake2b(text[i:i + 2].encode("utf-8"), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+# ===== 서버 =====
+class FakeAOAIServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 800.0, latency_sigma: float = 0.4,
+                 tokens_per_sec: float = 80.0, embed_latency_ms: float = 50.0, rate_429: float = 0.0,
+                 max_inflight: int = 0, embed_dim: int = 256, worksheet_file: Optional[str] = None, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_sec = tokens_per_sec
+        self.embed_latency_ms = embed_latency_ms
+        self.rate_429 = rate_429
+        self.max_inflight = max_inflight
+        self.embed_dim = embed_dim
+        self.worksheet = None
+        if worksheet_file:
+            with open(worksheet_file, encoding="utf-8") as f:
+                self.worksheet = f.read()
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.stats: Dict[str, int] = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAOAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-aoai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _sample_delay(self, median_ms: float):
+        """(지연 초, 응답 생성용 시드)"""
+        with self._lock:
+            delay = median_ms * math.exp(self._rnd.gauss(0, self.latency_sigma)) if median_ms > 0 else 0.0
+            return delay / 1000, self._rnd.random()
+
+    def _throttled(self) -> bool:
+        with self._lock:
+            if self.max_inflight and self._inflight > self.max_inflight:
+                return True
+            return self.rate_429 > 0 and self._rnd.random() < self.rate_429
+
+    def chat(self, deployment: str, body: Dict) -> Dict:
+        messages = body.get("messages") or []
+        delay, seed = self._sample_delay(self.latency_ms)
+        content = canned_reply(messages, random.Random(seed), self.worksheet)
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        time.sleep(delay + (completion_tokens / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def embeddings(self, deployment: str, body: Dict) -> Dict:
+        inputs = body.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        delay, _ = self._sample_delay(self.embed_latency_ms)
+        time.sleep(delay)
+        data = []
+        for i, text in enumerate(inputs):
+            vec = hashed_embedding(str(text), body.get("dimensions") or self.embed_dim)
+            if body.get("encoding_format") == "base64":
+                # openai 클라이언트 기본값: float32 little-endian을 base64로
+                vec = base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vec})
+        tokens = sum(estimate_tokens(str(t)) for t in inputs)
+        return {"object": "list", "data": data, "model": deployment,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+                raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    with server._lock:
+                        self._send(200, dict(server.stats, inflight=server._inflight))
+                else:
+                    self._send(404, {"error": {"code": "404", "message": "Not Found"}})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                match = PATH_PATTERN.match(self.path.split("?", 1)[0])
+                if not match:
+                    self._send(404, {"error": {"code": "404", "message": "Resource not found"}})
+                    return
+                deployment, operation = match.groups()
+                kind = "chat" if operation == "chat/completions" else "embeddings"
+                with server._lock:
+                    server._inflight += 1
+                try:
+                    if server._throttled():
+                        server._count(f"{kind}.429")
+                        self._send(429, {"error": {"code": "429", "message": "Rate limit is exceeded. (fake)"}},
+                                   {"Retry-After": "1", "retry-after-ms": "200"})
+                        return
+                    server._count(f"{kind}.{deployment}")
+                    self._send(200, server.chat(deployment, body) if kind == "chat" else server.embeddings(deployment, body))
+                finally:
+                    with server._lock:
+                        server._inflight -= 1
+
+        return Handler
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """fake 서버 설정 인자 (etc/bench_load.py와 공유)"""
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="chat 첫 토큰까지 지연 중앙값(ms)")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="지연 로그정규분포 sigma (0이면 고정)")
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0, help="출력 토큰 생성 속도 (0이면 즉시)")
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0, help="임베딩 지연 중앙값(ms)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 응답 확률 (0~1)")
+    parser.add_argument("--max-inflight", type=int, default=0, help="동시 처리 한도 (초과 시 429, 0이면 무제한)")
+    parser.add_argument("--embed-dim", type=int, default=256, help="임베딩 차원")
+    parser.add_argument("--worksheet-file", default=None, help="학습지 응답으로 돌려줄 materials.txt 형식 파일")
+
+
+def from_args(args, host: str = "127.0.0.1", port: int = 0) -> FakeAOAIServer:
+    return FakeAOAIServer(host=host, port=port, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                          tokens_per_sec=args.tokens_per_sec, embed_latency_ms=args.embed_latency_ms,
+                          rate_429=args.rate_429, max_inflight=args.max_inflight, embed_dim=args.embed_dim,
+                          worksheet_file=args.worksheet_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 Azure OpenAI fake 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = from_args(args, args.host, args.port)
+    print(f"fake Azure OpenAI: {server.url} (AOAI_ENDPOINT로 지정, AOAI_API_KEY는 아무 값)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,25 @@
+"""
+Streamlit 로컬 DB(child_edu_ai.db)의 학습 이력을 서버 DB(SERVER_DB_PATH)로 옮깁니다.
+학습 이력이 API 서버에 저장되도록 바뀌기 전의 데이터용이며, 여러 번 실행해도 같은 결과입니다.
+
+실행: python etc/migrate_history_to_server.py [로컬 DB 경로]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv
+from app.services.storage_service import SQLiteStorage, HistoryRepository, HistoryItem
+
+load_dotenv()
+
+if __name__ == "__main__":
+    local_path = sys.argv[1] if len(sys.argv) > 1 else "./child_edu_ai.db"
+    local = SQLiteStorage(local_path)
+    server_repo = HistoryRepository(SQLiteStorage(os.getenv("SERVER_DB_PATH", "./server_data.db")))
+    rows = local.query_all("SELECT id, lesson_id, date, title, content, materials_text, feedback FROM history ORDER BY id, date")
+    for id, *fields in rows:
+        server_repo.add(id, HistoryItem(*fields))
+    print(f"{len(rows)}건 이전 완료 ({local_path} → {server_repo.storage.db_path})")
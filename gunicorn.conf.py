@@ -0,0 +1,39 @@
+"""
+멀티 워커 실행 설정
+실행: gunicorn main:app -c gunicorn.conf.py
+
+- 워커: uvicorn 워커 WEB_CONCURRENCY개 (기본: CPU 코어 수)
+- preload_app = False: 앱(서비스/SQLite/Chroma 연결)은 fork 이후 각 워커에서 생성
+- RAG 임베딩 적재(워밍업)는 fork 전에 별도 프로세스로 1회만 수행하고, 워커의 startup에서는 건너뜀
+- 평가 응답의 Chroma 쓰기는 아웃박스를 거쳐 flock으로 선출된 단일 writer 워커가 수행
+- /metrics: 워커별 메트릭 스냅샷을 METRICS_MULTIPROC_DIR에 기록하고 요청을 받은 워커가 합산 (기동 시 디렉터리 초기화)
+"""
+
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# 학습지 생성(LLM 호출) 대기 시간 고려
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = False
+
+
+def on_starting(server):
+    """워커 fork 전 1회: RAG 워밍업을 별도 프로세스로 실행"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-m", "app.warmup"], cwd=root)
+    if result.returncode != 0:
+        server.log.warning("RAG 워밍업 실패 (워커는 계속 기동)")
+    # 워커가 상속하는 환경변수: startup에서 RAG 초기화 생략
+    os.environ["RAG_WARMUP_DONE"] = "1"
+    metrics_dir = os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "child-edu-metrics"))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
@@ -5,11 +5,9 @@ import uuid
 from dotenv import load_dotenv
 from langfuse import Langfuse
 
-langfuse = Langfuse(
-    public_key="pk-lf-0aac3129-100a-4e8f-bac7-7d66539e16ae",
-    secret_key="sk-lf-f12705b9-29ae-4533-a55d-e7831edb36ae",
-    host="https://us.cloud.langfuse.com"  # 또는 클라우드 주소
-)
+# 키/주소는 환경변수에서 읽음: LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY, LANGFUSE_HOST
+# (앱의 요청 추적은 app/services/tracing.py의 TRACE_EXPORTER=langfuse 사용)
+langfuse = Langfuse()
 
 # Jinja2 템플릿 로더 설정
 template_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'prompts')
@@ -1,92 +1,247 @@
-from fastapi import FastAPI, Body
-from app.models.schemas import ChildProfileInput, LearningResponse, AssessmentInput, FeedbackResponse, EducationWorkflowState, FeedbackHistoryItem, OverallFeedbackRequest
+from fastapi import FastAPI, Body, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from app.models.schemas import ChildProfileInput, LearningResponse, AssessmentInput, FeedbackResponse, EducationWorkflowState, FeedbackHistoryItem, OverallFeedbackRequest, MasteryResponse, HistoryPageResponse, LessonDetail, CompactLearningResponse, UsageResponse
 from app.workflow.graph import create_init_profile_graph, create_assessment_graph, create_overall_feedback_graph
-from app.services.rag_service import RAGService
-from app.services.vector_db_service import VectorDBService
-from app.services.azure_openai_service import AzureOpenAIService
+# 서비스는 워크플로우 노드와 공유 (프로세스당 Chroma 클라이언트 1개)
+from app.workflow.nodes import mastery_service, history_repo, rag_service, assessment_outbox, vector_service, feedback_cache, usage_ledger, budget_guard, azure_service, server_storage, problem_bank
+from app.middleware import GZipRequestMiddleware, MetricsMiddleware, TracingMiddleware
+from app.services import metrics, tracing
+from app.services.tracing import span
+from app.services.usage_service import usage_scope, period_start, BudgetExceededError, ROLLUP_COLUMNS
+from app.services.idempotency_service import IdempotencyStore, IdempotencyConflictError, IdempotencyInProgressError, request_hash
+import time
+from app.services.storage_service import as_dict
+from app.services.azure_openai_service import parse_worksheet_and_key
 from dotenv import load_dotenv
 import os
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional, Union
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 # 환경변수 로드
 load_dotenv()
 
 app = FastAPI(title="어린이 맞춤형 교재 생성기 API")
-
-# 서비스 초기화
-vector_service = VectorDBService(persist_directory=os.getenv("CHROMA_DB_PATH", "./chroma_db"))
-azure_service = AzureOpenAIService(
-    endpoint=os.getenv("AOAI_ENDPOINT"),
-    key=os.getenv("AOAI_API_KEY"),
-    dep_curriculum=os.getenv("AOAI_DEPLOY_GPT4O"),
-    dep_embed=os.getenv("AOAI_DEPLOY_EMBED_3_LARGE")
-)
-rag_service = RAGService(vector_service, azure_service)
+# gzip 압축된 요청 본문 해제 (Streamlit API 클라이언트)
+app.add_middleware(GZipRequestMiddleware)
+# 응답 압축 (brotli-asgi가 설치되어 있으면 br 우선, 미지원 클라이언트는 gzip)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=500, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+app.add_middleware(MetricsMiddleware)
+# 요청 단위 추적 (가장 바깥: 압축 포함 전체 지연 시간, TRACE_EXPORTER 미설정 시 통과만)
+app.add_middleware(TracingMiddleware)
 
 # LangGraph 워크플로우 초기화
 init_profile_workflow = create_init_profile_graph()
 assessment_workflow = create_assessment_graph()
 overall_feedback_workflow = create_overall_feedback_graph()
 
+# 중복 POST(재실행/더블 클릭) 결과 재사용 (Idempotency-Key 헤더가 있는 요청만)
+idempotency_store = IdempotencyStore(server_storage)
+
+# 수집 시점 게이지 (요청 경로 비용 없음)
+RAG_COLLECTIONS = ("learning", "math_curriculum_guide", "curriculum_units")
+
+def _collection_sizes():
+    sizes = {}
+    for name in RAG_COLLECTIONS:
+        try:
+            sizes[(name,)] = vector_service.get_collection(name).count()
+        except Exception:
+            continue
+    return sizes
+
+metrics.Gauge("chroma_collection_items", "Chroma 컬렉션별 문서 수", _collection_sizes, ("collection",))
+metrics.Gauge("cache_entries", "로컬 캐시 항목 수 (처리한 워커 기준)", lambda: {
+    ("chroma_read",): vector_service.cache_size(),
+    ("overall_feedback",): feedback_cache.size(),
+}, ("cache",))
+metrics.Gauge("problem_bank_items", "문제 은행 문항 수 (난이도 구간별)", lambda: {
+    (band,): count for band, count in problem_bank.counts().items()
+}, ("band",))
+metrics.Gauge("outbox_items", "평가 응답 Chroma 쓰기 아웃박스 항목 수", lambda: {
+    (state,): value for state, value in assessment_outbox.stats().items() if state in ("pending", "failed")
+}, ("state",))
+
+@app.exception_handler(BudgetExceededError)
+def budget_exceeded_handler(request: Request, exc: BudgetExceededError):
+    """예산 초과로 LLM 호출을 생략했고 대체할 캐시가 없는 요청"""
+    return JSONResponse(status_code=503, content={"detail": "LLM 사용 예산을 초과했습니다. 잠시 후 다시 시도해 주세요."})
+
 @app.on_event("startup")
-async def startup_event():
-    """애플리케이션 시작시 RAG 데이터 초기화"""
-    print("RAG 시스템 초기화 중...")
-    success = rag_service.initialize_rag_data()
-    if success:
-        print("RAG 시스템 초기화 완료")
-    else:
-        print("RAG 시스템 초기화 실패")
+def startup_event():
+    """애플리케이션 시작시 RAG 데이터 초기화 (gunicorn 멀티 워커에서는 fork 전에 1회 수행되어 생략)"""
+    if os.getenv("RAG_WARMUP_DONE") != "1":
+        print("RAG 시스템 초기화 중...")
+        with usage_scope("warmup"):
+            success = rag_service.initialize_rag_data()
+        if success:
+            print("RAG 시스템 초기화 완료")
+        else:
+            print("RAG 시스템 초기화 실패")
+    assessment_outbox.start()
+    metrics.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    assessment_outbox.stop()
+    metrics.stop()
+    tracing.shutdown()
+
+def to_compact(lesson_id: str, title: Optional[str], date: Optional[str], lesson: Optional[str],
+               materials_text: Optional[str], feedback: Optional[str] = None) -> CompactLearningResponse:
+    """원문 학습지 → 구조화된 문항 목록 (정답 키 제외)"""
+    problems, _ = parse_worksheet_and_key(materials_text or "")
+    return CompactLearningResponse(
+        lesson_id=lesson_id,
+        title=title,
+        date=date,
+        header=(lesson or "").split("\n", 1)[0],
+        problems=problems,
+        feedback=feedback
+    )
+
+def run_idempotent(endpoint: str, key: Optional[str], body, run):
+    """
+    Idempotency-Key가 있으면 같은 키의 첫 요청만 실행하고 응답을 저장
+    이후 같은 키 요청은 워크플로우 없이 저장된 응답 반환 (헤더 Idempotent-Replayed: true)
+    """
+    if not key:
+        return run()
+    try:
+        stored = idempotency_store.begin(endpoint, key, request_hash(body))
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if stored is not None:
+        status_code, content = stored
+        return JSONResponse(status_code=status_code, content=content, headers={"Idempotent-Replayed": "true"})
+    try:
+        result = run()
+    except BaseException:
+        idempotency_store.release(endpoint, key)
+        raise
+    idempotency_store.complete(endpoint, key, 200, jsonable_encoder(result))
+    return result
 
-@app.post("/init_profile", response_model=LearningResponse)
-async def init_profile(profile: ChildProfileInput):
+# 엔드포인트는 동기 def: 워크플로우(LLM/SQLite 호출)가 블로킹이므로 스레드풀에서 실행 (이벤트 루프 차단 방지)
+@app.post("/init_profile", response_model=Union[CompactLearningResponse, LearningResponse])
+def init_profile(profile: ChildProfileInput, compact: bool = False,
+                 idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
     """
     1) 아동 프로필 입력 받음
     2) 초기 학습 커리큘럼 생성
     3) 교재 및 문제 생성 후 반환
+    Idempotency-Key 헤더가 같은 재요청은 새 학습지를 만들지 않고 처음 응답을 반환
     """
-    # LangGraph 워크플로우 실행
-    initial_state = EducationWorkflowState(child_profile=profile)
-    final_state = init_profile_workflow.invoke(initial_state)
-    
-    if final_state.get("learning_response"):
-        return final_state["learning_response"]
-    else:
-        raise Exception("교재 생성에 실패했습니다.")
+    def run():
+        # LangGraph 워크플로우 실행
+        initial_state = EducationWorkflowState(child_profile=profile)
+        with usage_scope("init_profile", profile.child_id), span("workflow.init_profile", child_id=profile.child_id):
+            final_state = init_profile_workflow.invoke(initial_state)
+
+        if final_state.get("learning_response"):
+            resp = final_state["learning_response"]
+            if compact:
+                return to_compact(resp.lesson_id, resp.title, resp.date, resp.lesson, resp.materials_text)
+            return resp
+        else:
+            raise Exception("교재 생성에 실패했습니다.")
+
+    return run_idempotent("init_profile", idempotency_key, {"profile": profile.dict(), "compact": compact}, run)
 
 @app.post("/submit_assessment", response_model=FeedbackResponse)
-async def submit_assessment(assessment: AssessmentInput):
+def submit_assessment(assessment: AssessmentInput,
+                      idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
     """
     1) 평가 응답 저장
     2) 피드백 생성
     3) 다음 교재 생성
+    Idempotency-Key 헤더가 같은 재요청은 채점/해설/저장 없이 처음 응답을 반환
     """
-    # LangGraph 워크플로우 실행
-    initial_state = EducationWorkflowState(assessment_input=assessment)
-    final_state = assessment_workflow.invoke(initial_state)
-    
-    if final_state.get("feedback_response"):
-        return final_state["feedback_response"]
-    else:
-        raise Exception("피드백 생성에 실패했습니다.")
+    def run():
+        if not assessment.materials_text and not history_repo.get(assessment.child_id, assessment.lesson_id):
+            raise HTTPException(status_code=404, detail="저장된 학습지를 찾을 수 없습니다.")
+        # LangGraph 워크플로우 실행
+        initial_state = EducationWorkflowState(assessment_input=assessment)
+        with usage_scope("submit_assessment", assessment.child_id), \
+                span("workflow.assessment", child_id=assessment.child_id, lesson_id=assessment.lesson_id):
+            final_state = assessment_workflow.invoke(initial_state)
+
+        if final_state.get("feedback_response"):
+            return final_state["feedback_response"]
+        else:
+            raise Exception("피드백 생성에 실패했습니다.")
+
+    return run_idempotent("submit_assessment", idempotency_key, assessment.dict(), run)
 
 @app.post("/overall_feedback")
-async def overall_feedback(req: OverallFeedbackRequest):
+def overall_feedback(req: OverallFeedbackRequest):
     # print("[DEBUG] /overall_feedback request body:", req)
     # 워크플로우 상태 준비
     state = EducationWorkflowState()
     # child_profile은 최소한 이름, 나이 필요
     state.child_profile = ChildProfileInput(
-        child_id="dummy",  # 필요시 req에 추가
+        child_id=req.child_id or "dummy",  # 종합 피드백 캐시 키
         name=req.name,
         grade=req.grade,
         semester=req.semester
     )
     state.history = [item.dict() for item in req.history]
+    state.history_digests = [d.dict() for d in req.digests]
     # print("[DEBUG] state.history:", state.history)
-    final_state = overall_feedback_workflow.invoke(state)
+    with usage_scope("overall_feedback", req.child_id), span("workflow.overall_feedback", child_id=req.child_id):
+        final_state = overall_feedback_workflow.invoke(state)
     if final_state.get("overall_feedback_response"):
         return {"feedback": final_state["overall_feedback_response"].feedback}
     else:
         raise Exception("종합 피드백 생성에 실패했습니다.")
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus 수집용 메트릭 (멀티 워커는 METRICS_MULTIPROC_DIR로 전체 워커 합산)"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/usage", response_model=UsageResponse)
+def get_usage(by: str = "endpoint", days: Optional[float] = None, child_id: Optional[str] = None):
+    """
+    LLM 토큰/비용 집계 (usage 원장)
+    by: endpoint | child_id | deployment | call, days 생략 시 현재 예산 기간(일/월) 기준
+    by=call이면 작업 유형별 p50 지연/비용 (routes: 작업별 배포)
+    """
+    if by not in ROLLUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"by는 {', '.join(ROLLUP_COLUMNS)} 중 하나여야 합니다.")
+    since = time.time() - days * 86400 if days else period_start()
+    return UsageResponse(by=by, since=since, items=usage_ledger.rollup(by, since=since, child_id=child_id),
+                         budget=budget_guard.status(), routes=azure_service.router.routes())
+
+@app.get("/mastery/{child_id}", response_model=MasteryResponse)
+def get_mastery(child_id: str):
+    """아동의 단원별 숙달도 집계 (제출 시 증분 갱신된 값 조회, LLM/파싱 없음)"""
+    return MasteryResponse(child_id=child_id, units=mastery_service.get_mastery(child_id))
+
+@app.get("/history/{child_id}", response_model=HistoryPageResponse)
+def get_history(child_id: str, before_date: Optional[str] = None, before_lesson_id: Optional[str] = None, limit: int = 20):
+    """학습 이력 요약 (본문 제외, 최신순 키셋 페이지네이션)"""
+    before = (before_date, before_lesson_id) if before_date and before_lesson_id else None
+    items, next_cursor = history_repo.summary_page(child_id, before=before, limit=max(1, min(limit, 100)))
+    return HistoryPageResponse(items=[as_dict(i) for i in items], next_cursor=list(next_cursor) if next_cursor else None)
+
+@app.get("/history/{child_id}/{lesson_id}", response_model=Union[CompactLearningResponse, LessonDetail])
+def get_lesson(child_id: str, lesson_id: str, compact: bool = False):
+    """학습 1건의 본문/학습지/채점 결과 (compact=true면 정답 키 없이 구조화된 문항만)"""
+    item = history_repo.get(child_id, lesson_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="학습 이력을 찾을 수 없습니다.")
+    if compact:
+        return to_compact(item.lesson_id, item.title, item.date, item.content, item.materials_text, item.feedback)
+    return LessonDetail(**as_dict(item))
@@ -1,92 +1,79 @@
 import streamlit as st
 import requests
-from urllib.parse import urljoin
 from dotenv import load_dotenv
 import os
-import sqlite3
 from datetime import datetime
 import re
 from collections import Counter
 import json
+import uuid
+from app.services.api_client import APIClient, idempotency_key
+from app.services.storage_service import SQLiteStorage, AccountRepository, Account, as_dict
 
 # 환경변수 로드
 load_dotenv()
 API_URL = os.getenv("API_URL", "http://localhost:8000")
 DB_PATH = "./child_edu_ai.db"
+# 사이드바 학습 이력 한 페이지 크기
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+# 이력/숙달도 조회 등 LLM 호출이 없는 API의 읽기 타임아웃(초)
+FAST_READ_TIMEOUT = float(os.getenv("API_FAST_READ_TIMEOUT", "10"))
+# 사이드바에 API 지연 시간 디버그 패널 표시
+API_DEBUG_PANEL = os.getenv("API_DEBUG_PANEL", "").lower() in ("1", "true", "yes")
+
+# API 클라이언트 (keep-alive 커넥션 풀, 세션 간 공유)
+@st.cache_resource
+def get_api_client():
+    return APIClient(API_URL)
+
+api = get_api_client()
 
-# DB 유틸 함수
+# DB 유틸 함수 (계정은 로컬 저장소, 학습 이력은 API 서버에 저장)
 @st.cache_resource
-def get_conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    return conn
-
-def init_db():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS accounts (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            pw TEXT,
-            grade INTEGER,
-            semester INTEGER
-        )
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS history (
-            id TEXT,
-            lesson_id TEXT,
-            date TEXT,
-            title TEXT,
-            content TEXT,
-            materials_text TEXT,
-            feedback TEXT,
-            PRIMARY KEY (id, lesson_id)
-        )
-    """)
-    conn.commit()
-init_db()
+def get_account_repository():
+    return AccountRepository(SQLiteStorage(DB_PATH))
+
+accounts_repo = get_account_repository()
 
 # DB 연동 함수
 def add_account(id, name, pw, grade, semester):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("INSERT INTO accounts (id, name, pw, grade, semester) VALUES (?, ?, ?, ?, ?)", (id, name, pw, grade, semester))
-    conn.commit()
+    accounts_repo.add(Account(id, name, pw, grade, semester))
 
 def get_account(id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, name, pw, grade, semester FROM accounts WHERE id=?", (id,))
-    row = c.fetchone()
-    if row:
-        return {"id": row[0], "name": row[1], "pw": row[2], "grade": row[3], "semester": row[4]}
-    return None
-
-def add_history(id, lesson_id, date, title, content, materials_text, feedback=None):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("""
-        INSERT OR REPLACE INTO history (id, lesson_id, date, title, content, materials_text, feedback)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (id, lesson_id, date, title, content, materials_text, feedback))
-    conn.commit()
-
-def get_history(id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT lesson_id, date, title, content, materials_text, feedback FROM history WHERE id=? ORDER BY date DESC", (id,))
-    rows = c.fetchall()
-    return [
-        {"lesson_id": r[0], "date": r[1], "title": r[2], "content": r[3], "materials_text": r[4], "feedback": r[5]}
-        for r in rows
-    ]
+    return as_dict(accounts_repo.get(id))
+
+# 학습 이력 API 연동 함수
+def get_history_summary(id, before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    사이드바용 이력 요약 (본문 제외, 최신순 키셋 페이지네이션)
+    before: 이전 페이지 마지막 항목의 (date, lesson_id)
+    반환: (items, next_cursor)
+    """
+    params = {"limit": limit}
+    if before:
+        params.update(before_date=before[0], before_lesson_id=before[1])
+    try:
+        resp = api.get("/history/{child_id}", params=params, timeout=FAST_READ_TIMEOUT, child_id=id)
+    except requests.RequestException:
+        return [], None
+    if resp.status_code != 200:
+        return [], None
+    data = resp.json()
+    next_cursor = tuple(data["next_cursor"]) if data.get("next_cursor") else None
+    return data.get("items", []), next_cursor
+
+def get_lesson(id, lesson_id):
+    """선택한 학습 1건의 구조화된 문항/채점 결과 조회 (선택 시에만 로드, 정답 키 미포함)"""
+    try:
+        resp = api.get("/history/{child_id}/{lesson_id}", params={"compact": "true"}, timeout=FAST_READ_TIMEOUT,
+                       child_id=id, lesson_id=lesson_id)
+    except requests.RequestException:
+        return None
+    return resp.json() if resp.status_code == 200 else None
 
-def update_feedback(id, lesson_id, feedback):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("UPDATE history SET feedback=? WHERE id=? AND lesson_id=?", (feedback, id, lesson_id))
-    conn.commit()
+def has_history(id):
+    items, _ = get_history_summary(id, limit=1)
+    return bool(items)
 
 def setup_ui_styles():
     st.markdown(
@@ -410,44 +397,6 @@ def render_per_question_table(perq_text: str) -> str:
     parts.append("</tbody></table>")
     return "".join(parts)
 
-def parse_worksheet(materials_text: str):
-    # [Worksheet] 부분만 추출
-    text = materials_text
-    if "[Worksheet]" in materials_text:
-        text = materials_text.split("[Worksheet]")[-1]
-    if "[AnswerKey]" in text:
-        text = text.split("[AnswerKey]")[0]
-
-    # [Problem N] 기준으로 분리
-    import re as _re
-    problem_pattern = _re.compile(r"\[Problem\s*(\d+)\]\s*", _re.IGNORECASE)
-    parts = list(problem_pattern.finditer(text))
-    problems = []
-    for idx, match in enumerate(parts):
-        start = match.end()
-        end = parts[idx + 1].start() if idx + 1 < len(parts) else len(text)
-        raw = text[start:end].strip()
-        # [Answer]와 [Explanation] 제거
-        raw = raw.split("[Answer]")[0].strip()
-        raw = raw.split("[Explanation]")[0].strip()
-        # Choices 파싱
-        stem = raw
-        choices_block = ""
-        if "Choices:" in raw:
-            parts2 = raw.split("Choices:", 1)
-            stem = parts2[0].strip()
-            choices_block = parts2[1]
-        # A)~D) 추출
-        choice_map = {}
-        for label in ["A", "B", "C", "D"]:
-            m = _re.search(rf"\b{label}\)\s*(.+)", choices_block)
-            if m:
-                choice_map[label] = m.group(1).strip()
-        number = int(match.group(1)) if match.group(1).isdigit() else (idx + 1)
-        if stem:
-            problems.append({"number": number, "text": stem, "choices": choice_map})
-    return problems
-
 def remove_markdown_links(text):
     # [텍스트](링크) → 텍스트
     text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
@@ -470,18 +419,6 @@ def load_curriculum_subjects(grade, semester):
         st.error(f"커리큘럼 데이터 로드 실패: {e}")
         return []
 
-def get_history_for_feedback(history):
-    result = []
-    for item in history:
-        # content에서 주제 추출
-        topic = item['content'].split('\n')[0][:30] if item['content'] else ""
-        feedback = item.get('feedback', '') or ""  # None/null을 빈 문자열로 보정
-        result.append({
-            "topic": topic,
-            "feedback": feedback
-        })
-    return result
-
 def render_overall_feedback(history):
     # 학습 주제, 피드백 요약 추출
     topics = []
@@ -511,6 +448,38 @@ def render_overall_feedback(history):
     ]
     return '\n'.join(md)
 
+def render_api_debug_panel():
+    """엔드포인트별 API 지연 시간 (API_DEBUG_PANEL=1일 때만 표시)"""
+    if not API_DEBUG_PANEL:
+        return
+    with st.expander("🛠 API 지연 시간", expanded=False):
+        stats = api.latency_stats()
+        if stats:
+            st.dataframe(stats, hide_index=True, use_container_width=True)
+        else:
+            st.caption("아직 호출 기록이 없습니다.")
+
+def render_mastery(child_id):
+    """서버에 증분 집계된 단원별 숙달도 표시 (피드백 문자열 재파싱 없음)"""
+    try:
+        resp = api.get("/mastery/{child_id}", timeout=FAST_READ_TIMEOUT, child_id=child_id)
+        units = resp.json().get("units", []) if resp.status_code == 200 else []
+    except Exception:
+        units = []
+    if not units:
+        return
+    band_labels = {"basic": "기본", "reasoning": "추론", "applied": "응용", "advanced": "중고급"}
+    def _pct(v):
+        return f"{int(round(v * 100))}%" if v is not None else "-"
+    rows = []
+    for u in units:
+        row = {"단원": u["unit"], "응시": u["attempts"], "정답률": _pct(u.get("accuracy")), "점수 추세": u.get("ema_score")}
+        for band, label in band_labels.items():
+            row[label] = _pct((u.get("bands") or {}).get(band, {}).get("accuracy"))
+        rows.append(row)
+    st.markdown("## 🎯 단원별 숙달도")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
 # 세션 상태 최소화
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -536,6 +505,9 @@ if "overall_feedback_text" not in st.session_state:
     st.session_state.overall_feedback_text = None
 if "overall_feedback_needed" not in st.session_state:
     st.session_state.overall_feedback_needed = False
+if "history_cursors" not in st.session_state:
+    # 사이드바 이력 페이지별 시작 커서 스택 (첫 페이지는 None)
+    st.session_state.history_cursors = [None]
 
 # 쿼리 파라미터로 동작 제어
 action = st.query_params.get("action", "")
@@ -556,6 +528,7 @@ elif action == "logout":
     st.session_state.selected_lesson = None
     st.session_state.overall_feedback_text = None
     st.session_state.overall_feedback_needed = False
+    st.session_state.history_cursors = [None]
     st.rerun()
 
 # 앱 타이틀 및 버튼 한 줄 배치
@@ -588,6 +561,7 @@ with col3:
             st.session_state.child_grade = None
             st.session_state.child_semester = None
             st.session_state.selected_lesson = None
+            st.session_state.history_cursors = [None]
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -727,30 +701,36 @@ else:
                 "subject": selected_subject if selected_subject != "전체 (랜덤)" else None,
                 "extra_request": (extra_request or None)
             }
+            # 재실행/더블 클릭으로 같은 생성 요청이 반복되어도 학습지는 1개만 생성 (성공 후 nonce 교체)
+            if "init_profile_nonce" not in st.session_state:
+                st.session_state.init_profile_nonce = uuid.uuid4().hex
             with st.spinner("AI가 학습지를 만들고 있어요..."):
-                resp = requests.post(urljoin(API_URL, "/init_profile"), json=payload)
-                if resp.status_code == 200:
+                try:
+                    resp = api.post("/init_profile", payload, params={"compact": "true"},
+                                    idempotency_key=idempotency_key(st.session_state.init_profile_nonce, payload))
+                except requests.RequestException as e:
+                    resp = None
+                    st.error(f"요청 중 오류 발생: {e}")
+                if resp is not None and resp.status_code == 200:
                     data = resp.json()
-                    # 선택된 단원 정보로 제목 생성
-                    subject_text = f" - {selected_subject}" if selected_subject != "전체 (랜덤)" else ""
-                    extracted_title = (data.get('lesson') or '').split(']')[-1].split('\n')[0].strip() if isinstance(data.get('lesson'), str) else '수학'
-
+                    # 학습지는 서버에 저장됨 (구조화된 문항만 수신, 정답은 서버에 보관)
                     lesson_item = {
-                        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "title": f"{selected_grade}학년 {selected_semester}학기 {extracted_title}{subject_text}",
+                        "date": data.get("date") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "title": data.get("title") or f"{selected_grade}학년 {selected_semester}학기",
                         "lesson_id": data["lesson_id"],
-                        "content": data["lesson"],
-                        "materials_text": data["materials_text"],
+                        "header": data.get("header", ""),
+                        "problems": data.get("problems", []),
                         "feedback": None
                     }
-                    add_history(acc["id"], lesson_item["lesson_id"], lesson_item["date"], lesson_item["title"], lesson_item["content"], lesson_item["materials_text"])
                     st.session_state.selected_lesson = lesson_item
+                    st.session_state.init_profile_nonce = uuid.uuid4().hex
+                    st.session_state.history_cursors = [None]
                     st.session_state.feedback = None
                     # 학습 세션 중에는 종합 피드백 자동 호출 방지
                     st.session_state.overall_feedback_needed = False
                     st.success("✅ 학습지가 생성되었습니다! 메인 화면에서 확인하세요.")
                     st.rerun()
-                else:
+                elif resp is not None:
                     st.error(f"오류 발생: {resp.text}")
         # 📊 학습 이력 섹션
         st.markdown("""
@@ -759,16 +739,12 @@ else:
         </div>
         """, unsafe_allow_html=True)
         
-        history = get_history(acc["id"])
+        cursors = st.session_state.history_cursors
+        history, next_cursor = get_history_summary(acc["id"], before=cursors[-1])
         if history:
             for idx, item in enumerate(history):
-                # 점수 파싱
-                score_text = ""
-                if item.get('feedback'):
-                    import re as _re
-                    m = _re.search(r"총점:\s*(\d+)\s*점", item['feedback'])
-                    if m:
-                        score_text = f"{m.group(1)}점"
+                # 점수는 저장된 컬럼 사용
+                score_text = f"{item['score']}점" if item.get('score') is not None else ""
                 unit_title = item['title']
 
                 # 버튼 내부에 점수 포함, 한 줄 표시 유지
@@ -778,23 +754,35 @@ else:
                 # 클릭 가능한 이력 카드 (박스)
                 if st.button(
                     label=f"📝 {truncated_title}{score_inline}",
-                    key=f"lesson_{idx}",
+                    key=f"lesson_{item['lesson_id']}",
                     help=f"{unit_title}\n{item['date']}"
                 ):
-                    st.session_state.selected_lesson = item
+                    # 본문은 선택 시에만 로드
+                    st.session_state.selected_lesson = get_lesson(acc["id"], item["lesson_id"])
+                    st.rerun()
+            # 키셋 페이지 이동
+            col_prev, col_next = st.columns(2)
+            with col_prev:
+                if len(cursors) > 1 and st.button("◀ 이전", key="history_prev"):
+                    cursors.pop()
+                    st.rerun()
+            with col_next:
+                if next_cursor and st.button("다음 ▶", key="history_next"):
+                    cursors.append(next_cursor)
                     st.rerun()
+        render_api_debug_panel()
 
     # 메인: 학습 상세/진행
     if st.session_state.selected_lesson:
         lesson = st.session_state.selected_lesson
         st.markdown(f"### {lesson['title']}")
         # 상단 원문(정답/해설 포함 가능성) 노출 방지: 제목/헤더만 표기
-        header_line = (lesson['content'] or '').split('\n', 1)[0]
+        header_line = lesson.get('header') or ''
         if header_line:
             st.markdown(f"<div class='worksheet-title'>{header_line}</div>", unsafe_allow_html=True)
         st.markdown("---")
         # 파싱하여 예쁘게 문제 카드 + 바로 아래 답안 입력 렌더링
-        parsed = parse_worksheet(lesson['materials_text'])
+        parsed = lesson.get('problems') or []
         answer_keys = [f"answer_{i+1}" for i in range(len(parsed))]
         # 난이도 뱃지 색상(파스텔)
         badge_colors = {
@@ -803,18 +791,16 @@ else:
             'applied_basic': '#d1fae5',
             'applied_adv': '#fde68a',
         }
-        # 각 문제에 배지 매핑(1-3 기본, 4-5 추론, 6-8 응용기본, 9-10 응용중고급)
-        def get_badge(i):
-            if i < 3:
-                return ('기본', badge_colors['basic'])
-            if i < 5:
-                return ('추론', badge_colors['reason'])
-            if i < 8:
-                return ('응용', badge_colors['applied_basic'])
-            return ('중고급', badge_colors['applied_adv'])
+        # 각 문제에 배지 매핑 (서버가 학습지 섹션 제목으로 판별한 난이도 구간)
+        band_badges = {
+            'basic': ('기본', badge_colors['basic']),
+            'reasoning': ('추론', badge_colors['reason']),
+            'applied': ('응용', badge_colors['applied_basic']),
+            'advanced': ('중고급', badge_colors['applied_adv']),
+        }
 
         for i, item in enumerate(parsed):
-            label, color = get_badge(i)
+            label, color = band_badges.get(item.get('band'), band_badges['basic'])
             # 타입 표기 제거 요청: 문제타입 텍스트는 카드 안에 넣지 않음. 대신 작은 배지로만 색상만 표시(텍스트 미표시)
             st.markdown(
                 f"<div class='problem-card'>"
@@ -822,7 +808,7 @@ else:
                 f"  <div class='problem-header'>문제 {item['number']}</div>"
                 f"  <div style='width:14px; height:14px; border-radius:7px; background:{color}; border:1px solid rgba(0,0,0,0.06);'></div>"
                 f"</div>"
-                f"<div class='problem-text'>{item['text']}</div>"
+                f"<div class='problem-text'>{item['stem']}</div>"
                 f"</div>",
                 unsafe_allow_html=True,
             )
@@ -846,7 +832,7 @@ else:
             st.markdown("---")
             st.markdown("#### 정답 입력")
             # 입력값 수집 + 검증(A/B/C/D만 허용) 및 미입력 경고
-            parsed = parse_worksheet(lesson['materials_text'])
+            parsed = lesson.get('problems') or []
             num_questions = len(parsed)
             answer_inputs = []
             invalid = False
@@ -870,20 +856,20 @@ else:
                     st.warning("정답은 A/B/C/D 중 하나여야 합니다.")
                 else:
                     responses_text = "\n".join(answer_inputs)
+                    # 학습지 본문/단원/학년·학기는 서버 저장본 사용 (ID와 답안만 전송)
                     payload = {
                         "child_id": acc["id"],
                         "lesson_id": lesson["lesson_id"],
-                        "responses_text": responses_text,
-                        "materials_text": lesson["materials_text"]
+                        "responses_text": responses_text
                     }
                     with st.spinner("AI가 채점하고 있어요..."):
                         try:
-                            resp = requests.post(urljoin(API_URL, "/submit_assessment"), json=payload)
+                            # 같은 학습지·같은 답안의 중복 제출은 서버가 처음 채점 결과를 반환
+                            resp = api.post("/submit_assessment", payload, idempotency_key=idempotency_key(payload))
                             if resp.status_code == 200:
                                 data = resp.json()
                                 # 서버에서 받은 피드백 표시 (점수/해설/피드백 포함)
                                 st.session_state.feedback = data.get("feedback", "")
-                                update_feedback(acc["id"], lesson["lesson_id"], st.session_state.feedback)
                                 st.markdown("---")
                                 st.markdown("#### 평가 결과")
                                 # 결과를 카드 스타일로 재가공 렌더링 시도
@@ -919,27 +905,32 @@ else:
                                 if feed_part.strip():
                                     html = _nl2br(feed_part)
                                     st.markdown(f"<div class='problem-card'><div class='problem-header'>종합 피드백</div><div class='problem-text'>{html}</div></div>", unsafe_allow_html=True)
+                                if data.get("next_lesson"):
+                                    st.info(data["next_lesson"])
                             else:
                                 st.error(f"오류 발생: {resp.text}")
                         except Exception as e:
                             st.error(f"요청 중 오류 발생: {e}")
 
     else:
-        history = get_history(st.session_state.child_id)
-        if history:
+        if has_history(st.session_state.child_id):
             st.markdown("## 📊 AI 종합 피드백")
             # 최초 로그인 시 1회 호출하여 저장, 이후에는 캐시된 텍스트만 사용
             if (not st.session_state.overall_feedback_text) and (st.session_state.get("overall_feedback_needed", True)):
                 with st.spinner("AI가 종합 피드백을 만들고 있어요..."):
-                    history_for_feedback = get_history_for_feedback(history)
+                    # 이력/다이제스트는 서버 저장본 사용
                     payload = {
+                        "child_id": acc["id"],
                         "name": acc["name"],
                         "grade": acc["grade"],
-                        "semester": acc["semester"],
-                        "history": history_for_feedback
+                        "semester": acc["semester"]
                     }
-                    resp = requests.post(urljoin(API_URL, "/overall_feedback"), json=payload)
-                    if resp.status_code == 200:
+                    # 같은 이력이면 같은 결과(서버 캐시)이므로 재시도 허용
+                    try:
+                        resp = api.post("/overall_feedback", payload, idempotent=True)
+                    except requests.RequestException:
+                        resp = None
+                    if resp is not None and resp.status_code == 200:
                         st.session_state.overall_feedback_text = resp.json().get("feedback", "")
                         st.session_state.overall_feedback_needed = False
                     else:
@@ -951,6 +942,7 @@ else:
                 st.markdown(ofb, unsafe_allow_html=True)
             else:
                 st.info("종합 피드백을 불러오는 중 문제가 있었습니다. 좌측에서 학습을 시작하면 더 정확한 리포트를 만들 수 있어요.")
+            render_mastery(acc["id"])
         else:
             st.markdown("""
             # 👋 처음 오셨군요!
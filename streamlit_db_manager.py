@@ -1,8 +1,8 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import os
 from typing import List, Dict, Any
+from app.services.storage_service import open_connection
 
 class StreamlitDBManager:
     def __init__(self, db_path: str = "child_edu_ai.db"):
@@ -12,7 +12,7 @@ class StreamlitDBManager:
     def connect(self):
         """데이터베이스 연결"""
         try:
-            self.connection = sqlite3.connect(self.db_path, timeout=30.0)
+            self.connection = open_connection(self.db_path, busy_timeout_ms=30000)
             return True
         except Exception as e:
             st.error(f"데이터베이스 연결 실패: {e}")
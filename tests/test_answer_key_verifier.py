@@ -0,0 +1,23 @@
+from app.services.answer_key_verifier import verify_problem
+
+
+def problem(stem, *choices):
+    return {"stem": stem, "choices": dict(zip("ABCD", choices))}
+
+
+def test_word_problem_with_partial_expression_is_skipped():
+    p = problem("쿠키를 한 번에 3 × 4개씩 구웠고, 그중 2개를 먹었습니다. 남은 쿠키는 몇 개입니까?",
+                "10개", "12개", "14개", "8개")
+    assert verify_problem(p, "A") == ("skipped", "A")
+
+
+def test_word_problem_with_expression_in_quantity_is_skipped():
+    p = problem("길이가 12 + 8 cm인 끈을 반으로 자르면 한 도막은 몇 cm입니까?",
+                "10 cm", "20 cm", "16 cm", "4 cm")
+    assert verify_problem(p, "A") == ("skipped", "A")
+
+
+def test_computation_prompts_are_checked():
+    assert verify_problem(problem("36 + 27 = ?", "53", "63", "73", "62"), "B") == ("ok", "B")
+    assert verify_problem(problem("다음을 계산하세요.\n36 + 27", "53", "63", "73", "62"), "A") == ("fixed", "B")
+    assert verify_problem(problem("□ × 4 = 28일 때, □에 알맞은 수는 무엇입니까?", "6", "7", "8", "112"), "A") == ("fixed", "B")